@@ -2,6 +2,9 @@ from .ProjectController import ProjectController
 from .BaseController import BaseController
 from fastapi import FastAPI, APIRouter,Depends, UploadFile
 from models import ResponseSignal
+import aiofiles
+import hashlib
+import logging
 import os
 import re
 
@@ -9,6 +12,7 @@ class DataController(BaseController):
     
     def __init__(self):
         super().__init__()
+        self.logger = logging.getLogger('uvicorn.error')
     
     # validate the file properties
     def validate_file_properties(self, file: UploadFile):
@@ -47,6 +51,53 @@ class DataController(BaseController):
     
 
 
+    async def write_upload_file(self, file: UploadFile, file_path: str):
+        # stream the upload to disk and hash it in the same pass
+        file_hash = hashlib.sha256()
+
+        async with aiofiles.open(file_path, 'wb') as f:
+            while chunk := await file.read(self.app_settings.FILE_DEFAULT_CHUNK_SIZE):
+                file_hash.update(chunk)
+                await f.write(chunk)
+
+        return file_hash.hexdigest()
+
+    async def store_upload_file(self, file: UploadFile, project, asset_model):
+        # validate, write and hash an upload, then look up an asset with the same content.
+        # returns (is_stored, signal, upload) with upload as
+        # {"file_path", "file_id", "file_hash", "existing_asset"}
+        is_valid, result_signal = self.validate_file_properties(file=file)
+
+        if not is_valid:
+            return False, result_signal, None
+
+        file_path, file_id = self.generate_unique_filepath(
+            orig_file_name=file.filename,
+            project_id=project.project_id
+        )
+
+        try:
+            file_hash = await self.write_upload_file(file=file, file_path=file_path)
+        except Exception as e:
+            self.logger.error(f"Error while uploading file : {e}")
+
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+            return False, ResponseSignal.FILE_UPLOAD_FAILED.value, None
+
+        existing_asset = await asset_model.get_asset_by_hash(
+            asset_project_id=project.id,
+            asset_hash=file_hash
+        )
+
+        return True, ResponseSignal.FILE_VALIDATION_SUCCESS.value, {
+            "file_path": file_path,
+            "file_id": file_id,
+            "file_hash": file_hash,
+            "existing_asset": existing_asset,
+        }
+
     def get_clean_file_name(self, orig_file_name: str):
         # Remove any special characters except for dot and underscore
         cleaned_file_name = re.sub(r'[^\w.]','', orig_file_name.strip())
@@ -0,0 +1,292 @@
+from .BaseController import BaseController
+from .NLPController import NLPController
+from .ProcessController import ProcessController
+from models import ResponseSignal
+from models.JobModel import JobModel
+from models.ProjectModel import ProjectModel
+from models.AssetModel import AssetModel
+from models.ChunkModel import ChunkModel
+from models.db_schemes import Job
+from models.enums.JobEnums import JobTypeEnum, JobStatusEnum
+from bson.objectid import ObjectId
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+import socket
+
+class JobCancelledError(Exception):
+    pass
+
+class JobLostError(Exception):
+    pass
+
+class JobController(BaseController):
+
+    def __init__(self, db_client, vectordb_client, generation_client,
+                    embedding_client, template_parser, process_executor: Executor=None,
+                    search_cache=None, answer_cache=None, lexical_store=None):
+        super().__init__()
+
+        self.db_client = db_client
+        self.vectordb_client = vectordb_client
+        self.generation_client = generation_client
+        self.embedding_client = embedding_client
+        self.template_parser = template_parser
+        self.process_executor = process_executor
+        self.search_cache = search_cache
+        self.answer_cache = answer_cache
+        self.lexical_store = lexical_store
+
+        self.job_model = None
+        self.worker_ids = []
+        self.worker_tasks = []
+        self.new_job_event = asyncio.Event()
+
+        self.logger = logging.getLogger('uvicorn.error')
+
+    async def start(self):
+        self.job_model = await JobModel.create_instance(db_client=self.db_client)
+
+        worker_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        for i in range(self.app_settings.JOB_WORKERS):
+            worker_id = f"{worker_prefix}-{i}"
+            self.worker_ids.append(worker_id)
+            self.worker_tasks.append(asyncio.create_task(self.run_worker(worker_id=worker_id)))
+
+    async def stop(self):
+        for task in self.worker_tasks:
+            task.cancel()
+
+        _ = await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+
+        if self.worker_ids:
+            _ = await self.job_model.release_worker_jobs(worker_ids=self.worker_ids)
+
+    async def submit_job(self, job_type: str, project_id: str, job_params: dict):
+        job = await self.job_model.create_job(job=Job(
+            job_type=job_type,
+            job_project_id=project_id,
+            job_params=job_params,
+            job_status=JobStatusEnum.PENDING.value,
+        ))
+
+        self.new_job_event.set()
+
+        return job
+
+    async def get_job(self, job_id: str):
+        return await self.job_model.get_job(job_id=job_id)
+
+    async def cancel_job(self, job: Job):
+        return await self.job_model.request_cancel(job_id=job.id)
+
+    async def run_worker(self, worker_id: str):
+        while True:
+            try:
+                self.new_job_event.clear()
+
+                stale_before = datetime.utcnow() - timedelta(seconds=self.app_settings.JOB_STALE_SECONDS)
+                job = await self.job_model.claim_next_job(worker_id=worker_id, stale_before=stale_before)
+
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self.new_job_event.wait(),
+                                               timeout=self.app_settings.JOB_POLL_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self.run_job(job=job, worker_id=worker_id)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Job worker {worker_id} error: {e}")
+                await asyncio.sleep(self.app_settings.JOB_POLL_INTERVAL_SECONDS)
+
+    async def send_heartbeats(self, job: Job, worker_id: str):
+        while True:
+            await asyncio.sleep(self.app_settings.JOB_STALE_SECONDS / 3)
+            _ = await self.job_model.send_heartbeat(job_id=job.id, worker_id=worker_id)
+
+    async def run_job(self, job: Job, worker_id: str):
+        self.logger.info(f"Running job {job.id} ({job.job_type}), attempt {job.job_attempts}")
+
+        heartbeat_task = asyncio.create_task(self.send_heartbeats(job=job, worker_id=worker_id))
+
+        try:
+            if job.job_type == JobTypeEnum.PROCESS.value:
+                job_result = await self.run_process_job(job=job, worker_id=worker_id)
+            elif job.job_type == JobTypeEnum.INDEX_PUSH.value:
+                job_result = await self.run_index_push_job(job=job, worker_id=worker_id)
+            else:
+                raise ValueError(f"Unknown job type: {job.job_type}")
+
+            is_updated = await self.job_model.update_job(job_id=job.id, worker_id=worker_id, fields={
+                "job_status": JobStatusEnum.COMPLETED.value,
+                "job_result": job_result,
+            })
+
+            if not is_updated:
+                self.logger.warning(f"Job {job.id} was taken over by another worker, result dropped")
+
+        except JobLostError as e:
+            # the job belongs to another worker now, which reports its status
+            self.logger.warning(f"Job {job.id} stopped: {e}")
+
+        except Exception as e:
+            is_cancelled = await self.job_model.is_cancel_requested(job_id=job.id)
+            job_status = JobStatusEnum.CANCELLED.value if is_cancelled else JobStatusEnum.FAILED.value
+
+            if not is_cancelled:
+                self.logger.error(f"Job {job.id} failed: {e}")
+
+            _ = await self.job_model.update_job(job_id=job.id, worker_id=worker_id, fields={
+                "job_status": job_status,
+                "job_error": str(e),
+            })
+
+        finally:
+            heartbeat_task.cancel()
+
+    async def commit_checkpoint(self, job: Job, worker_id: str):
+        # persist progress of the last committed batch, then stop if a cancel was requested
+        # or another worker claimed the job after our heartbeats went stale
+        is_updated = await self.job_model.update_job(job_id=job.id, worker_id=worker_id, fields={
+            "job_checkpoint": job.job_checkpoint,
+            "job_progress": job.job_progress,
+        })
+
+        if not is_updated:
+            raise JobLostError("Job was taken over by another worker")
+
+        if await self.job_model.is_cancel_requested(job_id=job.id):
+            raise JobCancelledError("Job was cancelled")
+
+    async def run_process_job(self, job: Job, worker_id: str):
+        job_params = job.job_params
+        checkpoint = job.job_checkpoint
+
+        project_model = await ProjectModel.create_instance(db_client=self.db_client)
+        asset_model = await AssetModel.create_instance(db_client=self.db_client)
+        chunk_model = await ChunkModel.create_instance(db_client=self.db_client)
+
+        project = await project_model.get_project_or_create(project_id=job.job_project_id)
+        process_controller = ProcessController(project_id=job.job_project_id)
+
+        project_files_ids = await process_controller.get_project_files_ids(
+            project=project,
+            asset_model=asset_model,
+            file_id=job_params.get("file_id")
+        )
+
+        if project_files_ids is None:
+            raise ValueError(ResponseSignal.FILE_ID_ERROR.value)
+
+        if len(project_files_ids) == 0:
+            raise ValueError(ResponseSignal.NO_FILES_ERROR.value)
+
+        if job_params.get("do_reset") == 1 and not checkpoint.get("is_reset"):
+            _ = await chunk_model.delete_chunks_by_project_id(project_id=project.id)
+            checkpoint["is_reset"] = True
+            await self.commit_checkpoint(job=job, worker_id=worker_id)
+
+        # skip the files committed by a previous attempt
+        processed_asset_ids = set(checkpoint.get("processed_asset_ids", []))
+        remaining_files_ids = {
+            asset_id: file_id
+            for asset_id, file_id in project_files_ids.items()
+            if str(asset_id) not in processed_asset_ids
+        }
+
+        # a previous attempt may have inserted part of the chunks of an unfinished file
+        if job.job_attempts > 1:
+            for asset_id in remaining_files_ids:
+                _ = await chunk_model.delete_chunks_by_asset_id(asset_id=asset_id)
+
+        job.job_progress["total_files"] = len(project_files_ids)
+        job.job_progress.setdefault("processed_files", len(processed_asset_ids))
+        job.job_progress.setdefault("inserted_chunks", 0)
+
+        async def on_file_processed(asset_id, file_id: str, no_chunks: int):
+            processed_asset_ids.add(str(asset_id))
+            checkpoint["processed_asset_ids"] = list(processed_asset_ids)
+            job.job_progress["processed_files"] += 1
+            job.job_progress["inserted_chunks"] += no_chunks
+            await self.commit_checkpoint(job=job, worker_id=worker_id)
+
+        _, _, failed_files = await process_controller.process_project_files(
+            project=project,
+            project_files_ids=remaining_files_ids,
+            chunk_model=chunk_model,
+            chunk_size=job_params.get("chunk_size", 100),
+            overlap_size=job_params.get("overlap", 20),
+            executor=self.process_executor,
+            on_file_processed=on_file_processed,
+        )
+
+        if job.job_progress["processed_files"] == 0:
+            raise ValueError(ResponseSignal.PROCESSING_FAILED.value)
+
+        return {
+            "inserted_chunks": job.job_progress["inserted_chunks"],
+            "processed_files": job.job_progress["processed_files"],
+            "failed_files": failed_files,
+        }
+
+    async def run_index_push_job(self, job: Job, worker_id: str):
+        job_params = job.job_params
+        checkpoint = job.job_checkpoint
+
+        project_model = await ProjectModel.create_instance(db_client=self.db_client)
+        chunk_model = await ChunkModel.create_instance(db_client=self.db_client)
+
+        project = await project_model.get_project_or_create(project_id=job.job_project_id)
+
+        nlp_controller = NLPController(
+            vectordb_client=self.vectordb_client,
+            generation_client=self.generation_client,
+            embedding_client=self.embedding_client,
+            template_parser=self.template_parser,
+            search_cache=self.search_cache,
+            answer_cache=self.answer_cache,
+            lexical_store=self.lexical_store,
+        )
+
+        if job_params.get("vector_config") is not None:
+            project = await nlp_controller.update_vector_db_config(
+                project=project,
+                project_model=project_model,
+                vector_config={ k: v for k, v in job_params["vector_config"].items() if v is not None },
+            )
+
+        # resume right after the last committed chunk, the reset only happens once
+        after_id = ObjectId(checkpoint["after_id"]) if checkpoint.get("after_id") else None
+        base_indexed_chunks = job.job_progress.get("indexed_chunks", 0)
+
+        job.job_progress["total_chunks"] = await chunk_model.count_project_chunks(project_id=project.id)
+        job.job_progress["indexed_chunks"] = base_indexed_chunks
+
+        async def on_progress(last_chunk_id: ObjectId, inserted_items_count: int):
+            checkpoint["after_id"] = str(last_chunk_id)
+            job.job_progress["indexed_chunks"] = base_indexed_chunks + inserted_items_count
+            await self.commit_checkpoint(job=job, worker_id=worker_id)
+
+        push_stats = await nlp_controller.index_project_into_vector_db(
+            project=project,
+            chunk_model=chunk_model,
+            do_reset=job_params.get("do_reset") == 1 and after_id is None,
+            incremental=job_params.get("incremental") == 1,
+            after_id=after_id,
+            on_progress=on_progress,
+        )
+
+        if push_stats is None:
+            raise RuntimeError(ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value)
+
+        return {
+            **push_stats,
+            "inserted_items_count": job.job_progress["indexed_chunks"],
+        }
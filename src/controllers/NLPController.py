@@ -1,123 +1,842 @@
 from .BaseController import BaseController
-from models.db_schemes import Project, DataChunk
+from models.db_schemes import Project, DataChunk, RetrievedDocument, Session
 from stores.llm.LLMEnums import DocumentTypeEnum
+from stores.lexical import SearchModeEnum
+from stores.vectordb.VectorDBEnums import PayloadFieldEnums
+from helpers.diversity import ResultDiversifier
+from helpers.context_packer import ContextPacker
+from models.enums.StreamEnums import StreamEventEnum
+from models.enums.SessionEnums import SessionRoleEnum
+from models import ResponseSignal
 from typing import List
+from bson.objectid import ObjectId
+from contextlib import asynccontextmanager
+import asyncio
 import json
+import logging
+import time
+import os
+import uuid
 
 class NLPController(BaseController):
 
     def __init__(self, vectordb_client, generation_client, 
-                embedding_client, template_parser):
+                embedding_client, template_parser, search_cache=None,
+                answer_cache=None, lexical_store=None, session_store=None,
+                single_flight=None):
         super().__init__()
 
         self.vectordb_client = vectordb_client
         self.generation_client = generation_client
         self.embedding_client = embedding_client
         self.template_parser = template_parser
+        self.search_cache = search_cache
+        self.answer_cache = answer_cache
+        self.lexical_store = lexical_store
+        self.session_store = session_store
+        self.single_flight = single_flight
+
+        self.diversifier = ResultDiversifier(
+            mmr_lambda=self.app_settings.RETRIEVAL_MMR_LAMBDA,
+            overlap_threshold=self.app_settings.RETRIEVAL_DEDUP_THRESHOLD,
+        )
+
+        self.logger = logging.getLogger(__name__)
+
+    # chunk fields read from mongo while pushing a project
+    index_chunk_fields = [
+        "_id", "chunk_text", "chunk_metadata", "chunk_order", "chunk_asset_id",
+        "chunk_content_hash", "chunk_indexed_hash",
+    ]
+
+    # vector db config keys and the settings holding their defaults
+    vector_db_config_settings = {
+        "quantization": "VECTOR_DB_QUANTIZATION",
+        "quantization_always_ram": "VECTOR_DB_QUANTIZATION_ALWAYS_RAM",
+        "quantization_rescore": "VECTOR_DB_QUANTIZATION_RESCORE",
+        "quantization_oversampling": "VECTOR_DB_QUANTIZATION_OVERSAMPLING",
+        "on_disk": "VECTOR_DB_ON_DISK",
+        "payload_on_disk": "VECTOR_DB_PAYLOAD_ON_DISK",
+        "hnsw_m": "VECTOR_DB_HNSW_M",
+        "hnsw_ef_construct": "VECTOR_DB_HNSW_EF_CONSTRUCT",
+        "hnsw_ef": "VECTOR_DB_HNSW_EF",
+        "exact": "VECTOR_DB_EXACT_SEARCH",
+    }
+
+    def get_vector_db_config(self, project: Project):
+        # settings defaults overridden by the project own config
+        vector_db_config = {
+            key: getattr(self.app_settings, setting_name)
+            for key, setting_name in self.vector_db_config_settings.items()
+        }
+
+        project_vector_config = getattr(project, "project_vector_config", None) or {}
+        vector_db_config.update({
+            key: value
+            for key, value in project_vector_config.items()
+            if value is not None and key in vector_db_config
+        })
+
+        return vector_db_config
+
+    def get_vector_db_search_params(self, project: Project):
+        vector_db_config = self.get_vector_db_config(project=project)
+
+        search_params = {
+            "hnsw_ef": vector_db_config["hnsw_ef"],
+            "exact": vector_db_config["exact"],
+        }
+
+        if vector_db_config["quantization"]:
+            search_params["quantization_rescore"] = vector_db_config["quantization_rescore"]
+            search_params["quantization_oversampling"] = vector_db_config["quantization_oversampling"]
+
+        return search_params
 
     def create_collection_name(self, project_id: str):
         return f"collection_{project_id}".strip()
+
+    def create_point_id(self, chunk_id: ObjectId):
+        # stable vector db point id derived from the chunk ObjectId (padded to a UUID)
+        return str(uuid.UUID(bytes=chunk_id.binary + bytes(4)))
+
+    def create_payload_fields(self, chunk: DataChunk):
+        # indexed payload fields used by search filters, pages are 1-based
+        chunk_metadata = chunk.chunk_metadata or {}
+        payload_fields = {
+            PayloadFieldEnums.ASSET_ID.value: str(chunk.chunk_asset_id),
+            PayloadFieldEnums.CHUNK_ORDER.value: chunk.chunk_order,
+        }
+
+        if chunk_metadata.get("source"):
+            payload_fields[PayloadFieldEnums.SOURCE.value] = os.path.basename(chunk_metadata["source"])
+
+        if isinstance(chunk_metadata.get("page"), int):
+            payload_fields[PayloadFieldEnums.PAGE.value] = chunk_metadata["page"] + 1
+
+        return payload_fields
+
+    def bump_collection_generation(self, collection_name: str):
+        # any write to a collection invalidates its cached search results and answers
+        if self.search_cache is not None:
+            self.search_cache.bump_generation(collection_name=collection_name)
+
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(collection_name=collection_name)
+
+    @asynccontextmanager
+    async def writing_collection(self, collection_name: str):
+        # bumped before the write so cached results stop being served, and after it so
+        # results of searches that ran during the write are never served either
+        self.bump_collection_generation(collection_name=collection_name)
+        try:
+            yield
+        finally:
+            self.bump_collection_generation(collection_name=collection_name)
     
-    def reset_vector_db_collection(self, project: Project):
+    async def update_vector_db_config(self, project: Project, project_model, vector_config: dict):
+        # stores the project overrides, cached results used the previous search params
+        project = await project_model.update_project_vector_config(project_id=project.project_id,
+                                                                   vector_config=vector_config)
+
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        self.bump_collection_generation(collection_name=collection_name)
+
+        return project
+
+    async def reset_vector_db_collection(self, project: Project):
         collection_name = self.create_collection_name(project_id=project.project_id)
-        return self.vectordb_client.delete_collection(collection_name=collection_name)
+
+        async with self.writing_collection(collection_name=collection_name):
+            if self.lexical_store is not None:
+                await asyncio.to_thread(self.lexical_store.delete, collection_name=collection_name)
+
+            return await self.vectordb_client.delete_collection(collection_name=collection_name)
     
-    def get_vector_db_collection_info(self, project: Project):
+    async def get_vector_db_collection_info(self, project: Project):
         collection_name = self.create_collection_name(project_id=project.project_id)
-        collection_info = self.vectordb_client.get_collection_info(collection_name=collection_name)
+        collection_info = await self.vectordb_client.get_collection_info(collection_name=collection_name)
 
         return json.loads(
             json.dumps(collection_info, default=lambda x: x.__dict__)
         )
     
-    def index_into_vector_db(self, project: Project, chunks: List[DataChunk],
-                                chunks_ids: List[int], 
-                                do_reset: bool = False):
-        
-        # step1: get collection name
+    async def create_vector_db_collection(self, project: Project, do_reset: bool = False):
         collection_name = self.create_collection_name(project_id=project.project_id)
 
-        # step2: manage items
+        if not do_reset:
+            return await self.vectordb_client.create_collection(
+                collection_name=collection_name,
+                embedding_size=self.embedding_client.embedding_size,
+                do_reset=do_reset,
+                collection_config=self.get_vector_db_config(project=project),
+            )
+
+        async with self.writing_collection(collection_name=collection_name):
+            return await self.vectordb_client.create_collection(
+                collection_name=collection_name,
+                embedding_size=self.embedding_client.embedding_size,
+                do_reset=do_reset,
+                collection_config=self.get_vector_db_config(project=project),
+            )
+
+    async def embed_chunks(self, chunks: List[DataChunk]):
         texts = [ c.chunk_text for c in chunks ]
-        metadata = [ c.chunk_metadata for c in  chunks]
-        vectors = [
-            self.embedding_client.embed_text(text=text, 
-                                            document_type=DocumentTypeEnum.DOCUMENT.value)
-            for text in texts
-        ]
 
-        # step3: create collection if not exists
-        _ = self.vectordb_client.create_collection(
-            collection_name=collection_name,
-            embedding_size=self.embedding_client.embedding_size,
-            do_reset=do_reset,
+        vectors = await self.embedding_client.embed_texts(
+            texts=texts,
+            document_type=DocumentTypeEnum.DOCUMENT.value,
+            batch_size=self.app_settings.EMBEDDING_BATCH_SIZE,
         )
 
-        # step4: insert into vector db
-        _ = self.vectordb_client.insert_many(
-            collection_name=collection_name,
-            texts=texts,
-            metadata=metadata,
+        if not vectors or len(vectors) != len(texts):
+            return None
+
+        return vectors
+
+    async def insert_chunks_into_vector_db(self, project: Project, chunks: List[DataChunk],
+                                        vectors: List[list]):
+        collection_name = self.create_collection_name(project_id=project.project_id)
+
+        async with self.writing_collection(collection_name=collection_name):
+            return await self.vectordb_client.insert_many(
+                collection_name=collection_name,
+                texts=[ c.chunk_text for c in chunks ],
+                metadata=[ c.chunk_metadata for c in chunks ],
+                vectors=vectors,
+                record_ids=[ self.create_point_id(chunk_id=c.id) for c in chunks ],
+                payload_fields=[ self.create_payload_fields(chunk=c) for c in chunks ],
+            )
+
+    async def delete_chunks_from_vector_db(self, project: Project, chunks_ids: List[ObjectId]):
+        collection_name = self.create_collection_name(project_id=project.project_id)
+
+        point_ids = [ self.create_point_id(chunk_id=chunk_id) for chunk_id in chunks_ids ]
+
+        async with self.writing_collection(collection_name=collection_name):
+            _ = await self.update_lexical_index(project=project, removed_ids=point_ids)
+
+            return await self.vectordb_client.delete_many(
+                collection_name=collection_name,
+                record_ids=point_ids,
+            )
+
+    async def delete_orphan_points(self, project: Project, chunk_model):
+        # remove points whose chunks no longer exist in the project, returns their ids
+        collection_name = self.create_collection_name(project_id=project.project_id)
+
+        valid_point_ids = set()
+        async for page_chunks in chunk_model.iter_project_chunks(project_id=project.id,
+                                                                 batch_size=self.app_settings.INDEX_PUSH_PAGE_SIZE * 20,
+                                                                 projection=["_id"]):
+            valid_point_ids.update( self.create_point_id(chunk_id=c.id) for c in page_chunks )
+
+        point_ids = await self.vectordb_client.list_record_ids(collection_name=collection_name)
+        orphan_ids = [
+            point_id
+            for point_id in point_ids
+            if str(point_id) not in valid_point_ids
+        ]
+
+        if orphan_ids:
+            async with self.writing_collection(collection_name=collection_name):
+                _ = await self.vectordb_client.delete_many(
+                    collection_name=collection_name,
+                    record_ids=orphan_ids,
+                )
+
+        return [ str(point_id) for point_id in orphan_ids ]
+
+    async def index_into_vector_db(self, project: Project, chunks: List[DataChunk],
+                                do_reset: bool = False):
+        
+        # step1: embed chunks
+        vectors = await self.embed_chunks(chunks=chunks)
+
+        if not vectors:
+            return False
+
+        # step2: create collection if not exists
+        _ = await self.create_vector_db_collection(project=project, do_reset=do_reset)
+
+        # step3: insert into vector db
+        return await self.insert_chunks_into_vector_db(
+            project=project,
+            chunks=chunks,
             vectors=vectors,
-            record_ids=chunks_ids,
         )
 
-        return True
+    async def index_project_into_vector_db(self, project: Project, chunk_model,
+                                            do_reset: bool = False,
+                                            incremental: bool = False,
+                                            after_id: ObjectId = None,
+                                            on_progress = None):
+        # pipeline: mongo pages -> embedding workers -> vector db writer
+        # every stage runs concurrently on the event loop.
+        # on_progress(last_chunk_id, inserted_items_count) is awaited whenever every
+        # chunk up to last_chunk_id is committed, so a push can resume after it.
+        # errors raised by on_progress (a cancelled job) are raised to the caller
+        concurrency = max(1, self.app_settings.INDEX_PUSH_CONCURRENCY)
+        page_size = self.app_settings.INDEX_PUSH_PAGE_SIZE
+
+        start_time = time.perf_counter()
+
+        # step1: create the collection once for the whole push
+        is_created = await self.create_vector_db_collection(project=project, do_reset=do_reset)
+
+        # a freshly created collection has nothing indexed, so everything is pushed
+        only_changed = incremental and not is_created
+
+        pages_queue = asyncio.Queue(maxsize=concurrency * 2)
+        vectors_queue = asyncio.Queue(maxsize=concurrency * 2)
+        inserted_items_count = 0
+        skipped_items_count = 0
+        # chunks of an incremental push are applied to the lexical index in batches,
+        # other pushes rebuild it from mongo once they are done
+        indexed_chunks = []
+        progress_error = None
+
+        # step2: stream chunks pages from mongo
+        async def fetch_pages():
+            nonlocal skipped_items_count
+            page_no = 0
+            async for page_chunks in chunk_model.iter_project_chunks(project_id=project.id,
+                                                                     batch_size=page_size,
+                                                                     projection=self.index_chunk_fields,
+                                                                     after_id=after_id):
+                last_chunk_id = page_chunks[-1].id
+
+                if only_changed:
+                    changed_chunks = [ c for c in page_chunks if not c.is_indexed() ]
+                    skipped_items_count += len(page_chunks) - len(changed_chunks)
+                    page_chunks = changed_chunks
+
+                # empty pages still flow through to keep the progress watermark moving
+                await pages_queue.put((page_no, last_chunk_id, page_chunks))
+                page_no += 1
+
+            for _ in range(concurrency):
+                await pages_queue.put(None)
+
+        # step3: embed pages with bounded parallelism
+        async def embed_pages():
+            while True:
+                item = await pages_queue.get()
+                if item is None:
+                    await vectors_queue.put(None)
+                    return
+
+                page_no, last_chunk_id, page_chunks = item
+                vectors = []
+                if page_chunks:
+                    vectors = await self.embed_chunks(chunks=page_chunks)
+                    if not vectors:
+                        raise RuntimeError("Error while embedding chunks")
+
+                await vectors_queue.put((page_no, last_chunk_id, page_chunks, vectors))
+
+        # step4: upsert embedded pages into the vector db
+        async def insert_pages():
+            nonlocal inserted_items_count, progress_error
+            finished_workers = 0
+            next_page_no = 0
+            committed_pages = {}
+            while finished_workers < concurrency:
+                item = await vectors_queue.get()
+                if item is None:
+                    finished_workers += 1
+                    continue
+
+                page_no, last_chunk_id, page_chunks, vectors = item
+                if page_chunks:
+                    is_inserted = await self.insert_chunks_into_vector_db(project=project,
+                                                                          chunks=page_chunks,
+                                                                          vectors=vectors)
+                    if not is_inserted:
+                        raise RuntimeError("Error while inserting chunks into vector db")
+
+                    _ = await chunk_model.mark_chunks_indexed(chunks=page_chunks)
+                    inserted_items_count += len(page_chunks)
+
+                    if self.lexical_store is not None and only_changed:
+                        indexed_chunks.extend(page_chunks)
+                        if len(indexed_chunks) >= self.app_settings.LEXICAL_UPDATE_BATCH_SIZE:
+                            _ = await self.update_lexical_index(project=project, chunks=indexed_chunks)
+                            indexed_chunks.clear()
+
+                # pages finish out of order, report only the contiguous committed prefix
+                committed_pages[page_no] = last_chunk_id
+                watermark_id = None
+                while next_page_no in committed_pages:
+                    watermark_id = committed_pages.pop(next_page_no)
+                    next_page_no += 1
 
-    def search_vector_db_collection(self, project: Project, text: str, limit: int = 10):
+                if watermark_id is not None and on_progress is not None:
+                    try:
+                        await on_progress(watermark_id, inserted_items_count)
+                    except Exception as e:
+                        progress_error = e
+                        raise
+
+        tasks = [
+            asyncio.create_task(fetch_pages()),
+            asyncio.create_task(insert_pages()),
+            *[ asyncio.create_task(embed_pages()) for _ in range(concurrency) ],
+        ]
+
+        try:
+            await asyncio.gather(*tasks)
+        except Exception as e:
+            self.logger.error(f"Error while indexing project {project.project_id}: {e}")
+            # committed pages are marked indexed, an incremental retry will skip them
+            _ = await self.update_lexical_index(project=project, chunks=indexed_chunks)
+            if e is progress_error:
+                raise
+            return None
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        # step5: drop points of deleted chunks (a reset collection has none)
+        deleted_ids = []
+        if not is_created:
+            deleted_ids = await self.delete_orphan_points(project=project,
+                                                          chunk_model=chunk_model)
+        deleted_items_count = len(deleted_ids)
+
+        # step6: apply the pushed and deleted chunks to the lexical index,
+        # an incremental push that changed nothing leaves it untouched
+        if not only_changed:
+            _ = await self.build_lexical_index(project=project, chunk_model=chunk_model)
+        else:
+            _ = await self.update_lexical_index(project=project, chunks=indexed_chunks,
+                                                removed_ids=deleted_ids, chunk_model=chunk_model)
+
+        elapsed_seconds = time.perf_counter() - start_time
+
+        return {
+            "inserted_items_count": inserted_items_count,
+            "skipped_items_count": skipped_items_count,
+            "deleted_items_count": deleted_items_count,
+            "elapsed_seconds": round(elapsed_seconds, 3),
+            "chunks_per_second": round(inserted_items_count / elapsed_seconds, 2) if elapsed_seconds else 0.0,
+        }
+
+    async def build_lexical_index(self, project: Project, chunk_model):
+        # returns the number of indexed chunks, or None when lexical search is disabled
+        if self.lexical_store is None:
+            return None
+
+        collection_name = self.create_collection_name(project_id=project.project_id)
+
+        doc_ids, doc_texts, doc_fields = [], [], []
+        async for page_chunks in chunk_model.iter_project_chunks(project_id=project.id,
+                                                                 batch_size=self.app_settings.INDEX_PUSH_PAGE_SIZE * 20,
+                                                                 projection=["_id", "chunk_text", "chunk_metadata",
+                                                                             "chunk_order", "chunk_asset_id"]):
+            for c in page_chunks:
+                doc_ids.append(self.create_point_id(chunk_id=c.id))
+                doc_texts.append(c.chunk_text)
+                doc_fields.append(self.create_payload_fields(chunk=c))
+
+        async with self.writing_collection(collection_name=collection_name):
+            _ = await asyncio.to_thread(self.lexical_store.build, collection_name=collection_name,
+                                        doc_ids=doc_ids, doc_texts=doc_texts, doc_fields=doc_fields)
+
+        return len(doc_ids)
+
+    async def update_lexical_index(self, project: Project, chunks: List[DataChunk] = None,
+                                    removed_ids: List[str] = None, chunk_model = None):
+        # upserts the chunks and removes the point ids without reloading the project.
+        # a project with no lexical index yet is built from mongo when chunk_model is given
+        if self.lexical_store is None:
+            return None
+
+        collection_name = self.create_collection_name(project_id=project.project_id)
+
+        chunks = chunks or []
+        removed_ids = removed_ids or []
+        if not chunks and not removed_ids:
+            # nothing changed, only a missing index is built
+            if chunk_model is None or self.lexical_store.get_index_version(collection_name) is not None:
+                return 0
+            return await self.build_lexical_index(project=project, chunk_model=chunk_model)
+
+        async with self.writing_collection(collection_name=collection_name):
+            index = await asyncio.to_thread(self.lexical_store.update, collection_name=collection_name,
+                                            removed_ids=removed_ids,
+                                            doc_ids=[ self.create_point_id(chunk_id=c.id) for c in chunks ],
+                                            doc_texts=[ c.chunk_text for c in chunks ],
+                                            doc_fields=[ self.create_payload_fields(chunk=c) for c in chunks ])
+
+        if index is None:
+            if chunk_model is None:
+                return None
+            return await self.build_lexical_index(project=project, chunk_model=chunk_model)
+
+        return len(chunks) + len(removed_ids)
+
+    def get_diversify(self, diversify: bool = None):
+        if diversify is None:
+            return self.app_settings.RETRIEVAL_DIVERSIFY_ENABLED
+        return diversify
+
+    def get_candidates_limit(self, limit: int, diversify: bool):
+        # diversified searches over-fetch so `limit` distinct results remain
+        if diversify:
+            return limit * self.app_settings.RETRIEVAL_CANDIDATES_MULTIPLIER
+        return limit
+
+    async def search_lexical_collection(self, project: Project, text: str, limit: int = 10,
+                                        filters: dict = None, diversify: bool = None):
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        diversify = self.get_diversify(diversify)
+
+        if self.lexical_store is None:
+            return False
+
+        results = await asyncio.to_thread(self.lexical_store.search, collection_name=collection_name,
+                                          text=text, limit=self.get_candidates_limit(limit, diversify),
+                                          filters=filters)
+
+        if not results:
+            return False
+
+        results = [
+            RetrievedDocument(id=doc_id, text=doc_text, score=score,
+                              asset_id=doc_fields.get(PayloadFieldEnums.ASSET_ID.value),
+                              chunk_order=doc_fields.get(PayloadFieldEnums.CHUNK_ORDER.value))
+            for doc_id, doc_text, score, doc_fields in results
+        ]
+
+        # BM25 results carry no vectors, only near duplicates are dropped
+        if diversify:
+            results = self.diversifier.deduplicate(results)
+
+        return results[:limit]
+
+    async def search_hybrid_collection(self, project: Project, text: str, limit: int = 10,
+                                        vector: list = None, filters: dict = None,
+                                        diversify: bool = None):
+        # reciprocal rank fusion of the vector and BM25 rankings, each over-fetched
+        # so documents ranked low by one retriever can still make the final list
+        candidates_limit = limit * self.app_settings.HYBRID_CANDIDATES_MULTIPLIER
+
+        vector_results, lexical_results = await asyncio.gather(
+            self.search_vector_db_collection(project=project, text=text, limit=candidates_limit,
+                                             vector=vector, filters=filters, diversify=False),
+            self.search_lexical_collection(project=project, text=text, limit=candidates_limit,
+                                           filters=filters, diversify=False),
+        )
+
+        return self.fuse_rankings(rankings=[ vector_results, lexical_results ], limit=limit,
+                                  diversify=self.get_diversify(diversify))
+
+    def fuse_rankings(self, rankings: list, limit: int, diversify: bool = False):
+        # reciprocal rank fusion, documents are matched by their point id
+        rrf_k = self.app_settings.HYBRID_RRF_K
+
+        fused_documents = {}
+        for results in rankings:
+            for rank, doc in enumerate(results or []):
+                fused_doc = fused_documents.setdefault(doc.id, { "doc": doc, "score": 0.0 })
+                fused_doc["score"] += 1.0 / (rrf_k + rank + 1)
+
+        if not fused_documents:
+            return False
+
+        ranked_ids = sorted(fused_documents, key=lambda doc_id: fused_documents[doc_id]["score"],
+                            reverse=True)
+
+        results = [
+            fused_documents[doc_id]["doc"].model_copy(update={ "score": fused_documents[doc_id]["score"] })
+            for doc_id in ranked_ids
+        ]
+
+        if diversify:
+            results = self.diversifier.deduplicate(results)
+
+        return results[:limit]
+
+    def get_answer_cache_scope(self, limit: int, mode: str = None):
+        # cached answers are only reused for questions asked with the same params
+        return json.dumps({
+            "limit": limit,
+            "mode": mode or self.app_settings.SEARCH_DEFAULT_MODE,
+            "model_id": self.generation_client.generation_model_id,
+            "max_output_tokens": self.generation_client.default_generation_max_output_tokens,
+            "temperature": self.generation_client.default_generation_temperature,
+        }, sort_keys=True)
+
+    async def coalesce(self, key: tuple, func):
+        # identical concurrent calls share one in-flight call
+        if self.single_flight is None:
+            return await func()
+        return await self.single_flight.do(key=key, func=func)
+
+    async def search_collection(self, project: Project, text: str, limit: int = 10,
+                                mode: str = None, vector: list = None, filters: dict = None,
+                                diversify: bool = None):
+        mode = mode or self.app_settings.SEARCH_DEFAULT_MODE
+        diversify = self.get_diversify(diversify)
+
+        key = None
+        if self.single_flight is not None:
+            key = self.single_flight.make_key("search", text, {
+                "project_id": project.project_id, "limit": limit, "mode": mode,
+                "filters": filters, "diversify": diversify,
+                "model_id": self.embedding_client.embedding_model_id,
+            })
+
+        return await self.coalesce(key=key, func=lambda: self.run_search_collection(
+            project=project, text=text, limit=limit, mode=mode, vector=vector,
+            filters=filters, diversify=diversify,
+        ))
+
+    async def run_search_collection(self, project: Project, text: str, limit: int = 10,
+                                    mode: str = None, vector: list = None, filters: dict = None,
+                                    diversify: bool = None):
+        mode = mode or self.app_settings.SEARCH_DEFAULT_MODE
+
+        if mode == SearchModeEnum.HYBRID.value:
+            return await self.search_hybrid_collection(project=project, text=text, limit=limit,
+                                                       vector=vector, filters=filters,
+                                                       diversify=diversify)
+
+        if mode == SearchModeEnum.LEXICAL.value:
+            return await self.search_lexical_collection(project=project, text=text, limit=limit,
+                                                        filters=filters, diversify=diversify)
+
+        return await self.search_vector_db_collection(project=project, text=text, limit=limit,
+                                                      vector=vector, filters=filters,
+                                                      diversify=diversify)
+
+    async def search_vector_db_collection(self, project: Project, text: str, limit: int = 10,
+                                            vector: list = None, filters: dict = None,
+                                            diversify: bool = None):
 
         # step1: get collection name
         collection_name = self.create_collection_name(project_id=project.project_id)
+        diversify = self.get_diversify(diversify)
 
         # step2: get text embedding vector
-        vector = self.embedding_client.embed_text(text=text, 
-                                                document_type=DocumentTypeEnum.QUERY.value)
+        if vector is None:
+            vector = await self.embed_query(text=text)
 
         if not vector or len(vector) == 0:
             return False
 
         # step3: do semantic search
-        results = self.vectordb_client.search_by_vector(
-            collection_name=collection_name,
-            vector=vector,
-            limit=limit
-        )
+        results, results_key = None, None
+        if self.search_cache is not None:
+            results_key = self.search_cache.make_results_key(collection_name=collection_name,
+                                                             vector=vector, limit=limit,
+                                                             filters=filters, diversify=diversify)
+            results = self.search_cache.get_results(results_key=results_key)
+
+        if results is None:
+            results = await self.vectordb_client.search_by_vector(
+                collection_name=collection_name,
+                vector=vector,
+                limit=self.get_candidates_limit(limit, diversify),
+                search_params=self.get_vector_db_search_params(project=project),
+                filters=filters,
+                with_vectors=diversify,
+            )
+
+            # step4: drop near duplicates and re-rank the candidates with MMR
+            if results and diversify:
+                results = self.diversifier.diversify(results, limit=limit)
+
+            if results and self.search_cache is not None:
+                self.search_cache.set_results(results_key=results_key, results=results)
 
         if not results:
             return False
 
         return results
+
+    async def search_vector_db_collection_batch(self, project: Project, texts: List[str],
+                                                limit: int = 10, vectors: List[list] = None,
+                                                filters: dict = None, diversify: bool = None):
+        # one embedding call and one vector db request for all the queries,
+        # returns the results of every query in order, False for a query without results
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        diversify = self.get_diversify(diversify)
+
+        if vectors is None:
+            vectors = await self.embed_queries(texts=texts)
+
+        if not vectors:
+            return None
+
+        batch_results = [ None ] * len(texts)
+        results_keys = [ None ] * len(texts)
+        if self.search_cache is not None:
+            for i, vector in enumerate(vectors):
+                results_keys[i] = self.search_cache.make_results_key(collection_name=collection_name,
+                                                                     vector=vector, limit=limit,
+                                                                     filters=filters,
+                                                                     diversify=diversify)
+                batch_results[i] = self.search_cache.get_results(results_key=results_keys[i])
+
+        missing_ids = [ i for i, results in enumerate(batch_results) if results is None ]
+        if missing_ids:
+            missing_results = await self.vectordb_client.search_by_vectors(
+                collection_name=collection_name,
+                vectors=[ vectors[i] for i in missing_ids ],
+                limit=self.get_candidates_limit(limit, diversify),
+                search_params=self.get_vector_db_search_params(project=project),
+                filters=filters,
+                with_vectors=diversify,
+            )
+
+            for i, results in zip(missing_ids, missing_results):
+                if results and diversify:
+                    results = self.diversifier.diversify(results, limit=limit)
+
+                batch_results[i] = results
+                if results and self.search_cache is not None:
+                    self.search_cache.set_results(results_key=results_keys[i], results=results)
+
+        return [ results or False for results in batch_results ]
+
+    async def search_collection_batch(self, project: Project, texts: List[str], limit: int = 10,
+                                        mode: str = None, filters: dict = None, diversify: bool = None):
+        mode = mode or self.app_settings.SEARCH_DEFAULT_MODE
+
+        if mode == SearchModeEnum.LEXICAL.value:
+            return await asyncio.gather(*[
+                self.search_lexical_collection(project=project, text=text, limit=limit,
+                                               filters=filters, diversify=diversify)
+                for text in texts
+            ])
+
+        vectors = await self.embed_queries(texts=texts)
+        if not vectors:
+            return None
+
+        if mode == SearchModeEnum.HYBRID.value:
+            candidates_limit = limit * self.app_settings.HYBRID_CANDIDATES_MULTIPLIER
+
+            vector_batch_results = await self.search_vector_db_collection_batch(
+                project=project, texts=texts, limit=candidates_limit, vectors=vectors,
+                filters=filters, diversify=False,
+            )
+            lexical_batch_results = await asyncio.gather(*[
+                self.search_lexical_collection(project=project, text=text, limit=candidates_limit,
+                                               filters=filters, diversify=False)
+                for text in texts
+            ])
+
+            return [
+                self.fuse_rankings(rankings=[ vector_results, lexical_results ], limit=limit,
+                                   diversify=self.get_diversify(diversify))
+                for vector_results, lexical_results in zip(vector_batch_results or [ None ] * len(texts),
+                                                           lexical_batch_results)
+            ]
+
+        return await self.search_vector_db_collection_batch(project=project, texts=texts,
+                                                            limit=limit, vectors=vectors,
+                                                            filters=filters, diversify=diversify)
+
+    async def embed_queries(self, texts: List[str]):
+        # cached query vectors are reused, the rest are embedded in a single call
+        model_id = self.embedding_client.embedding_model_id
+
+        vectors = [ None ] * len(texts)
+        if self.search_cache is not None:
+            vectors = [
+                self.search_cache.get_query_vector(model_id=model_id, text=text)
+                for text in texts
+            ]
+
+        # repeated queries in the same batch are embedded once
+        missing_texts = list(dict.fromkeys( text for text, vector in zip(texts, vectors) if vector is None ))
+        if missing_texts:
+            missing_vectors = await self.embedding_client.embed_texts(
+                texts=missing_texts,
+                document_type=DocumentTypeEnum.QUERY.value,
+                batch_size=self.app_settings.EMBEDDING_BATCH_SIZE,
+            )
+
+            if not missing_vectors or len(missing_vectors) != len(missing_texts):
+                return None
+
+            text_vectors = dict(zip(missing_texts, missing_vectors))
+            vectors = [
+                vector if vector is not None else text_vectors[text]
+                for text, vector in zip(texts, vectors)
+            ]
+
+            if self.search_cache is not None:
+                for text, vector in text_vectors.items():
+                    self.search_cache.set_query_vector(model_id=model_id, text=text, vector=vector)
+
+        return vectors
+
+    async def embed_query(self, text: str):
+        model_id = self.embedding_client.embedding_model_id
+
+        if self.search_cache is not None:
+            vector = self.search_cache.get_query_vector(model_id=model_id, text=text)
+            if vector is not None:
+                return vector
+
+        key = None
+        if self.single_flight is not None:
+            key = self.single_flight.make_key("embed", text, { "model_id": model_id })
+
+        vector = await self.coalesce(key=key, func=lambda: self.embedding_client.embed_text(
+            text=text, document_type=DocumentTypeEnum.QUERY.value,
+        ))
+
+        if vector and self.search_cache is not None:
+            self.search_cache.set_query_vector(model_id=model_id, text=text, vector=vector)
+
+        return vector
     
-    def answer_rag_question(self, project: Project, query: str, limit: int = 10):
-        
-        answer, full_prompt, chat_history = None, None, None
+    def render_document_prompt(self, doc_num: int, chunk_text: str):
+        return self.template_parser.get("rag", "document_prompt", {
+                "doc_num": doc_num,
+                "chunk_text": chunk_text,
+        })
 
-        # step1: retrieve related documents
-        retrieved_documents = self.search_vector_db_collection(
-            project=project,
-            text=query,
-            limit=limit,
-        )
+    def render_documents_prompts(self, texts: List[str], first_doc_num: int = 1):
+        # the documents block of a prompt, numbered from first_doc_num
+        return "\n".join(self.template_parser.render_many("rag", "document_prompt", [
+            { "doc_num": first_doc_num + idx, "chunk_text": text }
+            for idx, text in enumerate(texts)
+        ]))
 
-        if not retrieved_documents or len(retrieved_documents) == 0:
-            return answer, full_prompt, chat_history
-        
-        # step2: Construct LLM prompt
+    def construct_rag_prompt(self, query: str, retrieved_documents: List[RetrievedDocument]):
+        # returns the prompt, the chat history and a report of the packed context
         system_prompt = self.template_parser.get("rag", "system_prompt")
 
-        documents_prompts = "\n".join([
-            self.template_parser.get("rag", "document_prompt", {
-                    "doc_num": idx + 1,
-                    "chunk_text": doc.text,
-            })
-            for idx, doc in enumerate(retrieved_documents)
-        ])
-
         footer_prompt = self.template_parser.get("rag", "footer_prompt",{
             "query":query
         })
 
-        # step3: Construct Generation Client Prompts
+        # the retrieved documents are packed into the generation input budget
+        context_packer = ContextPacker(
+            max_input_tokens=self.generation_client.default_generation_max_input_tokens,
+            estimate_tokens=self.generation_client.estimate_tokens,
+            merge_adjacent=self.app_settings.CONTEXT_MERGE_ADJACENT_CHUNKS,
+        )
+
+        evidence, context_report = context_packer.pack(
+            documents=retrieved_documents,
+            render_document=self.render_document_prompt,
+            fixed_prompts=[ system_prompt, footer_prompt ],
+        )
+
+        if context_report["dropped"]:
+            self.logger.info(f"Context budget of {context_report['budget_tokens']} tokens "
+                             f"dropped {len(context_report['dropped'])} of {len(retrieved_documents)} documents")
+
+        documents_prompts = self.render_documents_prompts(texts=[ piece["text"] for piece in evidence ])
+
         chat_history = [
             self.generation_client.construct_prompt(
                 prompt=system_prompt,
@@ -127,10 +846,521 @@ class NLPController(BaseController):
 
         full_prompt = "\n\n".join([ documents_prompts,  footer_prompt])
 
-        # step4: Retrieve the Answer
-        answer = self.generation_client.generate_text(
+        return full_prompt, chat_history, context_report
+
+    async def load_session(self, project: Project, session_id: str):
+        # an unknown session id starts a new session, a session of another project is refused
+        session = await self.session_store.get(session_id=session_id)
+        if session is None:
+            session = Session(session_id=session_id, session_project_id=project.project_id)
+
+        if session.session_project_id != project.project_id:
+            return None
+
+        return session
+
+    def get_session_documents_budget(self, system_prompt: str, footer_prompt: str):
+        # the input budget left once the fixed prompts, the history and its summary are counted
+        return self.generation_client.default_generation_max_input_tokens \
+                - self.generation_client.estimate_tokens(system_prompt) \
+                - self.generation_client.estimate_tokens(footer_prompt) \
+                - self.app_settings.SESSION_HISTORY_MAX_TOKENS \
+                - self.app_settings.SESSION_SUMMARY_MAX_TOKENS
+
+    def update_session_documents(self, session: Session, retrieved_documents: List[RetrievedDocument],
+                                    budget_tokens: int):
+        # new evidence is appended after the documents already sent so the prompt prefix
+        # stays byte stable between turns. when none of the evidence of this question
+        # fits, the documents are packed again from scratch and the prefix changes once
+        context_packer = ContextPacker(
+            max_input_tokens=budget_tokens,
+            estimate_tokens=self.generation_client.estimate_tokens,
+            merge_adjacent=self.app_settings.CONTEXT_MERGE_ADJACENT_CHUNKS,
+        )
+
+        known_ids = { doc_id for piece in session.session_documents for doc_id in piece["ids"] }
+        used_tokens = sum( piece["tokens"] for piece in session.session_documents )
+
+        reused, kept, dropped = [], [], []
+        for piece in context_packer.create_evidence(retrieved_documents):
+            if set(piece["ids"]) <= known_ids:
+                reused.append(piece)
+                continue
+
+            doc_num = len(session.session_documents) + len(kept) + 1
+            piece["tokens"] = self.generation_client.estimate_tokens(
+                self.render_document_prompt(doc_num=doc_num, chunk_text=piece["text"])
+            ) + 1
+
+            if used_tokens + piece["tokens"] <= budget_tokens:
+                kept.append(piece)
+                used_tokens += piece["tokens"]
+            else:
+                dropped.append(piece)
+
+        if not reused and not kept:
+            evidence, context_report = context_packer.pack(
+                documents=retrieved_documents,
+                render_document=self.render_document_prompt,
+                fixed_prompts=[],
+            )
+
+            session.session_documents = [
+                { "ids": piece["ids"], "text": piece["text"], "tokens": piece["tokens"] }
+                for piece in evidence
+            ]
+            context_report["reused"] = []
+            context_report["prefix_rebuilt"] = True
+
+            session.session_cached_documents = len(session.session_documents)
+            context_report["cached_documents"] = session.session_cached_documents
+
+            return context_report
+
+        session.session_documents += [
+            { "ids": piece["ids"], "text": piece["text"], "tokens": piece["tokens"] }
+            for piece in kept
+        ]
+
+        # documents appended after the cached ones are sent after the prefix, they join
+        # the prefix once they weigh as much as it, so the prefix changes O(log) times
+        cached_tokens = sum( piece["tokens"] for piece in session.session_documents[:session.session_cached_documents] )
+        if used_tokens - cached_tokens >= cached_tokens:
+            session.session_cached_documents = len(session.session_documents)
+
+        return {
+            "budget_tokens": budget_tokens,
+            "used_tokens": used_tokens,
+            "kept": [
+                { "ids": piece["ids"], "score": piece["score"], "tokens": piece["tokens"] }
+                for piece in kept
+            ],
+            "dropped": [
+                { "ids": piece["ids"], "score": piece["score"], "tokens": piece["tokens"] }
+                for piece in dropped
+            ],
+            "reused": [
+                { "ids": piece["ids"], "score": piece["score"] }
+                for piece in reused
+            ],
+            "prefix_rebuilt": False,
+            "cached_documents": session.session_cached_documents,
+        }
+
+    def construct_session_prompt(self, session: Session, query: str,
+                                    retrieved_documents: List[RetrievedDocument]):
+        # chat history: system prompt, cached session documents (the stable prefix the
+        # provider may cache), documents appended since, summary of the older turns,
+        # recent turns. the prompt is the question only.
+        # returns the prompt, the chat history, the context report and the prefix size
+        system_prompt = self.template_parser.get("rag", "system_prompt")
+
+        footer_prompt = self.template_parser.get("rag", "footer_prompt",{
+            "query":query
+        })
+
+        context_report = self.update_session_documents(
+            session=session,
+            retrieved_documents=retrieved_documents,
+            budget_tokens=self.get_session_documents_budget(system_prompt=system_prompt,
+                                                            footer_prompt=footer_prompt),
+        )
+
+        cached_count = session.session_cached_documents
+        documents_prompts = self.render_documents_prompts(
+            texts=[ piece["text"] for piece in session.session_documents[:cached_count] ]
+        )
+
+        chat_history = [
+            self.generation_client.construct_prompt(
+                prompt=system_prompt,
+                role=self.generation_client.enums.SYSTEM.value,
+            ),
+            self.generation_client.construct_prompt(
+                prompt=documents_prompts,
+                role=self.generation_client.enums.USER.value,
+            ),
+        ]
+        prefix_size = len(chat_history)
+
+        if len(session.session_documents) > cached_count:
+            chat_history.append(self.generation_client.construct_prompt(
+                prompt=self.render_documents_prompts(
+                    texts=[ piece["text"] for piece in session.session_documents[cached_count:] ],
+                    first_doc_num=cached_count + 1,
+                ),
+                role=self.generation_client.enums.USER.value,
+            ))
+
+        if session.session_summary:
+            chat_history.append(self.generation_client.construct_prompt(
+                prompt=self.template_parser.get("rag", "summary_prompt", {
+                    "summary": session.session_summary,
+                }),
+                role=self.generation_client.enums.USER.value,
+            ))
+
+        for turn in session.session_turns:
+            role = self.generation_client.enums.USER.value
+            if turn["role"] == SessionRoleEnum.ASSISTANT.value:
+                role = self.generation_client.enums.ASSISTANT.value
+
+            chat_history.append(self.generation_client.construct_prompt(prompt=turn["content"], role=role))
+
+        return footer_prompt, chat_history, context_report, prefix_size
+
+    async def compact_session_history(self, session: Session):
+        # past the history budget the older turns are folded into the summary,
+        # the most recent turns that fit in half the budget are kept verbatim
+        history_budget = self.app_settings.SESSION_HISTORY_MAX_TOKENS
+        turns = session.session_turns
+
+        if sum( turn["tokens"] for turn in turns ) <= history_budget:
+            return False
+
+        recent_count, recent_tokens = 0, 0
+        for turn in reversed(turns):
+            if recent_count >= self.app_settings.SESSION_KEEP_RECENT_TURNS \
+                    or recent_tokens + turn["tokens"] > history_budget // 2:
+                break
+            recent_count += 1
+            recent_tokens += turn["tokens"]
+
+        # the kept turns start with a question
+        while recent_count and turns[len(turns) - recent_count]["role"] != SessionRoleEnum.USER.value:
+            recent_count -= 1
+
+        old_turns = turns[:len(turns) - recent_count]
+        recent_turns = turns[len(turns) - recent_count:]
+
+        summarize_prompt = self.template_parser.get("rag", "summarize_prompt", {
+            "summary": session.session_summary or "",
+            "conversation": "\n\n".join([ f"{turn['role']}: {turn['content']}" for turn in old_turns ]),
+        })
+
+        summary = await self.generation_client.generate_text(
+            prompt=summarize_prompt,
+            chat_history=[],
+            max_output_tokens=self.app_settings.SESSION_SUMMARY_MAX_TOKENS,
+        )
+
+        # without a new summary the old turns are dropped all the same to stay in budget
+        if summary:
+            session.session_summary = summary
+        else:
+            self.logger.warning(f"Could not summarize session {session.session_id}, older turns dropped")
+
+        session.session_turns = recent_turns
+        return True
+
+    async def save_session_turn(self, session: Session, query: str, answer: str):
+        # a write conflict means another worker saved the session first,
+        # the turn is then appended to the latest copy
+        session_id = session.session_id
+        for _ in range(2):
+            session.session_turns = session.session_turns + [
+                { "role": SessionRoleEnum.USER.value, "content": query,
+                  "tokens": self.generation_client.estimate_tokens(query) },
+                { "role": SessionRoleEnum.ASSISTANT.value, "content": answer,
+                  "tokens": self.generation_client.estimate_tokens(answer) },
+            ]
+            _ = await self.compact_session_history(session=session)
+
+            if await self.session_store.save(session=session):
+                return True
+
+            session = await self.session_store.reload(session_id=session_id)
+            if session is None:
+                break
+
+        self.logger.error(f"Could not save the turn of session {session_id}")
+        return False
+
+    async def answer_session_question(self, project: Project, session_id: str, query: str,
+                                        limit: int = 10, mode: str = None, filters: dict = None):
+        # follow-up questions only send the new documents and turns after the cached prefix
+
+        answer, full_prompt, chat_history, context_report = None, None, None, None
+
+        session = await self.load_session(project=project, session_id=session_id)
+        if session is None:
+            return answer, full_prompt, chat_history, context_report
+
+        # step1: retrieve related documents
+        retrieved_documents = await self.search_collection(
+            project=project,
+            text=query,
+            limit=limit,
+            mode=mode,
+            filters=filters,
+        )
+
+        if not retrieved_documents:
+            return answer, full_prompt, chat_history, context_report
+
+        # step2: extend the session context and build the prompt on top of its history
+        full_prompt, chat_history, context_report, prefix_size = self.construct_session_prompt(
+            session=session, query=query, retrieved_documents=retrieved_documents
+        )
+
+        # step3: retrieve the answer and save the turn
+        answer = await self.generation_client.generate_text(
+            prompt=full_prompt,
+            chat_history=chat_history,
+            prefix_size=prefix_size,
+        )
+
+        if answer:
+            _ = await self.save_session_turn(session=session, query=query, answer=answer)
+
+        return answer, full_prompt, chat_history, context_report
+
+    async def answer_rag_question(self, project: Project, query: str, limit: int = 10,
+                                    mode: str = None, filters: dict = None, session_id: str = None):
+
+        if session_id is not None:
+            async with self.session_store.lock(session_id):
+                return await self.answer_session_question(project=project, session_id=session_id,
+                                                          query=query, limit=limit, mode=mode,
+                                                          filters=filters)
+
+        # a burst of the same question costs one retrieval and one generation
+        key = None
+        if self.single_flight is not None:
+            key = self.single_flight.make_key("answer", query, {
+                "project_id": project.project_id, "limit": limit, "filters": filters,
+                "mode": mode or self.app_settings.SEARCH_DEFAULT_MODE,
+                "model_id": self.generation_client.generation_model_id,
+                "max_output_tokens": self.generation_client.default_generation_max_output_tokens,
+                "temperature": self.generation_client.default_generation_temperature,
+            })
+
+        return await self.coalesce(key=key, func=lambda: self.run_answer_rag_question(
+            project=project, query=query, limit=limit, mode=mode, filters=filters,
+        ))
+
+    async def run_answer_rag_question(self, project: Project, query: str, limit: int = 10,
+                                        mode: str = None, filters: dict = None):
+
+        answer, full_prompt, chat_history, context_report = None, None, None, None
+
+        # step0: serve near duplicate questions from the semantic answer cache,
+        # scoped questions are not cached as the cache does not key on filters
+        query_vector = None
+        use_answer_cache = self.answer_cache is not None and not filters
+        if use_answer_cache:
+            collection_name = self.create_collection_name(project_id=project.project_id)
+            answer_generation = self.answer_cache.get_generation(collection_name=collection_name)
+            answer_scope = self.get_answer_cache_scope(limit=limit, mode=mode)
+
+            query_vector = await self.embed_query(text=query)
+            if not query_vector:
+                return answer, full_prompt, chat_history, context_report
+
+            cached_answer = self.answer_cache.lookup(collection_name=collection_name,
+                                                     vector=query_vector,
+                                                     scope=answer_scope)
+            if cached_answer is not None:
+                return cached_answer["answer"], cached_answer["full_prompt"], \
+                        cached_answer["chat_history"], cached_answer.get("context_report")
+
+        # step1: retrieve related documents
+        retrieved_documents = await self.search_collection(
+            project=project,
+            text=query,
+            limit=limit,
+            mode=mode,
+            vector=query_vector,
+            filters=filters,
+        )
+
+        if not retrieved_documents or len(retrieved_documents) == 0:
+            return answer, full_prompt, chat_history, context_report
+        
+        # step2: Construct LLM prompt
+        full_prompt, chat_history, context_report = self.construct_rag_prompt(
+            query=query, retrieved_documents=retrieved_documents
+        )
+
+        # step3: Retrieve the Answer
+        answer = await self.generation_client.generate_text(
             prompt=full_prompt,
             chat_history=chat_history
         )
 
-        return answer, full_prompt, chat_history
\ No newline at end of file
+        if answer and use_answer_cache:
+            _ = self.answer_cache.add(
+                collection_name=collection_name,
+                generation=answer_generation,
+                vector=query_vector,
+                scope=answer_scope,
+                item={
+                    "answer": answer,
+                    "full_prompt": full_prompt,
+                    "chat_history": chat_history,
+                    "context_report": context_report,
+                    "chunks_ids": [ doc.id for doc in retrieved_documents ],
+                    "results": [ doc.dict() for doc in retrieved_documents ],
+                },
+            )
+
+        return answer, full_prompt, chat_history, context_report
+
+    async def answer_rag_question_stream(self, project: Project, query: str, limit: int = 10,
+                                            mode: str = None, filters: dict = None,
+                                            session_id: str = None):
+        # async generator of answer events: the retrieved documents first, then the
+        # answer deltas as the model produces them, then usage and timings.
+        # closing the generator early cancels the upstream generation
+        events = self.stream_rag_answer(project=project, query=query, limit=limit, mode=mode,
+                                        filters=filters, session_id=session_id)
+        try:
+            if session_id is None:
+                async for event in events:
+                    yield event
+            else:
+                async with self.session_store.lock(session_id):
+                    async for event in events:
+                        yield event
+        finally:
+            await events.aclose()
+
+    async def stream_rag_answer(self, project: Project, query: str, limit: int = 10,
+                                    mode: str = None, filters: dict = None, session_id: str = None):
+        start_time = time.perf_counter()
+
+        session = None
+        if session_id is not None:
+            session = await self.load_session(project=project, session_id=session_id)
+            if session is None:
+                yield { "event": StreamEventEnum.ERROR.value, "signal": ResponseSignal.RAG_ANSWER_ERROR.value }
+                return
+
+        # step0: serve near duplicate questions from the semantic answer cache,
+        # session answers depend on the conversation so they are never cached
+        query_vector = None
+        use_answer_cache = self.answer_cache is not None and not filters and session is None
+        if use_answer_cache:
+            collection_name = self.create_collection_name(project_id=project.project_id)
+            answer_generation = self.answer_cache.get_generation(collection_name=collection_name)
+            answer_scope = self.get_answer_cache_scope(limit=limit, mode=mode)
+
+            query_vector = await self.embed_query(text=query)
+            if not query_vector:
+                yield { "event": StreamEventEnum.ERROR.value, "signal": ResponseSignal.RAG_ANSWER_ERROR.value }
+                return
+
+            cached_answer = self.answer_cache.lookup(collection_name=collection_name,
+                                                     vector=query_vector,
+                                                     scope=answer_scope)
+            if cached_answer is not None:
+                # the cached answer is grounded on the documents retrieved when it was generated
+                yield {
+                    "event": StreamEventEnum.RETRIEVAL.value,
+                    "results": cached_answer.get("results") or [
+                        { "id": chunk_id } for chunk_id in cached_answer.get("chunks_ids", [])
+                    ],
+                    "context_report": cached_answer.get("context_report"),
+                }
+                yield { "event": StreamEventEnum.DELTA.value, "text": cached_answer["answer"] }
+                yield {
+                    "event": StreamEventEnum.DONE.value,
+                    "cached": True,
+                    "context_report": cached_answer.get("context_report"),
+                    "usage": None,
+                    "timings": { "total_seconds": round(time.perf_counter() - start_time, 3) },
+                }
+                return
+
+        # step1: retrieve related documents
+        retrieved_documents = await self.search_collection(
+            project=project,
+            text=query,
+            limit=limit,
+            mode=mode,
+            vector=query_vector,
+            filters=filters,
+        )
+        retrieval_seconds = time.perf_counter() - start_time
+
+        if not retrieved_documents:
+            yield { "event": StreamEventEnum.ERROR.value, "signal": ResponseSignal.VECTORDB_SEARCH_ERROR.value }
+            return
+
+        prefix_size = 0
+        if session is not None:
+            full_prompt, chat_history, context_report, prefix_size = self.construct_session_prompt(
+                session=session, query=query, retrieved_documents=retrieved_documents
+            )
+        else:
+            full_prompt, chat_history, context_report = self.construct_rag_prompt(
+                query=query, retrieved_documents=retrieved_documents
+            )
+
+        yield {
+            "event": StreamEventEnum.RETRIEVAL.value,
+            "results": [ doc.dict() for doc in retrieved_documents ],
+            "context_report": context_report,
+        }
+
+        # step2: stream the answer
+
+        answer_parts, usage, first_token_seconds = [], None, None
+        stream = self.generation_client.generate_text_stream(prompt=full_prompt,
+                                                             chat_history=chat_history,
+                                                             prefix_size=prefix_size)
+        try:
+            async for event in stream:
+                if "usage" in event:
+                    usage = event["usage"]
+                    continue
+
+                if first_token_seconds is None:
+                    first_token_seconds = time.perf_counter() - start_time
+
+                answer_parts.append(event["delta"])
+                yield { "event": StreamEventEnum.DELTA.value, "text": event["delta"] }
+
+        except Exception as e:
+            self.logger.error(f"Error while streaming the answer: {str(e)}")
+            answer_parts = []
+
+        finally:
+            await stream.aclose()
+
+        answer = "".join(answer_parts).strip()
+        if not answer:
+            yield { "event": StreamEventEnum.ERROR.value, "signal": ResponseSignal.RAG_ANSWER_ERROR.value }
+            return
+
+        if use_answer_cache:
+            _ = self.answer_cache.add(
+                collection_name=collection_name,
+                generation=answer_generation,
+                vector=query_vector,
+                scope=answer_scope,
+                item={
+                    "answer": answer,
+                    "full_prompt": full_prompt,
+                    "chat_history": chat_history,
+                    "context_report": context_report,
+                    "chunks_ids": [ doc.id for doc in retrieved_documents ],
+                    "results": [ doc.dict() for doc in retrieved_documents ],
+                },
+            )
+
+        total_seconds = time.perf_counter() - start_time
+        yield {
+            "event": StreamEventEnum.DONE.value,
+            "cached": False,
+            "usage": usage,
+            "timings": {
+                "retrieval_seconds": round(retrieval_seconds, 3),
+                "first_token_seconds": round(first_token_seconds, 3),
+                "total_seconds": round(total_seconds, 3),
+            },
+        }
+
+        # the turn is saved once the client has the whole answer
+        if session is not None:
+            _ = await self.save_session_turn(session=session, query=query, answer=answer)
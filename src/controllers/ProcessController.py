@@ -1,10 +1,15 @@
 from .BaseController import BaseController
 from .ProjectController import ProjectController
+from concurrent.futures import Executor
+import asyncio
+import logging
 import os
 from langchain_community.document_loaders import TextLoader
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from models import ProcessingEnum
+from models.enums.AssetTypeEnum import AssetTypeEnum
+from models.db_schemes import DataChunk
 
 class ProcessController(BaseController):
     
@@ -13,6 +18,7 @@ class ProcessController(BaseController):
 
         self.project_id = project_id
         self.project_path = ProjectController().get_project_path(project_id=project_id)
+        self.logger = logging.getLogger('uvicorn.error')
 
     def get_file_extention(self , file_id: str):
         return os.path.splitext(file_id)[-1]
@@ -67,5 +73,232 @@ class ProcessController(BaseController):
         )
 
         return chunks
-    
-        
\ No newline at end of file
+
+    async def get_project_files_ids(self, project, asset_model, file_id: str=None):
+        # returns {asset_id: file_id} to process, or None if file_id is unknown
+        if file_id:
+            asset_record = await asset_model.get_asset_record(
+                asset_project_id=project.id,
+                asset_name=file_id
+            )
+
+            if asset_record is None:
+                return None
+
+            return {
+                asset_record.id: asset_record.asset_name
+            }
+
+        project_files = await asset_model.get_all_project_assets(
+            asset_project_id=project.id,
+            asset_type=AssetTypeEnum.FILE.value
+        )
+
+        return {
+            record.id: record.asset_name
+            for record in project_files
+        }
+
+    def get_file_chunks(self, file_id: str, chunk_size: int=100, overlap_size: int=20):
+        file_content = self.get_file_content(file_id=file_id)
+
+        if file_content is None:
+            raise ValueError(f"Can not load file: {file_id}")
+
+        file_chunks = self.process_file_content(
+            file_content=file_content,
+            file_id=file_id,
+            chunk_size=chunk_size,
+            overlap_size=overlap_size,
+        )
+
+        if not file_chunks:
+            raise ValueError(f"No chunks extracted from file: {file_id}")
+
+        return [
+            (chunk.page_content, chunk.metadata)
+            for chunk in file_chunks
+        ]
+
+    async def process_project_files(self, project, project_files_ids: dict, chunk_model,
+                                    chunk_size: int=100, overlap_size: int=20,
+                                    executor: Executor=None, on_file_processed=None):
+        # parse and split each file, in the process pool when an executor is given
+        # or on a worker thread otherwise, and insert the chunks of every file as soon as it is done.
+        # on_file_processed(asset_id, file_id, no_chunks) is awaited after each insert
+        loop = asyncio.get_running_loop()
+
+        async def get_file_chunks(file_id: str):
+            if executor is None:
+                return await asyncio.to_thread(self.get_file_chunks, file_id=file_id,
+                                               chunk_size=chunk_size, overlap_size=overlap_size)
+
+            return await loop.run_in_executor(executor, get_file_chunks_worker,
+                                              self.project_id, file_id, chunk_size, overlap_size)
+
+        async def process_file(asset_id, file_id: str):
+            try:
+                return asset_id, file_id, await get_file_chunks(file_id=file_id), None
+            except Exception as e:
+                return asset_id, file_id, None, str(e)
+
+        tasks = [
+            process_file(asset_id=asset_id, file_id=file_id)
+            for asset_id, file_id in project_files_ids.items()
+        ]
+
+        no_records = 0
+        no_files = 0
+        failed_files = []
+
+        for next_result in asyncio.as_completed(tasks):
+            asset_id, file_id, file_chunks, error = await next_result
+
+            if error is not None:
+                self.logger.error(f"Error while processing file: {file_id}: {error}")
+                failed_files.append({ "file_id": file_id, "error": error })
+                continue
+
+            file_chunks_records = [
+                DataChunk(
+                    chunk_text=chunk_text,
+                    chunk_metadata=chunk_metadata,
+                    chunk_order=i+1,
+                    chunk_project_id=project.id,
+                    chunk_asset_id=asset_id
+                )
+                for i, (chunk_text, chunk_metadata) in enumerate(file_chunks)
+            ]
+
+            no_file_records = await chunk_model.insert_many_chunks(chunks=file_chunks_records)
+            no_records += no_file_records
+            no_files += 1
+
+            if on_file_processed is not None:
+                await on_file_processed(asset_id, file_id, no_file_records)
+
+        return no_records, no_files, failed_files
+
+
+    def iter_file_chunks(self, file_id: str, chunk_size: int=100, overlap_size: int=20):
+        # yields the chunks of one page at a time, so big files are never fully in memory
+        loader = self.get_file_loader(file_id=file_id)
+
+        if loader is None:
+            raise ValueError(f"Can not load file: {file_id}")
+
+        for page in loader.lazy_load():
+            page_chunks = self.process_file_content(
+                file_content=[page],
+                file_id=file_id,
+                chunk_size=chunk_size,
+                overlap_size=overlap_size,
+            )
+
+            if page_chunks:
+                yield page_chunks
+
+    async def ingest_file(self, project, asset_id, file_id: str, chunk_model, nlp_controller,
+                            chunk_size: int=100, overlap_size: int=20):
+        # single pass: parse page by page -> insert chunk batches -> embed and upsert
+        # the same batches. the bounded queue applies backpressure on the parser
+        batch_size = self.app_settings.INDEX_PUSH_PAGE_SIZE
+        batches_queue = asyncio.Queue(maxsize=self.app_settings.INGEST_QUEUE_SIZE)
+
+        _ = await nlp_controller.create_vector_db_collection(project=project)
+
+        # step1: parse and split pages in a thread, group chunks into batches
+        async def parse_file():
+            chunks_iterator = self.iter_file_chunks(file_id=file_id, chunk_size=chunk_size,
+                                                    overlap_size=overlap_size)
+            batch, chunk_order = [], 0
+            while True:
+                page_chunks = await asyncio.to_thread(next, chunks_iterator, None)
+                if page_chunks is None:
+                    break
+
+                for chunk in page_chunks:
+                    chunk_order += 1
+                    batch.append(DataChunk(
+                        chunk_text=chunk.page_content,
+                        chunk_metadata=chunk.metadata,
+                        chunk_order=chunk_order,
+                        chunk_project_id=project.id,
+                        chunk_asset_id=asset_id
+                    ))
+
+                    if len(batch) >= batch_size:
+                        await batches_queue.put(batch)
+                        batch = []
+
+            if batch:
+                await batches_queue.put(batch)
+
+            await batches_queue.put(None)
+
+        # step2: store each batch once, then index it straight from memory
+        indexed_chunks = []
+
+        async def index_batches():
+            inserted_chunks = 0
+            while True:
+                batch = await batches_queue.get()
+                if batch is None:
+                    return inserted_chunks
+
+                _ = await chunk_model.insert_many_chunks(chunks=batch)
+
+                vectors = await nlp_controller.embed_chunks(chunks=batch)
+                if not vectors:
+                    raise RuntimeError("Error while embedding chunks")
+
+                is_inserted = await nlp_controller.insert_chunks_into_vector_db(
+                    project=project, chunks=batch, vectors=vectors
+                )
+                if not is_inserted:
+                    raise RuntimeError("Error while inserting chunks into vector db")
+
+                _ = await chunk_model.mark_chunks_indexed(chunks=batch)
+                inserted_chunks += len(batch)
+
+                if nlp_controller.lexical_store is not None:
+                    indexed_chunks.extend(batch)
+
+        parse_task = asyncio.create_task(parse_file())
+        index_task = asyncio.create_task(index_batches())
+
+        try:
+            _, inserted_chunks = await asyncio.gather(parse_task, index_task)
+        finally:
+            for task in (parse_task, index_task):
+                if not task.done():
+                    task.cancel()
+
+        # step3: add the file chunks to the lexical index
+        _ = await nlp_controller.update_lexical_index(project=project, chunks=indexed_chunks,
+                                                      chunk_model=chunk_model)
+
+        return inserted_chunks
+
+
+    async def delete_asset(self, project, asset, asset_model, chunk_model, nlp_controller):
+        # removes an asset with everything derived from it: points, chunks, record and file
+        chunks_ids = await chunk_model.get_asset_chunks_ids(asset_id=asset.id)
+        if chunks_ids:
+            _ = await nlp_controller.delete_chunks_from_vector_db(project=project, chunks_ids=chunks_ids)
+            _ = await chunk_model.delete_chunks_by_asset_id(asset_id=asset.id)
+
+        _ = await asset_model.delete_asset(asset_id=asset.id)
+
+        file_path = os.path.join(self.project_path, asset.asset_name)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def get_file_chunks_worker(project_id: str, file_id: str, chunk_size: int, overlap_size: int):
+    # entry point for the process pool workers
+    return ProcessController(project_id=project_id).get_file_chunks(
+        file_id=file_id,
+        chunk_size=chunk_size,
+        overlap_size=overlap_size,
+    )
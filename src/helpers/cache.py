@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from array import array
+import hashlib
+import json
+import re
+import time
+
+class TTLCache:
+    # in-memory LRU cache with a time to live per entry
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        item = self.entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+class SearchCache:
+    # level 1: (model, normalized query) -> query vector
+    # level 2: (collection, generation, vector hash, limit) -> search results.
+    # bumping a collection generation makes all its cached results unreachable
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 600):
+        self.query_vectors = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.search_results = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.generations = {}
+
+    def normalize_query(self, text: str):
+        return re.sub(r"\s+", " ", text).strip().casefold()
+
+    def hash_vector(self, vector: list):
+        return hashlib.sha1(array("f", vector).tobytes()).hexdigest()
+
+    def get_generation(self, collection_name: str):
+        return self.generations.get(collection_name, 0)
+
+    def bump_generation(self, collection_name: str):
+        self.generations[collection_name] = self.get_generation(collection_name) + 1
+        return self.generations[collection_name]
+
+    def get_query_vector(self, model_id: str, text: str):
+        return self.query_vectors.get((model_id, self.normalize_query(text)))
+
+    def set_query_vector(self, model_id: str, text: str, vector: list):
+        self.query_vectors.set((model_id, self.normalize_query(text)), vector)
+
+    def make_results_key(self, collection_name: str, vector: list, limit: int, filters: dict = None,
+                            diversify: bool = False):
+        return (collection_name, self.get_generation(collection_name),
+                self.hash_vector(vector), limit,
+                json.dumps(filters, sort_keys=True) if filters else None, diversify)
+
+    def get_results(self, results_key: tuple):
+        return self.search_results.get(results_key)
+
+    def set_results(self, results_key: tuple, results: list):
+        # the key is taken before searching and writers bump the generation again once
+        # the write is done, so results that raced with a write are never served
+        self.search_results.set(results_key, results)
+
+    def get_stats(self):
+        return {
+            "query_vectors": self.query_vectors.get_stats(),
+            "search_results": self.search_results.get_stats(),
+        }
@@ -21,16 +21,100 @@ class Settings(BaseSettings):
     GENERATION_MODEL_ID: str=None 
     EMBEDDING_MODEL_ID: str = None
     EMBEDDING_MODEL_SIZE: int = None 
+    EMBEDDING_BATCH_SIZE: int = None
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "embedding_cache"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 1000000
     INPUT_DEFAULT_MAX_CHARACTERS: int = None
     GENERATION_DEFAULT_MAX_TOKENS: int = None
     GENERATION_DEFAULT_TEMPERATURE: float = None
+    GENERATION_MAX_INPUT_TOKENS: int = None
+    GENERATION_CHARS_PER_TOKEN: float = None
+    CONTEXT_MERGE_ADJACENT_CHUNKS: bool = True
+    GEMINI_CONTEXT_CACHE_ENABLED: bool = False
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: int = 4096
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS: int = 600
+
+    LLM_THREAD_POOL_SIZE: int = 32
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_READ_TIMEOUT_SECONDS: float = 60.0
+    LLM_HTTP_MAX_CONNECTIONS: int = 64
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 32
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    LLM_WARMUP_ENABLED: bool = True
+    VECTOR_DB_THREAD_POOL_SIZE: int = 1
+
+    PROCESS_POOL_SIZE: int = None
+
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_MAX_ENTRIES: int = 10000
+    SEARCH_CACHE_TTL_SECONDS: int = 600
+
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+
+    LEXICAL_INDEX_ENABLED: bool = True
+    LEXICAL_INDEX_PATH: str = "lexical_index"
+    LEXICAL_UPDATE_BATCH_SIZE: int = 5000
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    SEARCH_DEFAULT_MODE: str = "vector"
+    HYBRID_RRF_K: int = 60
+    HYBRID_CANDIDATES_MULTIPLIER: int = 4
+    SEARCH_BATCH_MAX_QUERIES: int = 100
+    RETRIEVAL_DIVERSIFY_ENABLED: bool = True
+    RETRIEVAL_CANDIDATES_MULTIPLIER: int = 4
+    RETRIEVAL_MMR_LAMBDA: float = 0.7
+    RETRIEVAL_DEDUP_THRESHOLD: float = 0.8
+
+    INDEX_PUSH_CONCURRENCY: int = 4
+    INDEX_PUSH_PAGE_SIZE: int = 50
+
+    INGEST_QUEUE_SIZE: int = 4
+
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_MAX_WAITERS: int = 1000
+
+    SESSION_CACHE_MAX_ENTRIES: int = 1000
+    SESSION_CACHE_TTL_SECONDS: int = 3600
+    SESSION_EXPIRE_SECONDS: int = 604800
+    SESSION_HISTORY_MAX_TOKENS: int = 2000
+    SESSION_KEEP_RECENT_TURNS: int = 4
+    SESSION_SUMMARY_MAX_TOKENS: int = 400
+
+    JOB_WORKERS: int = 1
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    JOB_STALE_SECONDS: int = 300
 
     VECTOR_DB_BACKEND : str
     VECTOR_DB_PATH : str
     VECTOR_DB_DISTANCE_METHOD: str = None
+    QDRANT_URL: str = None
+    QDRANT_API_KEY: str = None
+    VECTOR_DB_QUANTIZATION: str = None
+    VECTOR_DB_QUANTIZATION_ALWAYS_RAM: bool = True
+    VECTOR_DB_QUANTIZATION_RESCORE: bool = True
+    VECTOR_DB_QUANTIZATION_OVERSAMPLING: float = 2.0
+    VECTOR_DB_ON_DISK: bool = False
+    VECTOR_DB_PAYLOAD_ON_DISK: bool = False
+    VECTOR_DB_HNSW_M: int = 16
+    VECTOR_DB_HNSW_EF_CONSTRUCT: int = 100
+    VECTOR_DB_HNSW_EF: int = None
+    VECTOR_DB_EXACT_SEARCH: bool = False
+    NUMPY_VECTOR_DB_DTYPE: str = "float32"
+    IVF_PQ_NLIST: int = None
+    IVF_PQ_M: int = 96
+    IVF_PQ_NPROBE: int = 16
+    IVF_PQ_RERANK_FACTOR: int = 10
+    IVF_PQ_MIN_TRAIN_ROWS: int = 10000
+    IVF_PQ_TRAIN_SAMPLE_SIZE: int = 50000
 
     PRIMARY_LANG: str = "ar"
     DEFAULT_LANG: str = "ar"
+    TEMPLATE_HOT_RELOAD: bool = False
+    TEMPLATE_RELOAD_INTERVAL_SECONDS: float = 2.0
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,90 @@
+class ContextPacker:
+    # fits retrieved evidence into the generation input token budget.
+    # the system prompt and the question are always kept, consecutive chunks of
+    # the same asset are merged into one piece, then pieces are added by score
+    # until the budget is used and the rest is reported as dropped
+
+    def __init__(self, max_input_tokens: int, estimate_tokens, merge_adjacent: bool = True,
+                    max_overlap_characters: int = 200, min_overlap_characters: int = 5):
+        self.max_input_tokens = max_input_tokens
+        self.estimate_tokens = estimate_tokens
+        self.merge_adjacent = merge_adjacent
+        self.max_overlap_characters = max_overlap_characters
+        self.min_overlap_characters = min_overlap_characters
+
+    def merge_texts(self, text: str, next_text: str):
+        # the splitter repeats the end of a chunk at the start of the next one
+        max_overlap = min(len(text), len(next_text), self.max_overlap_characters)
+        for size in range(max_overlap, self.min_overlap_characters - 1, -1):
+            if text.endswith(next_text[:size]):
+                return text + next_text[size:]
+
+        return text + "\n" + next_text
+
+    def create_evidence(self, documents: list):
+        # evidence pieces: {"ids", "text", "score"}, ordered by score
+        if not self.merge_adjacent:
+            return sorted([
+                { "ids": [ doc.id ], "text": doc.text, "score": doc.score }
+                for doc in documents
+            ], key=lambda evidence: evidence["score"], reverse=True)
+
+        evidence = []
+        ordered = sorted(
+            [ doc for doc in documents if doc.asset_id is not None and doc.chunk_order is not None ],
+            key=lambda doc: (doc.asset_id, doc.chunk_order),
+        )
+
+        last_doc = None
+        for doc in ordered:
+            if last_doc is not None and last_doc.asset_id == doc.asset_id \
+                    and doc.chunk_order == last_doc.chunk_order + 1:
+                piece = evidence[-1]
+                piece["ids"].append(doc.id)
+                piece["text"] = self.merge_texts(piece["text"], doc.text)
+                piece["score"] = max(piece["score"], doc.score)
+            else:
+                evidence.append({ "ids": [ doc.id ], "text": doc.text, "score": doc.score })
+            last_doc = doc
+
+        evidence += [
+            { "ids": [ doc.id ], "text": doc.text, "score": doc.score }
+            for doc in documents
+            if doc.asset_id is None or doc.chunk_order is None
+        ]
+
+        return sorted(evidence, key=lambda piece: piece["score"], reverse=True)
+
+    def pack(self, documents: list, render_document, fixed_prompts: list):
+        # render_document(doc_num, text) returns the prompt of one evidence piece,
+        # fixed_prompts are always sent. returns the kept pieces and a report
+        fixed_tokens = sum( self.estimate_tokens(prompt) for prompt in fixed_prompts )
+        budget_tokens = self.max_input_tokens - fixed_tokens
+
+        kept, dropped, used_tokens = [], [], 0
+        for piece in self.create_evidence(documents):
+            # +1 for the separator between documents
+            piece_tokens = self.estimate_tokens(render_document(len(kept) + 1, piece["text"])) + 1
+
+            if used_tokens + piece_tokens <= budget_tokens:
+                kept.append(piece)
+                used_tokens += piece_tokens
+            else:
+                dropped.append(piece)
+
+            piece["tokens"] = piece_tokens
+
+        report = {
+            "budget_tokens": self.max_input_tokens,
+            "used_tokens": fixed_tokens + used_tokens,
+            "kept": [
+                { "ids": piece["ids"], "score": piece["score"], "tokens": piece["tokens"] }
+                for piece in kept
+            ],
+            "dropped": [
+                { "ids": piece["ids"], "score": piece["score"], "tokens": piece["tokens"] }
+                for piece in dropped
+            ],
+        }
+
+        return kept, report
@@ -0,0 +1,87 @@
+from stores.lexical.TextNormalizer import TextNormalizer
+import numpy as np
+
+class ResultDiversifier:
+    # post-retrieval stage over an over-fetched candidate list:
+    # near duplicate chunks of the same asset are collapsed into the best scored one,
+    # then maximal marginal relevance picks relevant results that differ from each other
+
+    def __init__(self, mmr_lambda: float = 0.7, overlap_threshold: float = 0.8):
+        self.mmr_lambda = mmr_lambda
+        self.overlap_threshold = overlap_threshold
+        self.normalizer = TextNormalizer()
+
+    def get_shingles(self, text: str):
+        tokens = self.normalizer.tokenize(text)
+        if len(tokens) < 2:
+            return set(tokens)
+        return set(zip(tokens, tokens[1:]))
+
+    def get_overlap(self, shingles: set, other_shingles: set):
+        # share of the smaller chunk found in the other one
+        if not shingles or not other_shingles:
+            return 0.0
+        return len(shingles & other_shingles) / min(len(shingles), len(other_shingles))
+
+    def deduplicate(self, results: list):
+        # results are ordered by score, the first of a duplicate group is kept
+        kept, kept_shingles = [], []
+        for doc in results:
+            shingles = self.get_shingles(doc.text)
+
+            is_duplicate = any(
+                kept_doc.asset_id == doc.asset_id
+                and self.get_overlap(shingles, other_shingles) >= self.overlap_threshold
+                for kept_doc, other_shingles in zip(kept, kept_shingles)
+            )
+
+            if not is_duplicate:
+                kept.append(doc)
+                kept_shingles.append(shingles)
+
+        return kept
+
+    def select_mmr(self, results: list, limit: int):
+        # greedy MMR over the candidates similarity matrix, returns the picked indexes.
+        # candidates without a vector only compete on relevance
+        embedding_size = max(( len(doc.vector) for doc in results if doc.vector ), default=0)
+        vectors = np.zeros((len(results), embedding_size), dtype=np.float32)
+        for i, doc in enumerate(results):
+            if doc.vector:
+                vectors[i] = doc.vector
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.maximum(norms, 1e-12)
+        similarities = vectors @ vectors.T
+
+        scores = np.array([ doc.score for doc in results ], dtype=np.float32)
+        relevance = (scores - scores.min()) / max(float(scores.max() - scores.min()), 1e-12)
+
+        selected = [ int(np.argmax(relevance)) ]
+        max_similarities = similarities[selected[0]].copy()
+        is_selected = np.zeros(len(results), dtype=bool)
+        is_selected[selected[0]] = True
+
+        while len(selected) < min(limit, len(results)):
+            mmr_scores = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * max_similarities
+            mmr_scores[is_selected] = -np.inf
+
+            idx = int(np.argmax(mmr_scores))
+            selected.append(idx)
+            is_selected[idx] = True
+            np.maximum(max_similarities, similarities[idx], out=max_similarities)
+
+        return selected
+
+    def diversify(self, results: list, limit: int):
+        if not results:
+            return results
+
+        results = self.deduplicate(results)
+        selected = self.select_mmr(results, limit=limit)
+
+        # vectors are only needed here, keep them out of caches and responses
+        return [
+            results[idx].model_copy(update={ "vector": None })
+            for idx in selected
+        ]
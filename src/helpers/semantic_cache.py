@@ -0,0 +1,88 @@
+import numpy as np
+import time
+
+class SemanticAnswerCache:
+    # per collection cache of answered questions, a new question is served from
+    # the cache when its embedding is close enough to a previous one asked with
+    # the same scope (retrieval and generation params). writers invalidate the
+    # collection before and after each write, so an answer retrieved during a
+    # write carries an old generation and is dropped by add()
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000,
+                    ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.collections = {}
+        self.generations = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def normalize_vector(self, vector: list):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def get_generation(self, collection_name: str):
+        return self.generations.get(collection_name, 0)
+
+    def invalidate(self, collection_name: str):
+        self.generations[collection_name] = self.get_generation(collection_name) + 1
+        self.collections.pop(collection_name, None)
+
+    def lookup(self, collection_name: str, vector: list, scope: str = None):
+        entry = self.collections.get(collection_name, {}).get(scope)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        # cosine similarity against every cached question in one product
+        scores = entry["vectors"] @ self.normalize_vector(vector)
+        scores[entry["expires_at"] < time.monotonic()] = -np.inf
+
+        best_idx = int(np.argmax(scores))
+        if scores[best_idx] < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry["items"][best_idx]
+
+    def add(self, collection_name: str, generation: int, vector: list, item: dict,
+                scope: str = None):
+        # answers built on an older index generation are dropped
+        if generation != self.get_generation(collection_name):
+            return False
+
+        vector = self.normalize_vector(vector)[np.newaxis, :]
+        expires_at = np.array([time.monotonic() + self.ttl_seconds])
+
+        scopes = self.collections.setdefault(collection_name, {})
+        entry = scopes.get(scope)
+        if entry is None or entry["vectors"].shape[1] != vector.shape[1]:
+            entry = { "vectors": vector, "expires_at": expires_at, "items": [item] }
+        else:
+            entry = {
+                "vectors": np.vstack([entry["vectors"], vector])[-self.max_entries:],
+                "expires_at": np.concatenate([entry["expires_at"], expires_at])[-self.max_entries:],
+                "items": (entry["items"] + [item])[-self.max_entries:],
+            }
+
+        scopes[scope] = entry
+        return True
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": sum(
+                len(entry["items"])
+                for scopes in self.collections.values()
+                for entry in scopes.values()
+            ),
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,58 @@
+from helpers.cache import TTLCache
+from contextlib import asynccontextmanager
+import asyncio
+
+class SessionStore:
+    # conversation sessions kept in mongo with an in-memory LRU in front.
+    # turns of one session are serialized by a per-session lock, writes are
+    # version checked so a stale copy never overwrites a newer one
+
+    def __init__(self, session_model, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.session_model = session_model
+        self.sessions = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        # session_id -> [lock, holders and waiters]
+        self.locks = {}
+
+    @asynccontextmanager
+    async def lock(self, session_id: str):
+        entry = self.locks.setdefault(session_id, [ asyncio.Lock(), 0 ])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.locks[session_id]
+
+    async def get(self, session_id: str):
+        # callers get their own copy, a failed save leaves the cached one untouched
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = await self.session_model.get_session(session_id=session_id)
+            if session is None:
+                return None
+            self.sessions.set(session_id, session)
+
+        return session.model_copy(deep=True)
+
+    async def reload(self, session_id: str):
+        self.sessions.entries.pop(session_id, None)
+        return await self.get(session_id=session_id)
+
+    async def save(self, session):
+        is_saved = await self.session_model.save_session(session=session)
+
+        if is_saved:
+            self.sessions.set(session.session_id, session.model_copy(deep=True))
+        else:
+            self.sessions.entries.pop(session.session_id, None)
+
+        return is_saved
+
+    async def delete(self, session_id: str):
+        self.sessions.entries.pop(session_id, None)
+        return await self.session_model.delete_session(session_id=session_id)
+
+    def get_stats(self):
+        return self.sessions.get_stats()
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import re
+
+class SingleFlight:
+    # concurrent calls with the same key share one in-flight call: the first caller
+    # starts it and every caller gets its result or its error. a call takes at most
+    # max_waiters callers, the next caller starts a new call for the key.
+    # results are shared between callers and must be treated as read-only
+
+    def __init__(self, max_waiters: int = 1000):
+        self.max_waiters = max_waiters
+        self.calls = {}
+
+        self.leaders = 0
+        self.followers = 0
+
+    @staticmethod
+    def make_key(namespace: str, text: str, params: dict = None):
+        return (
+            namespace,
+            re.sub(r"\s+", " ", text).strip().casefold(),
+            json.dumps(params or {}, sort_keys=True, default=str),
+        )
+
+    async def do(self, key: tuple, func):
+        # func() returns the awaitable of the call, it only runs for the first caller
+        call = self.calls.get(key)
+        if call is None or call["task"].done() or call["waiters"] >= self.max_waiters:
+            call = { "task": asyncio.ensure_future(func()), "waiters": 0 }
+            self.calls[key] = call
+            call["task"].add_done_callback(lambda task, call=call: self.release(key, call))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        call["waiters"] += 1
+        try:
+            # a cancelled caller must not cancel the call the others wait for
+            return await asyncio.shield(call["task"])
+        finally:
+            call["waiters"] -= 1
+            if call["waiters"] == 0 and not call["task"].done():
+                # a call being cancelled is never joined by the next caller
+                if self.calls.get(key) is call:
+                    del self.calls[key]
+                call["task"].cancel()
+
+    def release(self, key: tuple, call: dict):
+        if self.calls.get(key) is call:
+            del self.calls[key]
+
+        # the error reached the callers, or nobody is left to see it
+        if not call["task"].cancelled():
+            call["task"].exception()
+
+    def get_stats(self):
+        total = self.leaders + self.followers
+        return {
+            "calls": self.leaders,
+            "coalesced_calls": self.followers,
+            "coalesced_rate": (self.followers / total) if total else 0.0,
+            "in_flight": len(self.calls),
+            "max_waiters": self.max_waiters,
+        }
@@ -1,10 +1,24 @@
 from fastapi import FastAPI
-from routes import base, data, nlp , health
+from routes import base, data, nlp , health, jobs
 from motor.motor_asyncio import AsyncIOMotorClient
 from helpers.config import get_settings
 from stores.llm.LLMProviderFactory import LLMProviderFactory
+from stores.llm.AsyncLLMClient import AsyncLLMClient
 from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
+from stores.vectordb.AsyncVectorDBClient import AsyncVectorDBClient
 from stores.llm.templates.template_parser import TemplateParser
+from controllers import JobController
+from helpers.cache import SearchCache
+from helpers.semantic_cache import SemanticAnswerCache
+from stores.lexical import LexicalIndexStore
+from models.SessionModel import SessionModel
+from helpers.session_store import SessionStore
+from helpers.single_flight import SingleFlight
+from controllers.BaseController import BaseController
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+import asyncio
+import os
 
 app = FastAPI()
 
@@ -15,39 +29,124 @@ async def startup_span():
     app.db_client = app.mongo_conn[settings.MONGODB_DATABASE]
 
     llm_provider_factory = LLMProviderFactory(settings)
+    app.llm_provider_factory = llm_provider_factory
     vectordb_provider_factory = VectorDBProviderFactory(settings)
+
+    # thread pools that keep blocking provider calls off the event loop
+    app.llm_executor = ThreadPoolExecutor(max_workers=settings.LLM_THREAD_POOL_SIZE,
+                                          thread_name_prefix="llm")
+    app.vectordb_executor = ThreadPoolExecutor(max_workers=settings.VECTOR_DB_THREAD_POOL_SIZE,
+                                               thread_name_prefix="vectordb")
+
+    # process pool for cpu bound file parsing and chunking
+    app.process_executor = ProcessPoolExecutor(max_workers=settings.PROCESS_POOL_SIZE or os.cpu_count(),
+                                               mp_context=multiprocessing.get_context("spawn"))
     
     # generation client
-    app.generation_client = llm_provider_factory.create(provider=settings.GENERATION_BACKEND)
-    app.generation_client.set_generation_model(model_id = settings.GENERATION_MODEL_ID)
+    generation_client = llm_provider_factory.create(provider=settings.GENERATION_BACKEND)
+    generation_client.set_generation_model(model_id = settings.GENERATION_MODEL_ID)
+    app.generation_client = AsyncLLMClient(client=generation_client, executor=app.llm_executor)
 
     # embedding client
-    app.embedding_client = llm_provider_factory.create(provider=settings.EMBEDDING_BACKEND)
-    app.embedding_client.set_embedding_model(model_id=settings.EMBEDDING_MODEL_ID,
+    embedding_cache_path = None
+    if settings.EMBEDDING_CACHE_ENABLED:
+        embedding_cache_path = BaseController().get_database_path(db_name=settings.EMBEDDING_CACHE_PATH)
+
+    embedding_client = llm_provider_factory.create_embedding_client(provider=settings.EMBEDDING_BACKEND,
+                                                                    cache_path=embedding_cache_path)
+    embedding_client.set_embedding_model(model_id=settings.EMBEDDING_MODEL_ID,
                                             embedding_size=settings.EMBEDDING_MODEL_SIZE)
+    app.embedding_client = AsyncLLMClient(client=embedding_client, executor=app.llm_executor)
+
+    # first requests should not pay for connection and model setup
+    if settings.LLM_WARMUP_ENABLED:
+        await asyncio.gather(app.generation_client.warm_up(), app.embedding_client.warm_up())
 
     # vector db client 
-    app.vectordb_client = vectordb_provider_factory.create(
+    vectordb_client = vectordb_provider_factory.create(
         provider=settings.VECTOR_DB_BACKEND
     )
+    app.vectordb_client = AsyncVectorDBClient(client=vectordb_client, executor=app.vectordb_executor)
     app.vectordb_client.connect()
 
     app.template_parser = TemplateParser(
         language=settings.PRIMARY_LANG,
         default_language=settings.DEFAULT_LANG,
+        hot_reload=settings.TEMPLATE_HOT_RELOAD,
+        reload_interval_seconds=settings.TEMPLATE_RELOAD_INTERVAL_SECONDS,
+    )
+
+    app.search_cache = None
+    if settings.SEARCH_CACHE_ENABLED:
+        app.search_cache = SearchCache(
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+        )
+
+    app.answer_cache = None
+    if settings.ANSWER_CACHE_ENABLED:
+        app.answer_cache = SemanticAnswerCache(
+            threshold=settings.ANSWER_CACHE_THRESHOLD,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+        )
+
+    app.single_flight = None
+    if settings.SINGLE_FLIGHT_ENABLED:
+        app.single_flight = SingleFlight(max_waiters=settings.SINGLE_FLIGHT_MAX_WAITERS)
+
+    app.lexical_store = None
+    if settings.LEXICAL_INDEX_ENABLED:
+        app.lexical_store = LexicalIndexStore(
+            db_path=BaseController().get_database_path(db_name=settings.LEXICAL_INDEX_PATH),
+            k1=settings.BM25_K1,
+            b=settings.BM25_B,
+        )
+
+    # conversation sessions, mongo backed with the recent ones kept in memory
+    app.session_store = SessionStore(
+        session_model=await SessionModel.create_instance(db_client=app.db_client),
+        max_entries=settings.SESSION_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS,
+    )
+
+    # background workers for process and index push jobs
+    app.job_controller = JobController(
+        db_client=app.db_client,
+        vectordb_client=app.vectordb_client,
+        generation_client=app.generation_client,
+        embedding_client=app.embedding_client,
+        template_parser=app.template_parser,
+        process_executor=app.process_executor,
+        search_cache=app.search_cache,
+        answer_cache=app.answer_cache,
+        lexical_store=app.lexical_store,
     )
+    await app.job_controller.start()
 
 
 
 @app.on_event("shutdown")
 async def shutdown_span():
+    await app.job_controller.stop()
     app.mongo_conn.close()
+
+    app.llm_executor.shutdown(wait=True, cancel_futures=True)
+    app.vectordb_executor.shutdown(wait=True, cancel_futures=True)
+    app.process_executor.shutdown(wait=True, cancel_futures=True)
+
+    app.llm_provider_factory.close()
+
     app.vectordb_client.disconnect()
 
+    if hasattr(app.embedding_client, "cache"):
+        app.embedding_client.cache.close()
+
 
 
 app.include_router(base.base_router)
 app.include_router(data.data_router)
 app.include_router(nlp.nlp_router)
 app.include_router(health.health_router)
+app.include_router(jobs.jobs_router)
 
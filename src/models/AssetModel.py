@@ -2,9 +2,12 @@ from .BaseDataModel import BaseDataModel
 from .db_schemes import Asset
 from .enums.DataBaseEnum import DataBaseEnum
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
 class AssetModel(BaseDataModel):
 
+    indexes_created = False
+
     def __init__(self, db_client: object):
         super().__init__(db_client=db_client)
         self.collection = self.db_client[DataBaseEnum.COLLECTION_ASSET_NAME.value]
@@ -16,24 +19,50 @@ class AssetModel(BaseDataModel):
         return instance
 
     async def init_collection(self):
-        all_collections = await self.db_client.list_collection_names()
-        if DataBaseEnum.COLLECTION_ASSET_NAME.value not in all_collections:
-            self.collection = self.db_client[DataBaseEnum.COLLECTION_ASSET_NAME.value]
-            indexes = Asset.get_indexes()
-            for index in indexes:
-                await self.collection.create_index(
-                    index["key"],
-                    name=index["name"],
-                    unique=index["unique"]
-                )
+        # create_index is a no-op for indexes that already exist, so indexes added
+        # later are also created on existing collections. done once per process,
+        # models are created on every request
+        if type(self).indexes_created:
+            return
+
+        indexes = Asset.get_indexes()
+        for index in indexes:
+            options = { "name": index["name"], "unique": index["unique"] }
+            if index.get("partial_filter") is not None:
+                options["partialFilterExpression"] = index["partial_filter"]
+
+            try:
+                await self.collection.create_index(index["key"], **options)
+            except DuplicateKeyError:
+                raise
+            except OperationFailure:
+                # the index exists with other options (the hash index used to be non unique)
+                await self.collection.drop_index(index["name"])
+                await self.collection.create_index(index["key"], **options)
+
+        type(self).indexes_created = True
 
     async def create_asset(self, asset: Asset):
 
-        result = await self.collection.insert_one(asset.dict(by_alias=True, exclude_unset=True))
+        # None when the project already has an asset with the same hash,
+        # the unique index catches uploads of the same content that raced
+        try:
+            result = await self.collection.insert_one(asset.dict(by_alias=True, exclude_unset=True))
+        except DuplicateKeyError:
+            return None
+
         asset.id = result.inserted_id
 
         return asset
 
+    async def delete_asset(self, asset_id: ObjectId):
+
+        result = await self.collection.delete_one({
+            "_id": asset_id
+        })
+
+        return result.deleted_count
+
     async def get_all_project_assets(self, asset_project_id: str, asset_type: str):
 
         records = await self.collection.find({
@@ -53,6 +82,18 @@ class AssetModel(BaseDataModel):
             "asset_name": asset_name,
         })
 
+        if record:
+            return Asset(**record)
+        
+        return None
+
+    async def get_asset_by_hash(self, asset_project_id: str, asset_hash: str):
+
+        record = await self.collection.find_one({
+            "asset_project_id": ObjectId(asset_project_id) if isinstance(asset_project_id, str) else asset_project_id,
+            "asset_hash": asset_hash,
+        })
+
         if record:
             return Asset(**record)
         
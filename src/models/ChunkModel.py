@@ -2,11 +2,13 @@ from .BaseDataModel import BaseDataModel
 from .db_schemes import DataChunk
 from .enums.DataBaseEnum import DataBaseEnum
 from bson.objectid import ObjectId
-from pymongo import InsertOne
+from pymongo import InsertOne, UpdateOne
 
 
 class ChunkModel(BaseDataModel):
 
+    indexes_created = False
+
     def __init__(self, db_client: object):
         super().__init__(db_client=db_client)
         self.collection = self.db_client[DataBaseEnum.COLLECTION_CHUNK_NAME.value]
@@ -18,17 +20,22 @@ class ChunkModel(BaseDataModel):
         return instance
     
     async def init_collection(self):
-        all_collections = await self.db_client.list_collection_names()
-        if DataBaseEnum.COLLECTION_CHUNK_NAME.value not in all_collections:
-            self.collection = self.db_client[DataBaseEnum.COLLECTION_CHUNK_NAME.value]
-            indexes = DataChunk.get_indexes()
-            for index in indexes:
-                await self.collection.create_index(
-                    index["key"],
-                    name=index["name"],
-                    unique=index["unique"]
-                )
-            
+        # create_index is a no-op for indexes that already exist, so indexes added
+        # later are also created on existing collections. done once per process,
+        # models are created on every request
+        if type(self).indexes_created:
+            return
+
+        indexes = DataChunk.get_indexes()
+        for index in indexes:
+            await self.collection.create_index(
+                index["key"],
+                name=index["name"],
+                unique=index["unique"]
+            )
+
+        type(self).indexes_created = True
+
     async def create_chunk(self, chunk: DataChunk):
         result = await self.collection.insert_one(chunk.dict(by_alias=True, exclude_unset=True))
         chunk._id = result.inserted_id
@@ -49,6 +56,13 @@ class ChunkModel(BaseDataModel):
         for i in range(0, len(chunks), batch_size):
             batch = chunks[i:i+batch_size]
 
+            # assign ids and content hashes up front so callers can index the batch directly
+            for chunk in batch:
+                if chunk.id is None:
+                    chunk.id = ObjectId()
+                if chunk.chunk_content_hash is None:
+                    chunk.chunk_content_hash = chunk.compute_content_hash()
+
             operations = [
                 InsertOne(chunk.dict(by_alias=True, exclude_unset=True))
                 for chunk in batch
@@ -58,6 +72,27 @@ class ChunkModel(BaseDataModel):
         
         return len(chunks)
 
+    async def mark_chunks_indexed(self, chunks: list):
+        if not chunks:
+            return 0
+
+        operations = []
+        for chunk in chunks:
+            content_hash = chunk.chunk_content_hash or chunk.compute_content_hash()
+            chunk.chunk_content_hash = content_hash
+            chunk.chunk_indexed_hash = content_hash
+
+            operations.append(UpdateOne(
+                { "_id": chunk.id },
+                { "$set": {
+                    "chunk_content_hash": content_hash,
+                    "chunk_indexed_hash": content_hash,
+                } }
+            ))
+
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
     async def delete_chunks_by_project_id(self, project_id: ObjectId):
         result = await self.collection.delete_many({
             "chunk_project_id": project_id
@@ -65,14 +100,61 @@ class ChunkModel(BaseDataModel):
 
         return result.deleted_count
     
-    async def get_poject_chunks(self, project_id: ObjectId, page_no: int=1, page_size: int=50):
-        records = await self.collection.find({
-                    "chunk_project_id": project_id
-                }).skip(
-                    (page_no-1) * page_size
-                ).limit(page_size).to_list(length=None)
-
-        return [
-            DataChunk(**record)
-            for record in records
-        ]
\ No newline at end of file
+    async def delete_chunks_by_asset_id(self, asset_id: ObjectId):
+        result = await self.collection.delete_many({
+            "chunk_asset_id": asset_id
+        })
+
+        return result.deleted_count
+
+    async def get_asset_chunks_ids(self, asset_id: ObjectId):
+        records = await self.collection.find(
+            { "chunk_asset_id": asset_id }, { "_id": 1 }
+        ).to_list(length=None)
+
+        return [ record["_id"] for record in records ]
+
+    async def is_asset_indexed(self, asset_id: ObjectId):
+        # an asset is indexed when it has chunks and all of them are pushed with their current content
+        if await self.collection.find_one({ "chunk_asset_id": asset_id }, { "_id": 1 }) is None:
+            return False
+
+        unindexed_chunk = await self.collection.find_one({
+            "chunk_asset_id": asset_id,
+            "$expr": { "$ne": [ "$chunk_indexed_hash", "$chunk_content_hash" ] },
+        }, { "_id": 1 })
+
+        return unindexed_chunk is None
+
+    async def count_project_chunks(self, project_id: ObjectId):
+        return await self.collection.count_documents({
+            "chunk_project_id": project_id
+        })
+
+    async def iter_project_chunks(self, project_id: ObjectId, batch_size: int=100,
+                                    projection: list=None, after_id: ObjectId=None):
+        # keyset pagination on (chunk_project_id, _id): each batch starts after the
+        # last seen _id, so every page is an index seek instead of a growing skip
+        query = { "chunk_project_id": project_id }
+
+        while True:
+            if after_id is not None:
+                query["_id"] = { "$gt": after_id }
+
+            records = await self.collection.find(
+                query, projection
+            ).sort("_id", 1).limit(batch_size).to_list(length=None)
+
+            if not records:
+                break
+
+            after_id = records[-1]["_id"]
+
+            if projection:
+                # partial documents skip validation of the fields left out
+                yield [ DataChunk.model_construct(**record) for record in records ]
+            else:
+                yield [ DataChunk(**record) for record in records ]
+
+            if len(records) < batch_size:
+                break
@@ -0,0 +1,157 @@
+from .BaseDataModel import BaseDataModel
+from .db_schemes import Job
+from .enums.DataBaseEnum import DataBaseEnum
+from .enums.JobEnums import JobStatusEnum
+from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime
+from pymongo import ReturnDocument
+
+class JobModel(BaseDataModel):
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client=db_client)
+        self.collection = self.db_client[DataBaseEnum.COLLECTION_JOB_NAME.value]
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client)
+        await instance.init_collection()
+        return instance
+
+    async def init_collection(self):
+        all_collections = await self.db_client.list_collection_names()
+        if DataBaseEnum.COLLECTION_JOB_NAME.value not in all_collections:
+            self.collection = self.db_client[DataBaseEnum.COLLECTION_JOB_NAME.value]
+            indexes = Job.get_indexes()
+            for index in indexes:
+                await self.collection.create_index(
+                    index["key"],
+                    name=index["name"],
+                    unique=index["unique"]
+                )
+
+    async def create_job(self, job: Job):
+
+        result = await self.collection.insert_one(job.dict(by_alias=True, exclude_unset=True))
+        job.id = result.inserted_id
+
+        return job
+
+    async def get_job(self, job_id: str):
+
+        try:
+            job_object_id = ObjectId(job_id) if isinstance(job_id, str) else job_id
+        except InvalidId:
+            return None
+
+        record = await self.collection.find_one({
+            "_id": job_object_id
+        })
+
+        if record:
+            return Job(**record)
+
+        return None
+
+    async def claim_next_job(self, worker_id: str, stale_before: datetime):
+        # take the oldest pending job, or a running job whose worker stopped sending heartbeats
+        now = datetime.utcnow()
+        record = await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    { "job_status": JobStatusEnum.PENDING.value },
+                    {
+                        "job_status": JobStatusEnum.RUNNING.value,
+                        "job_heartbeat_at": { "$lt": stale_before },
+                    },
+                ]
+            },
+            {
+                "$set": {
+                    "job_status": JobStatusEnum.RUNNING.value,
+                    "job_worker_id": worker_id,
+                    "job_heartbeat_at": now,
+                    "job_updated_at": now,
+                },
+                "$inc": { "job_attempts": 1 },
+            },
+            sort=[ ("job_created_at", 1) ],
+            return_document=ReturnDocument.AFTER,
+        )
+
+        if record:
+            return Job(**record)
+
+        return None
+
+    async def update_job(self, job_id: ObjectId, worker_id: str, fields: dict):
+
+        # only the worker that holds the job can update it, a stale worker whose job
+        # was claimed again by another one matches nothing
+        result = await self.collection.update_one(
+            { "_id": job_id, "job_worker_id": worker_id },
+            { "$set": { **fields, "job_updated_at": datetime.utcnow() } }
+        )
+
+        return result.matched_count
+
+    async def send_heartbeat(self, job_id: ObjectId, worker_id: str):
+
+        result = await self.collection.update_one(
+            { "_id": job_id, "job_worker_id": worker_id },
+            { "$set": { "job_heartbeat_at": datetime.utcnow() } }
+        )
+
+        return result.modified_count
+
+    async def is_cancel_requested(self, job_id: ObjectId):
+
+        record = await self.collection.find_one(
+            { "_id": job_id },
+            { "job_cancel_requested": 1 }
+        )
+
+        return bool(record and record.get("job_cancel_requested"))
+
+    async def request_cancel(self, job_id: ObjectId):
+
+        # pending jobs are cancelled right away, running jobs stop at their next checkpoint
+        result = await self.collection.update_one(
+            { "_id": job_id, "job_status": JobStatusEnum.PENDING.value },
+            { "$set": {
+                "job_status": JobStatusEnum.CANCELLED.value,
+                "job_cancel_requested": True,
+                "job_updated_at": datetime.utcnow(),
+            } }
+        )
+
+        if result.modified_count:
+            return True
+
+        result = await self.collection.update_one(
+            { "_id": job_id, "job_status": JobStatusEnum.RUNNING.value },
+            { "$set": {
+                "job_cancel_requested": True,
+                "job_updated_at": datetime.utcnow(),
+            } }
+        )
+
+        return result.modified_count > 0
+
+    async def release_worker_jobs(self, worker_ids: list):
+
+        # put jobs of stopped workers back in the queue so they resume from their checkpoint
+        result = await self.collection.update_many(
+            {
+                "job_status": JobStatusEnum.RUNNING.value,
+                "job_worker_id": { "$in": worker_ids },
+            },
+            { "$set": {
+                "job_status": JobStatusEnum.PENDING.value,
+                "job_worker_id": None,
+                "job_updated_at": datetime.utcnow(),
+            } }
+        )
+
+        return result.modified_count
@@ -1,6 +1,7 @@
 from .BaseDataModel import BaseDataModel
 from .db_schemes import Project
 from .enums.DataBaseEnum import DataBaseEnum
+from pymongo import ReturnDocument
 
 
 class ProjectModel(BaseDataModel):
@@ -49,6 +50,27 @@ class ProjectModel(BaseDataModel):
 
 
 
+    async def update_project_vector_config(self, project_id: str, vector_config: dict):
+        # per project overrides of the vector db collection and search settings,
+        # only the given keys are set so earlier overrides are kept
+        if not vector_config:
+            record = await self.collection.find_one({ "project_id": project_id })
+            return Project(**record) if record is not None else None
+
+        record = await self.collection.find_one_and_update(
+            { "project_id": project_id },
+            { "$set": {
+                f"project_vector_config.{key}": value
+                for key, value in vector_config.items()
+            } },
+            return_document=ReturnDocument.AFTER,
+        )
+
+        if record is None:
+            return None
+
+        return Project(**record)
+
     async def get_all_projects(self , page: int=1 , page_size: int=10):
 
         # count total number of document
@@ -0,0 +1,94 @@
+from .BaseDataModel import BaseDataModel
+from .db_schemes import Session
+from .enums.DataBaseEnum import DataBaseEnum
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+class SessionModel(BaseDataModel):
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client=db_client)
+        self.collection = self.db_client[DataBaseEnum.COLLECTION_SESSION_NAME.value]
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client)
+        await instance.init_collection()
+        return instance
+
+    async def init_collection(self):
+        # create_index is a no-op for indexes that already exist
+        indexes = Session.get_indexes()
+        for index in indexes:
+            await self.collection.create_index(
+                index["key"],
+                name=index["name"],
+                unique=index["unique"]
+            )
+
+        # mongo removes the sessions not updated for SESSION_EXPIRE_SECONDS
+        expire_after_seconds = self.app_settings.SESSION_EXPIRE_SECONDS
+        try:
+            await self.collection.create_index(
+                [ ("session_updated_at", 1) ],
+                name="session_updated_at_ttl_index_1",
+                expireAfterSeconds=expire_after_seconds,
+            )
+        except OperationFailure:
+            # the index exists with another expiry
+            await self.db_client.command(
+                "collMod", DataBaseEnum.COLLECTION_SESSION_NAME.value,
+                index={ "name": "session_updated_at_ttl_index_1", "expireAfterSeconds": expire_after_seconds },
+            )
+
+    async def get_session(self, session_id: str):
+
+        record = await self.collection.find_one({
+            "session_id": session_id
+        })
+
+        if record:
+            return Session(**record)
+
+        return None
+
+    async def save_session(self, session: Session):
+
+        # optimistic concurrency: the write only applies on top of the version that was read,
+        # False means another writer saved the session first
+        session.session_updated_at = datetime.utcnow()
+
+        if session.id is None:
+            try:
+                result = await self.collection.insert_one(session.dict(by_alias=True, exclude={"id"}))
+            except DuplicateKeyError:
+                return False
+
+            session.id = result.inserted_id
+            return True
+
+        result = await self.collection.update_one(
+            { "_id": session.id, "session_version": session.session_version },
+            { "$set": {
+                "session_documents": session.session_documents,
+                "session_cached_documents": session.session_cached_documents,
+                "session_turns": session.session_turns,
+                "session_summary": session.session_summary,
+                "session_version": session.session_version + 1,
+                "session_updated_at": session.session_updated_at,
+            } }
+        )
+
+        if result.modified_count == 0:
+            return False
+
+        session.session_version += 1
+        return True
+
+    async def delete_session(self, session_id: str):
+
+        result = await self.collection.delete_one({
+            "session_id": session_id
+        })
+
+        return result.deleted_count > 0
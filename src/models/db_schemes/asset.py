@@ -11,6 +11,7 @@ class Asset(BaseModel):
     asset_name:str = Field(..., min_length=1)
     asset_size: int = Field(ge=0, default=None)
     asset_config: Optional[dict] = Field(default=None)
+    asset_hash: Optional[str] = Field(default=None)
     asset_pushed_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -40,4 +41,14 @@ class Asset(BaseModel):
                 "name": "asset_project_id_name_index_1",
                 "unique": True
             },
+            {
+                "key": [
+                    ("asset_project_id", 1),
+                    ("asset_hash", 1)
+                ],
+                "name": "asset_project_id_hash_index_1",
+                "unique": True,
+                # assets stored before hashing have no hash
+                "partial_filter": { "asset_hash": { "$type": "string" } }
+            },
         ]
\ No newline at end of file
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Optional, List
 from bson.objectid import ObjectId
+import hashlib
+import json
 
 class DataChunk(BaseModel):
     id: Optional[ObjectId] = Field(None, alias="_id")
@@ -9,6 +11,8 @@ class DataChunk(BaseModel):
     chunk_order: int = Field(..., gt=0)
     chunk_project_id: ObjectId
     chunk_asset_id: ObjectId
+    chunk_content_hash: Optional[str] = Field(default=None)
+    chunk_indexed_hash: Optional[str] = Field(default=None)
     
     model_config = {
         "arbitrary_types_allowed": True,
@@ -17,18 +21,41 @@ class DataChunk(BaseModel):
         }
     }
     
+    def compute_content_hash(self):
+        raw_content = json.dumps([self.chunk_text, self.chunk_metadata],
+                                 ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw_content.encode("utf-8")).hexdigest()
+
+    def is_indexed(self):
+        # indexed when the pushed content hash matches the current content
+        content_hash = self.chunk_content_hash or self.compute_content_hash()
+        return self.chunk_indexed_hash == content_hash
+
     @classmethod
     def get_indexes(cls):
         return [
             {
                 "key":[
-                    ("chunk_project_id",1)
+                    ("chunk_project_id",1),
+                    ("_id",1)
+                ],
+                "name": "chunk_project_id_id_index_1",
+                "unique":False
+            },
+            {
+                "key":[
+                    ("chunk_asset_id",1)
                 ],
-                "name": "chunk_project_id_index_1",
+                "name": "chunk_asset_id_index_1",
                 "unique":False
             }
         ]
         
 class RetrievedDocument(BaseModel):
+    id: Optional[str] = None
     text: str
-    score: float
\ No newline at end of file
+    score: float
+    # used by post-retrieval stages, never serialized
+    asset_id: Optional[str] = Field(default=None, exclude=True)
+    chunk_order: Optional[int] = Field(default=None, exclude=True)
+    vector: Optional[List[float]] = Field(default=None, exclude=True)
\ No newline at end of file
@@ -0,0 +1,50 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from bson.objectid import ObjectId
+from datetime import datetime
+
+
+class Job(BaseModel):
+    id: Optional[ObjectId] = Field(None, alias="_id")
+    job_type: str = Field(..., min_length=1)
+    job_project_id: str = Field(..., min_length=1)
+    job_params: dict = Field(default_factory=dict)
+    job_status: str = Field(..., min_length=1)
+    job_progress: dict = Field(default_factory=dict)
+    job_checkpoint: dict = Field(default_factory=dict)
+    job_result: Optional[dict] = Field(default=None)
+    job_error: Optional[str] = Field(default=None)
+    job_cancel_requested: bool = Field(default=False)
+    job_worker_id: Optional[str] = Field(default=None)
+    job_attempts: int = Field(ge=0, default=0)
+    job_heartbeat_at: Optional[datetime] = Field(default=None)
+    job_created_at: datetime = Field(default_factory=datetime.utcnow)
+    job_updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    model_config = {
+        "arbitrary_types_allowed": True,
+        "json_encoders": {
+            ObjectId: str
+        }
+    }
+
+    @classmethod
+    def get_indexes(cls):
+
+        return [
+            {
+                "key": [
+                    ("job_status", 1),
+                    ("job_created_at", 1)
+                ],
+                "name": "job_status_created_at_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("job_project_id", 1)
+                ],
+                "name": "job_project_id_index_1",
+                "unique": False
+            },
+        ]
@@ -6,6 +6,7 @@ from bson.objectid import ObjectId
 class Project(BaseModel):
     id: Optional[ObjectId] = Field(default=None, alias="_id")
     project_id: str = Field(..., min_length=1)
+    project_vector_config: Optional[dict] = None
 
     @validator('project_id')
     def validate_project_id(cls, value):
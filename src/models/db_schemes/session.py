@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from bson.objectid import ObjectId
+from datetime import datetime
+
+
+class Session(BaseModel):
+    id: Optional[ObjectId] = Field(None, alias="_id")
+    session_id: str = Field(..., min_length=1)
+    session_project_id: str = Field(..., min_length=1)
+    # append-only evidence sent after the system prompt: {"ids", "text", "tokens"}
+    session_documents: list = Field(default_factory=list)
+    # leading documents sent as the cached prompt prefix, the others follow it
+    session_cached_documents: int = Field(ge=0, default=0)
+    # turns after the summary: {"role", "content", "tokens"}
+    session_turns: list = Field(default_factory=list)
+    session_summary: Optional[str] = Field(default=None)
+    session_version: int = Field(ge=0, default=0)
+    session_created_at: datetime = Field(default_factory=datetime.utcnow)
+    session_updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    model_config = {
+        "arbitrary_types_allowed": True,
+        "json_encoders": {
+            ObjectId: str
+        }
+    }
+
+    @classmethod
+    def get_indexes(cls):
+
+        return [
+            {
+                "key": [
+                    ("session_id", 1)
+                ],
+                "name": "session_id_index_1",
+                "unique": True
+            },
+            {
+                "key": [
+                    ("session_project_id", 1)
+                ],
+                "name": "session_project_id_index_1",
+                "unique": False
+            },
+        ]
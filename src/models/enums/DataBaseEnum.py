@@ -4,4 +4,6 @@ class DataBaseEnum(Enum):
 
     COLLECTION_PROJECT_NAME = "projects"
     COLLECTION_CHUNK_NAME = "chunks"
-    COLLECTION_ASSET_NAME = "assets"
\ No newline at end of file
+    COLLECTION_ASSET_NAME = "assets"
+    COLLECTION_JOB_NAME = "jobs"
+    COLLECTION_SESSION_NAME = "sessions"
\ No newline at end of file
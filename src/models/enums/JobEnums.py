@@ -0,0 +1,14 @@
+from enum import Enum
+
+class JobTypeEnum(Enum):
+
+    PROCESS = "process"
+    INDEX_PUSH = "index_push"
+
+class JobStatusEnum(Enum):
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
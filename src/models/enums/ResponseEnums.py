@@ -7,8 +7,11 @@ class ResponseSignal(Enum):
     FILE_SIZE_EXCEEDED = "File size exceeded the limit"
     FILE_UPLOAD_SUCCESS = "File uploaded successfully"
     FILE_UPLOAD_FAILED = "File upload failed"
+    FILE_ALREADY_UPLOADED = "File already uploaded"
     PROCESSING_SUCCESS = "File processing successful"
     PROCESSING_FAILED = "File processing failed"
+    INGEST_SUCCESS = "File ingested successfully"
+    INGEST_FAILED = "File ingestion failed"
     NO_FILES_ERROR = "not_found_files"
     FILE_ID_ERROR = "no_file_found_with_this_id"
     PROJECT_NOT_FOUND_ERROR = "project_not_found"
@@ -17,5 +20,24 @@ class ResponseSignal(Enum):
     VECTORDB_COLLECTION_RETRIEVED = "vectordb_collection_retrieved"
     VECTORDB_SEARCH_ERROR = "vectordb_search_error"
     VECTORDB_SEARCH_SUCCESS = "vectordb_search_success"
+    SEARCH_MODE_NOT_SUPPORTED = "search_mode_not_supported"
+    SEARCH_BATCH_SIZE_EXCEEDED = "search_batch_size_exceeded"
     RAG_ANSWER_ERROR = "rag_answer_error"
-    RAG_ANSWER_SUCCESS = "rag_answer_success"
\ No newline at end of file
+    RAG_ANSWER_SUCCESS = "rag_answer_success"
+    STREAM_FORMAT_NOT_SUPPORTED = "stream_format_not_supported"
+    SESSION_RETRIEVED = "session_retrieved"
+    SESSION_NOT_FOUND = "session_not_found"
+    SESSION_DELETED = "session_deleted"
+    JOB_SUBMITTED = "job_submitted"
+    JOB_RETRIEVED = "job_retrieved"
+    JOB_NOT_FOUND = "job_not_found"
+    JOB_CANCEL_REQUESTED = "job_cancel_requested"
+    JOB_CANCEL_FAILED = "job_cancel_failed"
+    SEARCH_CACHE_STATS_RETRIEVED = "search_cache_stats_retrieved"
+    SEARCH_CACHE_DISABLED = "search_cache_disabled"
+    ANSWER_CACHE_STATS_RETRIEVED = "answer_cache_stats_retrieved"
+    ANSWER_CACHE_DISABLED = "answer_cache_disabled"
+    SINGLE_FLIGHT_STATS_RETRIEVED = "single_flight_stats_retrieved"
+    SINGLE_FLIGHT_DISABLED = "single_flight_disabled"
+    EMBEDDING_CACHE_STATS_RETRIEVED = "embedding_cache_stats_retrieved"
+    EMBEDDING_CACHE_DISABLED = "embedding_cache_disabled"
\ No newline at end of file
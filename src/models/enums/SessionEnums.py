@@ -0,0 +1,6 @@
+from enum import Enum
+
+class SessionRoleEnum(Enum):
+
+    USER = "user"
+    ASSISTANT = "assistant"
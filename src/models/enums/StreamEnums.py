@@ -0,0 +1,13 @@
+from enum import Enum
+
+class StreamFormatEnum(Enum):
+
+    SSE = "sse"
+    NDJSON = "ndjson"
+
+class StreamEventEnum(Enum):
+
+    RETRIEVAL = "retrieval"
+    DELTA = "delta"
+    DONE = "done"
+    ERROR = "error"
@@ -2,8 +2,8 @@ from fastapi import FastAPI, APIRouter,Depends, UploadFile , status , Request
 from fastapi.responses import JSONResponse
 import os 
 from helpers.config import get_settings , Settings 
-from controllers import DataController , ProjectController , ProcessController
-import aiofiles
+from controllers import DataController , ProjectController , ProcessController, NLPController
+import time
 from models import ResponseSignal
 import logging
 from .schemes.data import ProcessRequest
@@ -20,6 +20,22 @@ data_router = APIRouter(
     tags=["api_v1","data"]
 )
 
+async def already_uploaded_response(asset_model: AssetModel, project, upload: dict):
+    # another request stored the same content first, this copy is dropped
+    os.remove(upload["file_path"])
+
+    existing_asset = await asset_model.get_asset_by_hash(
+        asset_project_id=project.id,
+        asset_hash=upload["file_hash"]
+    )
+
+    return JSONResponse(
+        content={
+            "Signal": ResponseSignal.FILE_ALREADY_UPLOADED.value,
+            "FileId": str(existing_asset.id) if existing_asset is not None else None,
+        }
+    )
+
 @data_router.post("/upload/{project_id}")
 async def upload_data(request: Request ,project_id: str , file:UploadFile,
                       app_settings:Settings = Depends(get_settings)):
@@ -31,51 +47,51 @@ async def upload_data(request: Request ,project_id: str , file:UploadFile,
     project = await project_model.get_project_or_create(
         project_id = project_id
     )
-    # Validate the file properties
+
+    asset_model = await AssetModel.create_instance(
+        db_client = request.app.db_client
+    )
+
+    # validate, store and hash the file
     data_controller = DataController()
-    is_valid , result_signal = data_controller.validate_file_properties(file=file)
+    is_stored, result_signal, upload = await data_controller.store_upload_file(
+        file=file,
+        project=project,
+        asset_model=asset_model
+    )
 
-    if not is_valid:
+    if not is_stored:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"Signal": result_signal}
         )
-    
 
-    # Get the project path
-    project_dir_path = ProjectController().get_project_path(project_id=project_id)
-    file_path , file_id= data_controller.generate_unique_filepath(
-        orig_file_name=file.filename,
-        project_id=project_id
-    )
-
-    try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            while chunk := await file.read(app_settings.FILE_DEFAULT_CHUNK_SIZE):
-                await f.write(chunk)
+    # identical content is stored, processed and embedded only once per project
+    existing_asset = upload["existing_asset"]
 
-    except Exception as e:
+    if existing_asset is not None:
+        os.remove(upload["file_path"])
 
-        logger.error(f"Error while uploading file : {e}")
-        
         return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content={"Signal": ResponseSignal.FILE_UPLOAD_FAILED.value }
+            content={
+                "Signal": ResponseSignal.FILE_ALREADY_UPLOADED.value,
+                "FileId": str(existing_asset.id),
+            }
         )
-
-    #restore the assets into the database
-    asset_model = await AssetModel.create_instance(
-        db_client = request.app.db_client
-    )
     
+    #restore the assets into the database
     asset_resource = Asset(
         asset_project_id=project.id,
         asset_type=AssetTypeEnum.FILE.value,
-        asset_name=file_id,
-        asset_size=os.path.getsize(file_path)
+        asset_name=upload["file_id"],
+        asset_size=os.path.getsize(upload["file_path"]),
+        asset_hash=upload["file_hash"]
     )
     
     asset_record = await asset_model.create_asset(asset=asset_resource)
+
+    if asset_record is None:
+        return await already_uploaded_response(asset_model=asset_model, project=project, upload=upload)
     
     return JSONResponse(
             content={
@@ -104,37 +120,22 @@ async def process_endpoint(request: Request,project_id:str , process_request: Pr
             db_client = request.app.db_client
             )
     
-    project_files_ids = {}
-    if process_request.file_id:
-        asset_record = await asset_model.get_asset_record(
-            asset_project_id = project.id,
-            asset_name = process_request.file_id
-        )
-        
-        if asset_record is None :
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={
-                    "Signal": ResponseSignal.FILE_ID_ERROR.value,
-                }
-            )
-            
-        project_files_ids = {
-            asset_record.id: asset_record.asset_name
-        }
-        
-    else:
-        project_files = await asset_model.get_all_project_assets(
-            asset_project_id = project.id,
-            asset_type = AssetTypeEnum.FILE.value
+    process_controller = ProcessController(project_id=project_id)
+
+    project_files_ids = await process_controller.get_project_files_ids(
+        project=project,
+        asset_model=asset_model,
+        file_id=process_request.file_id
+    )
+
+    if project_files_ids is None :
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "Signal": ResponseSignal.FILE_ID_ERROR.value,
+            }
         )
         
-        project_files_ids = {
-            record.id: record.asset_name
-            for record in project_files
-        }
-        
-        
     if len(project_files_ids) == 0 :
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -143,11 +144,6 @@ async def process_endpoint(request: Request,project_id:str , process_request: Pr
                 }
             )
     
-    process_controller = ProcessController(project_id=project_id)
-
-    no_records = 0 
-    no_files = 0 
-    
     chunk_model = await ChunkModel.create_instance(db_client= request.app.db_client
         )
     
@@ -156,48 +152,150 @@ async def process_endpoint(request: Request,project_id:str , process_request: Pr
             project_id= project.id
             )
         
-    for asset_id , file_id in project_files_ids.items() :
-        
-        file_content = process_controller.get_file_content(file_id=file_id)
-        
-        
-        if file_content is None :
-            logger.error(f"Error while processing file: {file_id}")
-            continue
+    no_records, no_files, failed_files = await process_controller.process_project_files(
+        project=project,
+        project_files_ids=project_files_ids,
+        chunk_model=chunk_model,
+        chunk_size=chunk_size,
+        overlap_size=overlap,
+        executor=request.app.process_executor if process_request.parallel == 1 else None,
+    )
+
+    if no_files == 0:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "Signal": ResponseSignal.PROCESSING_FAILED.value,
+                "failed_files": failed_files
+            }
+        )
         
-        file_chunks = process_controller.process_file_content(
-            file_content=file_content,
-            file_id=file_id,
-            chunk_size=chunk_size,
-            overlap_size=overlap
+    return JSONResponse(
+        content={
+            "Signal": ResponseSignal.PROCESSING_SUCCESS.value,
+            "inserted_chunks": no_records,
+            "processed_files" : no_files,
+            "failed_files": failed_files
+        }
+    )
+
+
+@data_router.post("/ingest/{project_id}")
+async def ingest_endpoint(request: Request, project_id: str, file: UploadFile,
+                          chunk_size: int = 100, overlap: int = 20):
+    # upload -> parse -> chunk -> embed -> upsert in one pass over the file
+
+    start_time = time.perf_counter()
+
+    project_model = await ProjectModel.create_instance(
+        db_client = request.app.db_client
+    )
+    
+    project = await project_model.get_project_or_create(
+        project_id = project_id
+    )
+
+    asset_model = await AssetModel.create_instance(
+        db_client = request.app.db_client
+    )
+
+    chunk_model = await ChunkModel.create_instance(
+        db_client = request.app.db_client
+    )
+
+    data_controller = DataController()
+    is_stored, result_signal, upload = await data_controller.store_upload_file(
+        file=file,
+        project=project,
+        asset_model=asset_model
+    )
+
+    if not is_stored:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"Signal": result_signal}
         )
 
-        if file_chunks is None or len(file_chunks) == 0:
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser,
+        search_cache=request.app.search_cache,
+        answer_cache=request.app.answer_cache,
+        lexical_store=request.app.lexical_store,
+    )
+    process_controller = ProcessController(project_id=project_id)
+
+    existing_asset = upload["existing_asset"]
+
+    if existing_asset is not None:
+        if await chunk_model.is_asset_indexed(asset_id=existing_asset.id):
+            os.remove(upload["file_path"])
+
             return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
                 content={
-                    "Signal": ResponseSignal.PROCESSING_FAILED.value
+                    "Signal": ResponseSignal.FILE_ALREADY_UPLOADED.value,
+                    "FileId": str(existing_asset.id),
                 }
             )
-        
-        file_chunks_records = [
-            DataChunk(
-                chunk_text= chunk.page_content,
-                chunk_metadata= chunk.metadata,
-                chunk_order = i+1,
-                chunk_project_id= project.id,
-                chunk_asset_id = asset_id
-            )
-            for i , chunk in enumerate(file_chunks)
-        ]
-        
-        no_records += await chunk_model.insert_many_chunks(chunks=file_chunks_records )
-        no_files +=1
-        
+
+        # only uploaded or left over by a failed ingest, replaced by this upload
+        await process_controller.delete_asset(
+            project=project,
+            asset=existing_asset,
+            asset_model=asset_model,
+            chunk_model=chunk_model,
+            nlp_controller=nlp_controller,
+        )
+
+    asset_record = await asset_model.create_asset(asset=Asset(
+        asset_project_id=project.id,
+        asset_type=AssetTypeEnum.FILE.value,
+        asset_name=upload["file_id"],
+        asset_size=os.path.getsize(upload["file_path"]),
+        asset_hash=upload["file_hash"]
+    ))
+
+    if asset_record is None:
+        return await already_uploaded_response(asset_model=asset_model, project=project, upload=upload)
+
+    try:
+        inserted_chunks = await process_controller.ingest_file(
+            project=project,
+            asset_id=asset_record.id,
+            file_id=upload["file_id"],
+            chunk_model=chunk_model,
+            nlp_controller=nlp_controller,
+            chunk_size=chunk_size,
+            overlap_size=overlap,
+        )
+    except Exception as e:
+        logger.error(f"Error while ingesting file {upload['file_id']}: {e}")
+
+        # nothing of a failed ingest is kept, so the same file can be sent again
+        await process_controller.delete_asset(
+            project=project,
+            asset=asset_record,
+            asset_model=asset_model,
+            chunk_model=chunk_model,
+            nlp_controller=nlp_controller,
+        )
+
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "Signal": ResponseSignal.INGEST_FAILED.value,
+            }
+        )
+
+    elapsed_seconds = time.perf_counter() - start_time
+
     return JSONResponse(
         content={
-            "Signal": ResponseSignal.PROCESSING_SUCCESS.value,
-            "inserted_chunks": no_records,
-            "processed_files" : no_files
+            "Signal": ResponseSignal.INGEST_SUCCESS.value,
+            "FileId": str(asset_record.id),
+            "inserted_chunks": inserted_chunks,
+            "elapsed_seconds": round(elapsed_seconds, 3),
         }
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,112 @@
+from fastapi import APIRouter, status, Request
+from fastapi.responses import JSONResponse
+from routes.schemes.data import ProcessRequest
+from routes.schemes.nlp import PushRequest
+from models.db_schemes import Job
+from models.enums.JobEnums import JobTypeEnum
+from models import ResponseSignal
+
+import logging
+
+logger = logging.getLogger('uvicorn.error')
+
+jobs_router = APIRouter(
+    prefix="/api/v1/jobs",
+    tags=["api_v1", "jobs"],
+)
+
+def serialize_job(job: Job):
+    return {
+        "job_id": str(job.id),
+        "job_type": job.job_type,
+        "project_id": job.job_project_id,
+        "status": job.job_status,
+        "progress": job.job_progress,
+        "result": job.job_result,
+        "error": job.job_error,
+        "attempts": job.job_attempts,
+        "created_at": job.job_created_at.isoformat() + "Z",
+        "updated_at": job.job_updated_at.isoformat() + "Z",
+    }
+
+@jobs_router.post("/process/{project_id}")
+async def submit_process_job(request: Request, project_id: str, process_request: ProcessRequest):
+
+    job = await request.app.job_controller.submit_job(
+        job_type=JobTypeEnum.PROCESS.value,
+        project_id=project_id,
+        job_params=process_request.dict(),
+    )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.JOB_SUBMITTED.value,
+            "job_id": str(job.id)
+        }
+    )
+
+@jobs_router.post("/index/push/{project_id}")
+async def submit_index_push_job(request: Request, project_id: str, push_request: PushRequest):
+
+    job = await request.app.job_controller.submit_job(
+        job_type=JobTypeEnum.INDEX_PUSH.value,
+        project_id=project_id,
+        job_params=push_request.dict(),
+    )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.JOB_SUBMITTED.value,
+            "job_id": str(job.id)
+        }
+    )
+
+@jobs_router.get("/{job_id}")
+async def get_job_status(request: Request, job_id: str):
+
+    job = await request.app.job_controller.get_job(job_id=job_id)
+
+    if job is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "signal": ResponseSignal.JOB_NOT_FOUND.value
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.JOB_RETRIEVED.value,
+            "job": serialize_job(job)
+        }
+    )
+
+@jobs_router.post("/{job_id}/cancel")
+async def cancel_job(request: Request, job_id: str):
+
+    job = await request.app.job_controller.get_job(job_id=job_id)
+
+    if job is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "signal": ResponseSignal.JOB_NOT_FOUND.value
+            }
+        )
+
+    is_cancelled = await request.app.job_controller.cancel_job(job=job)
+
+    if not is_cancelled:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.JOB_CANCEL_FAILED.value,
+                "status": job.job_status
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.JOB_CANCEL_REQUESTED.value
+        }
+    )
@@ -1,12 +1,16 @@
-from fastapi import FastAPI, APIRouter, status, Request
-from fastapi.responses import JSONResponse
-from routes.schemes.nlp import PushRequest, SearchRequest
+from fastapi import FastAPI, APIRouter, Depends, status, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from routes.schemes.nlp import PushRequest, SearchRequest, SearchBatchRequest, AnswerRequest, AnswerStreamRequest
 from models.ProjectModel import ProjectModel
 from models.ChunkModel import ChunkModel
 from controllers import NLPController
 from models import ResponseSignal
+from helpers.config import get_settings, Settings
+from stores.lexical import SearchModeEnum
+from models.enums.StreamEnums import StreamFormatEnum
 
 import logging
+import json
 
 logger = logging.getLogger('uvicorn.error')
 
@@ -43,46 +47,37 @@ async def index_project(request: Request, project_id: str, push_request: PushReq
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
         template_parser=request.app.template_parser,
+        search_cache=request.app.search_cache,
+        answer_cache=request.app.answer_cache,
+        lexical_store=request.app.lexical_store,
     )
-    
-    has_records = True
-    page_no = 1
-    inserted_items_count = 0
-    idx = 0
-
-    while has_records:
-        page_chunks = await chunk_model.get_poject_chunks(project_id=project.id, page_no=page_no)
-        if len(page_chunks):
-            page_no += 1
-        
-        if not page_chunks or len(page_chunks) == 0:
-            has_records = False
-            break
 
-        chunks_ids =  list(range(idx, idx + len(page_chunks)))
-        idx += len(page_chunks)
-        
-        is_inserted = nlp_controller.index_into_vector_db(
+    if push_request.vector_config is not None:
+        project = await nlp_controller.update_vector_db_config(
             project=project,
-            chunks=page_chunks,
-            do_reset=push_request.do_reset,
-            chunks_ids=chunks_ids
+            project_model=project_model,
+            vector_config=push_request.vector_config.dict(exclude_none=True),
         )
+    
+    push_stats = await nlp_controller.index_project_into_vector_db(
+        project=project,
+        chunk_model=chunk_model,
+        do_reset=push_request.do_reset,
+        incremental=push_request.incremental,
+    )
 
-        if not is_inserted:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={
-                    "signal": ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value
-                }
-            )
-        
-        inserted_items_count += len(page_chunks)
+    if push_stats is None:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value
+            }
+        )
         
     return JSONResponse(
         content={
             "signal": ResponseSignal.INSERT_INTO_VECTORDB_SUCCESS.value,
-            "inserted_items_count": inserted_items_count
+            **push_stats
         }
     )
 
@@ -101,10 +96,13 @@ async def get_project_index_info(request: Request, project_id: str):
         vectordb_client=request.app.vectordb_client,
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
-        template_parser=request.app.template_parser
+        template_parser=request.app.template_parser,
+        search_cache=request.app.search_cache,
+        answer_cache=request.app.answer_cache,
+        lexical_store=request.app.lexical_store,
     )
 
-    collection_info = nlp_controller.get_vector_db_collection_info(project=project)
+    collection_info = await nlp_controller.get_vector_db_collection_info(project=project)
 
     return JSONResponse(
         content={
@@ -113,8 +111,24 @@ async def get_project_index_info(request: Request, project_id: str):
         }
     )
 
+def is_valid_search_mode(mode: str):
+    return mode is None or mode in [ m.value for m in SearchModeEnum ]
+
+def get_search_filters(search_request):
+    if search_request.filters is None:
+        return None
+    return search_request.filters.dict(exclude_none=True) or None
+
 @nlp_router.post("/index/search/{project_id}")
 async def search_index(request: Request, project_id: str, search_request: SearchRequest):
+
+    if not is_valid_search_mode(search_request.mode):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_MODE_NOT_SUPPORTED.value
+            }
+        )
     
     project_model = await ProjectModel.create_instance(
         db_client=request.app.db_client
@@ -129,10 +143,16 @@ async def search_index(request: Request, project_id: str, search_request: Search
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
         template_parser=request.app.template_parser,
+        search_cache=request.app.search_cache,
+        answer_cache=request.app.answer_cache,
+        lexical_store=request.app.lexical_store,
+        single_flight=request.app.single_flight,
     )
 
-    results = nlp_controller.search_vector_db_collection(
-        project=project, text=search_request.text, limit=search_request.limit
+    results = await nlp_controller.search_collection(
+        project=project, text=search_request.text, limit=search_request.limit,
+        mode=search_request.mode,
+        filters=get_search_filters(search_request),
     )
 
     if not results:
@@ -150,8 +170,94 @@ async def search_index(request: Request, project_id: str, search_request: Search
         }
     )
 
+@nlp_router.post("/index/search/batch/{project_id}")
+async def search_index_batch(request: Request, project_id: str, search_request: SearchBatchRequest,
+                             app_settings: Settings = Depends(get_settings)):
+
+    if not is_valid_search_mode(search_request.mode):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_MODE_NOT_SUPPORTED.value
+            }
+        )
+
+    if len(search_request.texts) > app_settings.SEARCH_BATCH_MAX_QUERIES:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_BATCH_SIZE_EXCEEDED.value
+            }
+        )
+
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    project = await project_model.get_project_or_create(
+        project_id=project_id
+    )
+
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser,
+        search_cache=request.app.search_cache,
+        answer_cache=request.app.answer_cache,
+        lexical_store=request.app.lexical_store,
+    )
+
+    batch_results = await nlp_controller.search_collection_batch(
+        project=project, texts=search_request.texts, limit=search_request.limit,
+        mode=search_request.mode,
+        filters=get_search_filters(search_request),
+    )
+
+    if batch_results is None:
+        return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.VECTORDB_SEARCH_ERROR.value
+                }
+            )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.VECTORDB_SEARCH_SUCCESS.value,
+            "results": [
+                [ result.dict() for result in results ] if results else []
+                for results in batch_results
+            ]
+        }
+    )
+
+async def is_valid_session(request: Request, project_id: str, session_id: str):
+    # a new session id is valid, an existing one must belong to the project
+    if session_id is None:
+        return True
+
+    session = await request.app.session_store.get(session_id=session_id)
+    return session is None or session.session_project_id == project_id
+
 @nlp_router.post("/index/answer/{project_id}")
-async def answer_rag(request: Request, project_id: str, search_request: SearchRequest):
+async def answer_rag(request: Request, project_id: str, search_request: AnswerRequest):
+
+    if not is_valid_search_mode(search_request.mode):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_MODE_NOT_SUPPORTED.value
+            }
+        )
+
+    if not await is_valid_session(request, project_id=project_id, session_id=search_request.session_id):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SESSION_NOT_FOUND.value
+            }
+        )
     
     project_model = await ProjectModel.create_instance(
         db_client=request.app.db_client
@@ -166,12 +272,20 @@ async def answer_rag(request: Request, project_id: str, search_request: SearchRe
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
         template_parser=request.app.template_parser,
+        search_cache=request.app.search_cache,
+        answer_cache=request.app.answer_cache,
+        lexical_store=request.app.lexical_store,
+        session_store=request.app.session_store,
+        single_flight=request.app.single_flight,
     )
 
-    answer, full_prompt, chat_history = nlp_controller.answer_rag_question(
+    answer, full_prompt, chat_history, context_report = await nlp_controller.answer_rag_question(
         project=project,
         query=search_request.text,
         limit=search_request.limit,
+        mode=search_request.mode,
+        filters=get_search_filters(search_request),
+        session_id=search_request.session_id,
     )
 
     if not answer:
@@ -187,6 +301,215 @@ async def answer_rag(request: Request, project_id: str, search_request: SearchRe
             "signal": ResponseSignal.RAG_ANSWER_SUCCESS.value,
             "answer": answer,
             "full_prompt": full_prompt,
-            "chat_history": chat_history
+            "chat_history": chat_history,
+            "context_report": context_report,
+            "session_id": search_request.session_id,
+        }
+    )
+
+def format_stream_event(event: dict, stream_format: str):
+    data = json.dumps(event, ensure_ascii=False)
+
+    if stream_format == StreamFormatEnum.NDJSON.value:
+        return f"{data}\n"
+
+    return f"event: {event['event']}\ndata: {data}\n\n"
+
+@nlp_router.post("/index/answer/stream/{project_id}")
+async def answer_rag_stream(request: Request, project_id: str, answer_request: AnswerStreamRequest):
+
+    if not is_valid_search_mode(answer_request.mode):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_MODE_NOT_SUPPORTED.value
+            }
+        )
+
+    if answer_request.stream_format not in [ f.value for f in StreamFormatEnum ]:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.STREAM_FORMAT_NOT_SUPPORTED.value
+            }
+        )
+
+    if not await is_valid_session(request, project_id=project_id, session_id=answer_request.session_id):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SESSION_NOT_FOUND.value
+            }
+        )
+
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    project = await project_model.get_project_or_create(
+        project_id=project_id
+    )
+
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser,
+        search_cache=request.app.search_cache,
+        answer_cache=request.app.answer_cache,
+        lexical_store=request.app.lexical_store,
+        session_store=request.app.session_store,
+        single_flight=request.app.single_flight,
+    )
+
+    answer_events = nlp_controller.answer_rag_question_stream(
+        project=project,
+        query=answer_request.text,
+        limit=answer_request.limit,
+        mode=answer_request.mode,
+        filters=get_search_filters(answer_request),
+        session_id=answer_request.session_id,
+    )
+
+    async def stream_answer_events():
+        # stop as soon as the client goes away, closing the events cancels the generation
+        try:
+            async for event in answer_events:
+                if await request.is_disconnected():
+                    logger.info(f"Client disconnected, answer stream for {project_id} cancelled")
+                    break
+
+                yield format_stream_event(event=event, stream_format=answer_request.stream_format)
+        finally:
+            await answer_events.aclose()
+
+    media_type = "text/event-stream"
+    if answer_request.stream_format == StreamFormatEnum.NDJSON.value:
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        stream_answer_events(),
+        media_type=media_type,
+        headers={ "Cache-Control": "no-cache", "X-Accel-Buffering": "no" },
+    )
+
+@nlp_router.get("/session/{session_id}")
+async def get_session(request: Request, session_id: str):
+
+    session = await request.app.session_store.get(session_id=session_id)
+
+    if session is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "signal": ResponseSignal.SESSION_NOT_FOUND.value
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.SESSION_RETRIEVED.value,
+            "session": {
+                "session_id": session.session_id,
+                "project_id": session.session_project_id,
+                "summary": session.session_summary,
+                "turns": [
+                    { "role": turn["role"], "content": turn["content"] }
+                    for turn in session.session_turns
+                ],
+                "documents_count": len(session.session_documents),
+                "created_at": session.session_created_at.isoformat() + "Z",
+                "updated_at": session.session_updated_at.isoformat() + "Z",
+            }
         }
-    )
\ No newline at end of file
+    )
+
+@nlp_router.delete("/session/{session_id}")
+async def delete_session(request: Request, session_id: str):
+
+    async with request.app.session_store.lock(session_id):
+        is_deleted = await request.app.session_store.delete(session_id=session_id)
+
+    if not is_deleted:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "signal": ResponseSignal.SESSION_NOT_FOUND.value
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.SESSION_DELETED.value
+        }
+    )
+
+@nlp_router.get("/embedding/cache/stats")
+async def get_embedding_cache_stats(request: Request):
+
+    embedding_client = request.app.embedding_client
+
+    if not hasattr(embedding_client, "get_cache_stats"):
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.EMBEDDING_CACHE_DISABLED.value
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.EMBEDDING_CACHE_STATS_RETRIEVED.value,
+            "cache_stats": embedding_client.get_cache_stats()
+        }
+    )
+
+@nlp_router.get("/search/cache/stats")
+async def get_search_cache_stats(request: Request):
+
+    if request.app.search_cache is None:
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.SEARCH_CACHE_DISABLED.value
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.SEARCH_CACHE_STATS_RETRIEVED.value,
+            "cache_stats": request.app.search_cache.get_stats()
+        }
+    )
+
+@nlp_router.get("/answer/cache/stats")
+async def get_answer_cache_stats(request: Request):
+
+    if request.app.answer_cache is None:
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.ANSWER_CACHE_DISABLED.value
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.ANSWER_CACHE_STATS_RETRIEVED.value,
+            "cache_stats": request.app.answer_cache.get_stats()
+        }
+    )
+
+@nlp_router.get("/single-flight/stats")
+async def get_single_flight_stats(request: Request):
+
+    if request.app.single_flight is None:
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.SINGLE_FLIGHT_DISABLED.value
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.SINGLE_FLIGHT_STATS_RETRIEVED.value,
+            "single_flight_stats": request.app.single_flight.get_stats()
+        }
+    )
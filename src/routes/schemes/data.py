@@ -6,4 +6,5 @@ class ProcessRequest(BaseModel):
     chunk_size: Optional[int] = 100  # Default chunk size is 100kb
     overlap: Optional[int] = 20  # Default overlap is 20 seconds
     do_reset: Optional[int] = 0  # Default is False, meaning do not reset the state
+    parallel: Optional[int] = 0  # parse files in the process pool
 
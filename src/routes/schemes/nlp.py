@@ -1,9 +1,60 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, validator
+from typing import Optional, List
+from stores.vectordb.VectorDBEnums import QuantizationEnums
+
+class VectorConfig(BaseModel):
+    # collection settings apply when the collection is created or reset,
+    # search settings apply to the next search
+    quantization: Optional[str] = None
+    quantization_always_ram: Optional[bool] = None
+    quantization_rescore: Optional[bool] = None
+    quantization_oversampling: Optional[float] = None
+    on_disk: Optional[bool] = None
+    payload_on_disk: Optional[bool] = None
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    hnsw_ef: Optional[int] = None
+    exact: Optional[bool] = None
+
+    @validator('quantization')
+    def validate_quantization(cls, value):
+        if value is not None and value not in [ q.value for q in QuantizationEnums ]:
+            raise ValueError('Quantization must be scalar or binary')
+        return value
 
 class PushRequest(BaseModel):
     do_reset: Optional[int] = 0
+    incremental: Optional[int] = 0
+    vector_config: Optional[VectorConfig] = None
+
+class SearchFilters(BaseModel):
+    # asset ids, source file names and an inclusive 1-based PDF page range
+    asset_ids: Optional[List[str]] = None
+    sources: Optional[List[str]] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
 
 class SearchRequest(BaseModel):
     text: str
-    limit: Optional[int] = 5
\ No newline at end of file
+    limit: Optional[int] = 5
+    mode: Optional[str] = None
+    filters: Optional[SearchFilters] = None
+
+class AnswerRequest(SearchRequest):
+    # follow-up questions of a conversation share a session id
+    session_id: Optional[str] = None
+
+    @validator('session_id')
+    def validate_session_id(cls, value):
+        if value is not None and not (0 < len(value) <= 128):
+            raise ValueError('Session id must be 1 to 128 characters')
+        return value
+
+class AnswerStreamRequest(AnswerRequest):
+    stream_format: Optional[str] = "sse"
+
+class SearchBatchRequest(BaseModel):
+    texts: List[str]
+    limit: Optional[int] = 5
+    mode: Optional[str] = None
+    filters: Optional[SearchFilters] = None
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Measures recall@k, latency and memory of the IVF_PQ vector db backend against
+exact search.
+
+Run from src/:
+    python -m scripts.evaluate_ivfpq_recall                         # synthetic data
+    python -m scripts.evaluate_ivfpq_recall --db-path assets/database/qdrant_db \
+        --collection collection_1                                   # a pushed project
+
+The db is locked to one process and training writes into it, so stop the app or
+point --db-path at a copy of the db rather than the live path.
+"""
+from stores.vectordb.providers.IVFPQDBProvider import IVFPQDBProvider
+import numpy as np
+import argparse
+import tempfile
+import shutil
+import time
+
+def create_synthetic_collection(provider: IVFPQDBProvider, collection_name: str,
+                                    no_vectors: int, embedding_size: int, seed: int = 0):
+    # clustered vectors look more like real embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((256, embedding_size)).astype(np.float32)
+
+    _ = provider.create_collection(collection_name=collection_name, embedding_size=embedding_size)
+
+    batch_size = 10000
+    for start in range(0, no_vectors, batch_size):
+        size = min(batch_size, no_vectors - start)
+        vectors = centers[rng.integers(0, len(centers), size)] \
+                  + 0.5 * rng.standard_normal((size, embedding_size)).astype(np.float32)
+
+        _ = provider.insert_many(collection_name=collection_name,
+                                 texts=[""] * size,
+                                 vectors=vectors,
+                                 record_ids=list(range(start, start + size)))
+
+def evaluate(provider: IVFPQDBProvider, collection_name: str, nprobes: list,
+                no_queries: int, k: int, seed: int = 1):
+    collection = provider.get_collection(collection_name)
+    index = provider.indexes.get(collection_name)
+    if index is None:
+        index = provider.train_index(collection_name=collection_name)
+
+    if index is None:
+        raise SystemExit(f"{collection_name} is smaller than IVF_PQ_MIN_TRAIN_ROWS, nothing to evaluate")
+
+    # queries are perturbed copies of stored vectors
+    rng = np.random.default_rng(seed)
+    live_rows = np.fromiter(collection.id_to_row.values(), dtype=np.int64)
+    query_rows = rng.choice(live_rows, size=min(no_queries, len(live_rows)), replace=False)
+    queries = np.asarray(collection.vectors[query_rows], dtype=np.float32)
+    queries += 0.1 * queries.std() * rng.standard_normal(queries.shape).astype(np.float32)
+
+    start = time.perf_counter()
+    exact_results = collection.search(vectors=queries, limit=k)
+    exact_seconds = time.perf_counter() - start
+    exact_ids = [
+        { str(record["id"]) for record, _ in results }
+        for results in exact_results
+    ]
+
+    no_vectors = len(live_rows)
+    float_bytes = collection.embedding_size * 4
+    code_bytes = index.get_info()["code_bytes_per_vector"]
+
+    print(f"collection: {collection_name}  vectors: {no_vectors}  dim: {collection.embedding_size}")
+    print(f"nlist: {index.nlist}  m: {index.m}  rerank candidates: {k * provider.rerank_factor}")
+    print(f"in-memory bytes per vector: {code_bytes} vs {float_bytes} float32 "
+          f"({float_bytes / code_bytes:.1f}x smaller)")
+    print(f"exact batched search: {1000 * exact_seconds / len(queries):.2f} ms/query")
+    print(f"{'nprobe':>8} {'recall@' + str(k):>10} {'ms/query':>10}")
+
+    for nprobe in nprobes:
+        provider.nprobe = nprobe
+
+        recalls, seconds = [], 0.0
+        for query, expected_ids in zip(queries, exact_ids):
+            start = time.perf_counter()
+            results = provider.search_by_vector(collection_name=collection_name,
+                                                vector=query, limit=k) or []
+            seconds += time.perf_counter() - start
+
+            found_ids = { result.id for result in results }
+            recalls.append(len(found_ids & expected_ids) / max(len(expected_ids), 1))
+
+        print(f"{nprobe:>8} {np.mean(recalls):>10.3f} {1000 * seconds / len(queries):>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF-PQ recall@k evaluation")
+    parser.add_argument("--db-path", default=None, help="vector db directory, synthetic data when omitted")
+    parser.add_argument("--collection", default=None)
+    parser.add_argument("--distance", default="cosine")
+    parser.add_argument("--vectors", type=int, default=100000, help="synthetic collection size")
+    parser.add_argument("--dim", type=int, default=768, help="synthetic embedding size")
+    parser.add_argument("--m", type=int, default=96)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobes", default="1,4,8,16,32,64")
+    parser.add_argument("--rerank-factor", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = args.db_path or tempfile.mkdtemp(prefix="ivfpq_eval_")
+    collection_name = args.collection or "synthetic"
+
+    provider = IVFPQDBProvider(db_path=db_path, distance_method=args.distance,
+                               nlist=args.nlist, m=args.m,
+                               rerank_factor=args.rerank_factor,
+                               min_train_rows=1000)
+    provider.connect()
+
+    try:
+        if args.db_path is None:
+            create_synthetic_collection(provider=provider, collection_name=collection_name,
+                                        no_vectors=args.vectors, embedding_size=args.dim)
+
+        evaluate(provider=provider, collection_name=collection_name,
+                 nprobes=[ int(n) for n in args.nprobes.split(",") ],
+                 no_queries=args.queries, k=args.k)
+    finally:
+        provider.disconnect()
+        if args.db_path is None:
+            shutil.rmtree(db_path, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
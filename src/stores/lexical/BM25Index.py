@@ -0,0 +1,189 @@
+from .TextNormalizer import TextNormalizer
+from stores.vectordb.PayloadFilters import PayloadFilters
+from collections import Counter
+import numpy as np
+import json
+import os
+
+class BM25Index:
+    # inverted index stored as CSR style arrays: the postings of term t are
+    # postings_docs[term_offsets[t]:term_offsets[t+1]] with their term frequencies
+
+    def __init__(self, vocabulary: dict, term_offsets: np.ndarray, postings_docs: np.ndarray,
+                    postings_tfs: np.ndarray, doc_lengths: np.ndarray, doc_ids: list,
+                    doc_texts: list, doc_fields: list = None, k1: float = 1.5, b: float = 0.75):
+        self.vocabulary = vocabulary
+        self.term_offsets = term_offsets
+        self.postings_docs = postings_docs
+        self.postings_tfs = postings_tfs
+        self.doc_lengths = doc_lengths
+        self.doc_ids = doc_ids
+        self.doc_texts = doc_texts
+        self.doc_fields = doc_fields or [{}] * len(doc_ids)
+        self.doc_columns = None
+        self.k1 = k1
+        self.b = b
+
+        self.normalizer = TextNormalizer()
+        self.no_docs = len(doc_ids)
+        self.avg_doc_length = float(doc_lengths.mean()) if self.no_docs else 0.0
+
+        doc_freqs = np.diff(term_offsets).astype(np.float32)
+        self.idf = np.log(1.0 + (self.no_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+
+    @classmethod
+    def build(cls, doc_ids: list, doc_texts: list, doc_fields: list = None,
+                k1: float = 1.5, b: float = 0.75):
+        normalizer = TextNormalizer()
+        vocabulary = {}
+        term_postings = []
+        doc_lengths = np.zeros(len(doc_texts), dtype=np.int32)
+
+        for doc_idx, text in enumerate(doc_texts):
+            tokens = normalizer.tokenize(text)
+            doc_lengths[doc_idx] = len(tokens)
+
+            for token, tf in Counter(tokens).items():
+                term_id = vocabulary.setdefault(token, len(vocabulary))
+                if term_id == len(term_postings):
+                    term_postings.append([])
+                term_postings[term_id].append((doc_idx, tf))
+
+        term_offsets = np.zeros(len(term_postings) + 1, dtype=np.int64)
+        term_offsets[1:] = np.cumsum([ len(postings) for postings in term_postings ])
+
+        postings_docs = np.empty(term_offsets[-1], dtype=np.int32)
+        postings_tfs = np.empty(term_offsets[-1], dtype=np.uint16)
+        for term_id, postings in enumerate(term_postings):
+            start, end = term_offsets[term_id], term_offsets[term_id + 1]
+            postings_docs[start:end] = [ doc_idx for doc_idx, _ in postings ]
+            postings_tfs[start:end] = [ min(tf, 65535) for _, tf in postings ]
+
+        return cls(vocabulary=vocabulary, term_offsets=term_offsets, postings_docs=postings_docs,
+                   postings_tfs=postings_tfs, doc_lengths=doc_lengths, doc_ids=doc_ids,
+                   doc_texts=doc_texts, doc_fields=doc_fields, k1=k1, b=b)
+
+    def update(self, removed_ids: list, doc_ids: list, doc_texts: list, doc_fields: list = None):
+        # returns a new index without the removed docs and with the given docs upserted.
+        # only the new docs are tokenized, the kept postings are filtered and merged as arrays
+        doc_fields = doc_fields or [{}] * len(doc_ids)
+        removed_ids = set(removed_ids) | set(doc_ids)
+
+        kept_docs = np.array([ doc_id not in removed_ids for doc_id in self.doc_ids ], dtype=bool)
+        new_doc_idx = np.cumsum(kept_docs) - 1
+        no_kept_docs = int(kept_docs.sum())
+
+        # kept postings as (term, doc, tf) triplets
+        postings_terms = np.repeat(np.arange(len(self.vocabulary), dtype=np.int64), np.diff(self.term_offsets))
+        kept_postings = kept_docs[self.postings_docs]
+        postings_terms = postings_terms[kept_postings]
+        postings_docs = new_doc_idx[self.postings_docs[kept_postings]].astype(np.int32)
+        postings_tfs = self.postings_tfs[kept_postings]
+
+        # postings of the new docs, new terms extend the vocabulary
+        vocabulary = dict(self.vocabulary)
+        new_terms, new_docs, new_tfs = [], [], []
+        doc_lengths = np.zeros(len(doc_texts), dtype=np.int32)
+
+        for doc_idx, text in enumerate(doc_texts):
+            tokens = self.normalizer.tokenize(text)
+            doc_lengths[doc_idx] = len(tokens)
+
+            for token, tf in Counter(tokens).items():
+                new_terms.append(vocabulary.setdefault(token, len(vocabulary)))
+                new_docs.append(no_kept_docs + doc_idx)
+                new_tfs.append(min(tf, 65535))
+
+        postings_terms = np.concatenate([ postings_terms, np.asarray(new_terms, dtype=np.int64) ])
+        postings_docs = np.concatenate([ postings_docs, np.asarray(new_docs, dtype=np.int32) ])
+        postings_tfs = np.concatenate([ postings_tfs, np.asarray(new_tfs, dtype=np.uint16) ])
+
+        # kept docs come first, a stable sort keeps the docs of every term in order
+        order = np.argsort(postings_terms, kind="stable")
+        term_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        term_offsets[1:] = np.cumsum(np.bincount(postings_terms, minlength=len(vocabulary)))
+
+        kept_idx = np.flatnonzero(kept_docs)
+
+        return BM25Index(vocabulary=vocabulary, term_offsets=term_offsets,
+                         postings_docs=postings_docs[order], postings_tfs=postings_tfs[order],
+                         doc_lengths=np.concatenate([ self.doc_lengths[kept_idx], doc_lengths ]),
+                         doc_ids=[ self.doc_ids[idx] for idx in kept_idx ] + list(doc_ids),
+                         doc_texts=[ self.doc_texts[idx] for idx in kept_idx ] + list(doc_texts),
+                         doc_fields=[ self.doc_fields[idx] for idx in kept_idx ] + list(doc_fields),
+                         k1=self.k1, b=self.b)
+
+    def get_columns(self):
+        if self.doc_columns is None:
+            self.doc_columns = PayloadFilters.to_columns(self.doc_fields)
+        return self.doc_columns
+
+    def search(self, text: str, limit: int = 10, filters: dict = None):
+        # returns [(doc_id, doc_text, score, doc_fields)] ordered by BM25 score
+        if self.no_docs == 0:
+            return []
+
+        scores = np.zeros(self.no_docs, dtype=np.float32)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_doc_length, 1e-6))
+
+        for token in set(self.normalizer.tokenize(text)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = self.postings_docs[start:end]
+            tfs = self.postings_tfs[start:end].astype(np.float32)
+
+            # each doc appears once per term, so plain fancy indexing accumulates correctly
+            scores[docs] += self.idf[term_id] * tfs * (self.k1 + 1) / (tfs + length_norm[docs])
+
+        if filters:
+            scores[~PayloadFilters.mask(self.get_columns(), filters)] = 0.0
+
+        no_matches = int(np.count_nonzero(scores))
+        if no_matches == 0:
+            return []
+
+        limit = min(limit, no_matches)
+        top_idx = np.argpartition(-scores, limit - 1)[:limit]
+        top_idx = top_idx[np.argsort(-scores[top_idx])]
+
+        return [
+            (self.doc_ids[idx], self.doc_texts[idx], float(scores[idx]), self.doc_fields[idx])
+            for idx in top_idx
+        ]
+
+    def save(self, index_path: str):
+        os.makedirs(index_path, exist_ok=True)
+
+        np.savez(
+            os.path.join(index_path, "postings.npz"),
+            term_offsets=self.term_offsets,
+            postings_docs=self.postings_docs,
+            postings_tfs=self.postings_tfs,
+            doc_lengths=self.doc_lengths,
+        )
+
+        with open(os.path.join(index_path, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "vocabulary": self.vocabulary,
+                "doc_ids": self.doc_ids,
+                "doc_texts": self.doc_texts,
+                "doc_fields": self.doc_fields,
+                "k1": self.k1,
+                "b": self.b,
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, index_path: str):
+        arrays = np.load(os.path.join(index_path, "postings.npz"))
+
+        with open(os.path.join(index_path, "documents.json"), "r", encoding="utf-8") as f:
+            documents = json.load(f)
+
+        return cls(vocabulary=documents["vocabulary"], term_offsets=arrays["term_offsets"],
+                   postings_docs=arrays["postings_docs"], postings_tfs=arrays["postings_tfs"],
+                   doc_lengths=arrays["doc_lengths"], doc_ids=documents["doc_ids"],
+                   doc_texts=documents["doc_texts"], doc_fields=documents.get("doc_fields"),
+                   k1=documents["k1"], b=documents["b"])
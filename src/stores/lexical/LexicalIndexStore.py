@@ -0,0 +1,122 @@
+from .BM25Index import BM25Index
+from contextlib import contextmanager
+import threading
+import shutil
+import fcntl
+import time
+import os
+
+class LexicalIndexStore:
+    # per collection BM25 indexes kept on disk and loaded lazily into memory.
+    # every save writes a new version directory then swaps the CURRENT pointer to it,
+    # a newer version on disk (written by another worker) replaces the loaded one
+
+    def __init__(self, db_path: str, k1: float = 1.5, b: float = 0.75):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+
+        self.indexes = {}
+        self.lock = threading.Lock()
+        # builds and updates of the same store are serialized, an update never
+        # starts from an index another write is replacing
+        self.write_lock = threading.Lock()
+
+    def get_index_path(self, collection_name: str):
+        return os.path.join(self.db_path, collection_name)
+
+    def get_pointer_path(self, collection_name: str):
+        return os.path.join(self.get_index_path(collection_name), "CURRENT")
+
+    def get_index_version(self, collection_name: str):
+        try:
+            with open(self.get_pointer_path(collection_name), "r") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def lock_collection(self, collection_name: str):
+        # serializes the writes of a collection across workers, the lock file lives
+        # next to the index so deleting the index never drops a held lock
+        os.makedirs(self.db_path, exist_ok=True)
+        with open(f"{self.get_index_path(collection_name)}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def build(self, collection_name: str, doc_ids: list, doc_texts: list, doc_fields: list = None):
+        index = BM25Index.build(doc_ids=doc_ids, doc_texts=doc_texts, doc_fields=doc_fields,
+                                k1=self.k1, b=self.b)
+
+        with self.write_lock, self.lock_collection(collection_name):
+            return self.save(collection_name=collection_name, index=index)
+
+    def update(self, collection_name: str, removed_ids: list, doc_ids: list, doc_texts: list,
+                doc_fields: list = None):
+        # returns the updated index, or None when the collection has no index to update.
+        # the index is read under the collection lock, so it includes the updates of other workers
+        with self.write_lock, self.lock_collection(collection_name):
+            index = self.get(collection_name)
+            if index is None:
+                return None
+
+            index = index.update(removed_ids=removed_ids, doc_ids=doc_ids, doc_texts=doc_texts,
+                                 doc_fields=doc_fields)
+
+            return self.save(collection_name=collection_name, index=index)
+
+    def save(self, collection_name: str, index: BM25Index):
+        # callers hold the collection lock. the new version is written aside and the pointer
+        # is swapped atomically, readers always find a complete index
+        index_path = self.get_index_path(collection_name)
+        previous_version = self.get_index_version(collection_name)
+        version = f"{time.time_ns()}-{os.getpid()}"
+        index.save(os.path.join(index_path, version))
+
+        pointer_path = self.get_pointer_path(collection_name)
+        with open(f"{pointer_path}.tmp", "w") as f:
+            f.write(version)
+        os.replace(f"{pointer_path}.tmp", pointer_path)
+
+        with self.lock:
+            self.indexes[collection_name] = (version, index)
+
+        # the previous version is kept for readers that are still loading it
+        for name in os.listdir(index_path):
+            if name not in (version, previous_version) and os.path.isdir(os.path.join(index_path, name)):
+                shutil.rmtree(os.path.join(index_path, name), ignore_errors=True)
+
+        return index
+
+    def get(self, collection_name: str):
+        with self.lock:
+            while True:
+                version = self.get_index_version(collection_name)
+                if version is None:
+                    return None
+
+                loaded = self.indexes.get(collection_name)
+                if loaded is not None and loaded[0] == version:
+                    return loaded[1]
+
+                try:
+                    index = BM25Index.load(os.path.join(self.get_index_path(collection_name), version))
+                except FileNotFoundError:
+                    # newer saves removed this version while it was loading, follow the pointer
+                    if self.get_index_version(collection_name) == version:
+                        raise
+                    continue
+
+                self.indexes[collection_name] = (version, index)
+                return index
+
+    def search(self, collection_name: str, text: str, limit: int = 10, filters: dict = None):
+        index = self.get(collection_name)
+        if index is None:
+            return []
+        return index.search(text=text, limit=limit, filters=filters)
+
+    def delete(self, collection_name: str):
+        with self.write_lock, self.lock_collection(collection_name), self.lock:
+            self.indexes.pop(collection_name, None)
+            shutil.rmtree(self.get_index_path(collection_name), ignore_errors=True)
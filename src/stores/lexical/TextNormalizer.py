@@ -0,0 +1,35 @@
+import re
+
+class TextNormalizer:
+    # arabic aware normalization and tokenization for the lexical index
+
+    ARABIC_DIACRITICS = re.compile(r"[ؐ-ًؚ-ٰٟۖ-ۭـ]")
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    CHARACTERS_MAP = str.maketrans({
+        "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+        "ى": "ي", "ئ": "ي",
+        "ة": "ه",
+        "ؤ": "و",
+        "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+        "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+    })
+
+    # light stemming: definite article with its attached prepositions
+    ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+
+    def normalize(self, text: str):
+        text = self.ARABIC_DIACRITICS.sub("", text)
+        return text.translate(self.CHARACTERS_MAP).casefold()
+
+    def strip_prefix(self, token: str):
+        for prefix in self.ARABIC_PREFIXES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+                return token[len(prefix):]
+        return token
+
+    def tokenize(self, text: str):
+        return [
+            self.strip_prefix(token)
+            for token in self.TOKEN_PATTERN.findall(self.normalize(text))
+        ]
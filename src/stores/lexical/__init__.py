@@ -0,0 +1,2 @@
+from .LexicalIndexStore import LexicalIndexStore
+from .LexicalEnums import SearchModeEnum
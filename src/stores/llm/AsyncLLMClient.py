@@ -0,0 +1,80 @@
+from .AsyncLLMInterface import AsyncLLMInterface
+from .LLMInterface import LLMInterface
+from concurrent.futures import Executor
+import asyncio
+import functools
+
+class AsyncLLMClient(AsyncLLMInterface):
+
+    def __init__(self, client: LLMInterface, executor: Executor):
+        # runs the blocking provider SDK calls on a managed thread pool
+        self.client = client
+        self.executor = executor
+
+    def __getattr__(self, name):
+        # expose the wrapped provider attributes (enums, embedding_size, ...)
+        return getattr(self.client, name)
+
+    async def run_in_executor(self, func, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, **kwargs))
+
+    def set_generation_model(self, model_id: str):
+        return self.client.set_generation_model(model_id=model_id)
+
+    def set_embedding_model(self, model_id: str, embedding_size: int):
+        return self.client.set_embedding_model(model_id=model_id, embedding_size=embedding_size)
+
+    async def generate_text(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
+                            temperature: float = None, prefix_size: int = 0):
+        return await self.run_in_executor(self.client.generate_text,
+                                          prompt=prompt,
+                                          chat_history=chat_history,
+                                          max_output_tokens=max_output_tokens,
+                                          temperature=temperature,
+                                          prefix_size=prefix_size)
+
+    async def generate_text_stream(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
+                                    temperature: float = None, prefix_size: int = 0):
+        # pulls the provider stream one event at a time on the thread pool.
+        # when the consumer stops early (client disconnect) the provider stream is
+        # closed, which drops the upstream connection and stops the generation
+        stream = self.client.generate_text_stream(prompt=prompt,
+                                                  chat_history=chat_history,
+                                                  max_output_tokens=max_output_tokens,
+                                                  temperature=temperature,
+                                                  prefix_size=prefix_size)
+        pending = None
+        try:
+            while True:
+                pending = self.executor.submit(next, stream, None)
+                event = await asyncio.wrap_future(pending)
+                pending = None
+
+                if event is None:
+                    break
+
+                yield event
+        finally:
+            if pending is None:
+                stream.close()
+            else:
+                # a generator cannot be closed while next() runs on another thread
+                pending.add_done_callback(lambda _: stream.close())
+
+    async def embed_text(self, text: str, document_type: str = None):
+        return await self.run_in_executor(self.client.embed_text,
+                                          text=text,
+                                          document_type=document_type)
+
+    async def embed_texts(self, texts: list, document_type: str = None, batch_size: int = None):
+        return await self.run_in_executor(self.client.embed_texts,
+                                          texts=texts,
+                                          document_type=document_type,
+                                          batch_size=batch_size)
+
+    async def warm_up(self):
+        return await self.run_in_executor(self.client.warm_up)
+
+    def construct_prompt(self, prompt: str, role: str):
+        return self.client.construct_prompt(prompt=prompt, role=role)
@@ -0,0 +1,37 @@
+from abc import ABC, abstractmethod
+
+class AsyncLLMInterface(ABC):
+
+    @abstractmethod
+    def set_generation_model(self, model_id: str):
+        pass
+
+    @abstractmethod
+    def set_embedding_model(self, model_id: str, embedding_size: int):
+        pass
+
+    @abstractmethod
+    async def generate_text(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
+                            temperature: float = None, prefix_size: int = 0):
+        pass
+
+    @abstractmethod
+    async def generate_text_stream(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
+                                    temperature: float = None, prefix_size: int = 0):
+        pass
+
+    @abstractmethod
+    async def embed_text(self, text: str, document_type: str = None):
+        pass
+
+    @abstractmethod
+    async def embed_texts(self, texts: list, document_type: str = None, batch_size: int = None):
+        pass
+
+    @abstractmethod
+    async def warm_up(self):
+        pass
+
+    @abstractmethod
+    def construct_prompt(self, prompt: str, role: str):
+        pass
@@ -0,0 +1,84 @@
+from .LLMInterface import LLMInterface
+from .EmbeddingCache import EmbeddingCache
+
+class CachedEmbeddingClient(LLMInterface):
+
+    def __init__(self, client: LLMInterface, cache: EmbeddingCache):
+        self.client = client
+        self.cache = cache
+
+    def __getattr__(self, name):
+        # expose the wrapped provider attributes (enums, embedding_size, ...)
+        return getattr(self.client, name)
+
+    def set_generation_model(self, model_id: str):
+        return self.client.set_generation_model(model_id=model_id)
+
+    def set_embedding_model(self, model_id: str, embedding_size: int):
+        return self.client.set_embedding_model(model_id=model_id, embedding_size=embedding_size)
+
+    def generate_text(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
+                            temperature: float = None, prefix_size: int = 0):
+        return self.client.generate_text(prompt=prompt, chat_history=chat_history,
+                                         max_output_tokens=max_output_tokens,
+                                         temperature=temperature,
+                                         prefix_size=prefix_size)
+
+    def generate_text_stream(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
+                                temperature: float = None, prefix_size: int = 0):
+        return self.client.generate_text_stream(prompt=prompt, chat_history=chat_history,
+                                                max_output_tokens=max_output_tokens,
+                                                temperature=temperature,
+                                                prefix_size=prefix_size)
+
+    def warm_up(self):
+        return self.client.warm_up()
+
+    def construct_prompt(self, prompt: str, role: str):
+        return self.client.construct_prompt(prompt=prompt, role=role)
+
+    def embed_text(self, text: str, document_type: str = None):
+        vectors = self.embed_texts(texts=[text], document_type=document_type)
+
+        if not vectors:
+            return None
+
+        return vectors[0]
+
+    def embed_texts(self, texts: list, document_type: str = None, batch_size: int = None):
+        keys = [
+            self.cache.make_key(
+                text=self.client.process_text(text),
+                model_id=self.client.embedding_model_id,
+                document_type=document_type,
+                embedding_size=self.client.embedding_size,
+            )
+            for text in texts
+        ]
+
+        cached_vectors = self.cache.get_many(keys)
+
+        # embed each missing key only once, even if the text repeats in this call
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached_vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            new_vectors = self.client.embed_texts(
+                texts=list(missing.values()),
+                document_type=document_type,
+                batch_size=batch_size,
+            )
+
+            if not new_vectors or len(new_vectors) != len(missing):
+                return None
+
+            new_items = dict(zip(missing.keys(), new_vectors))
+            self.cache.set_many(new_items)
+            cached_vectors.update(new_items)
+
+        return [ cached_vectors[key] for key in keys ]
+
+    def get_cache_stats(self):
+        return self.cache.get_stats()
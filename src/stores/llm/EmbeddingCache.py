@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+class EmbeddingCache:
+
+    def __init__(self, db_path: str, max_entries: int = 1000000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            os.path.join(self.db_path, "embeddings.sqlite"),
+            check_same_thread=False,
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "cache_key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access_index ON embeddings (last_access)"
+        )
+        self.connection.commit()
+
+        self.logger = logging.getLogger(__name__)
+
+    def make_key(self, text: str, model_id: str, document_type: str, embedding_size: int):
+        raw_key = json.dumps([text, model_id, document_type, embedding_size], ensure_ascii=False)
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list):
+        # returns {key: vector} for the keys found in the cache
+        unique_keys = list(set(keys))
+        found = {}
+
+        with self.lock:
+            for i in range(0, len(unique_keys), 500):
+                batch_keys = unique_keys[i:i+500]
+                rows = self.connection.execute(
+                    "SELECT cache_key, vector FROM embeddings WHERE cache_key IN (%s)"
+                    % ",".join("?" * len(batch_keys)),
+                    batch_keys,
+                ).fetchall()
+
+                for cache_key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[cache_key] = vector.tolist()
+
+            if found:
+                now = time.time()
+                self.connection.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE cache_key = ?",
+                    [ (now, key) for key in found ],
+                )
+                self.connection.commit()
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return found
+
+    def set_many(self, items: dict):
+        if not items:
+            return
+
+        now = time.time()
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (cache_key, vector, last_access) VALUES (?, ?, ?)",
+                [
+                    (key, array("f", vector).tobytes(), now)
+                    for key, vector in items.items()
+                ],
+            )
+            self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        # drop the least recently used entries once the cache grows above max_entries
+        no_entries = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = no_entries - self.max_entries
+        if overflow <= 0:
+            return
+
+        self.connection.execute(
+            "DELETE FROM embeddings WHERE cache_key IN ("
+            "SELECT cache_key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (overflow,),
+        )
+        self.logger.info(f"Evicted {overflow} embeddings from the cache")
+
+    def get_stats(self):
+        with self.lock:
+            no_entries = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": no_entries,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
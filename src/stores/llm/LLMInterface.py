@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import math
 
 class LLMInterface(ABC):
 
@@ -12,14 +13,64 @@ class LLMInterface(ABC):
 
     @abstractmethod
     def generate_text(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
-                            temperature: float = None):
+                            temperature: float = None, prefix_size: int = 0):
+        # the first prefix_size chat_history messages are repeated unchanged across
+        # requests (system prompt, session documents), providers may cache them
+        pass
+
+    @abstractmethod
+    def generate_text_stream(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
+                                temperature: float = None, prefix_size: int = 0):
+        # generator of {"delta": text} events, then one {"usage": {...}} event when known
         pass
 
     @abstractmethod
     def embed_text(self, text: str, document_type: str = None):
         pass
 
+    @abstractmethod
+    def embed_texts(self, texts: list, document_type: str = None, batch_size: int = None):
+        pass
+
+    @abstractmethod
+    def warm_up(self):
+        # cheap request that sets up connections and model handles at startup
+        pass
+
     @abstractmethod
     def construct_prompt(self, prompt: str, role: str):
         pass
-    
\ No newline at end of file
+
+    def estimate_tokens(self, text: str):
+        # character based estimate, providers set chars_per_token for their tokenizer
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def process_prompt(self, prompt: str):
+        # generation input is cut at the input token budget only, the context
+        # packer keeps prompts under it so this is a last resort
+        max_characters = int(self.default_generation_max_input_tokens * self.chars_per_token)
+        if len(prompt) > max_characters:
+            self.logger.warning(f"Prompt of {len(prompt)} characters truncated to {max_characters}")
+        return prompt[:max_characters].strip()
+
+    def split_into_batches(self, texts: list, max_batch_size: int, max_batch_characters: int):
+        # split texts into consecutive batches that respect both the provider
+        # max number of inputs and max total characters per request
+        batches = []
+        current_batch, current_characters = [], 0
+
+        for text in texts:
+            if current_batch and (
+                len(current_batch) >= max_batch_size or
+                current_characters + len(text) > max_batch_characters
+            ):
+                batches.append(current_batch)
+                current_batch, current_characters = [], 0
+
+            current_batch.append(text)
+            current_characters += len(text)
+
+        if current_batch:
+            batches.append(current_batch)
+
+        return batches
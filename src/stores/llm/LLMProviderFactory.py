@@ -1,17 +1,50 @@
 from .LLMEnums import LLMEnums
 from .providers.GeminiProvider import GeminiProvider
 from .providers.CoHereProvider import CoHereProvider
+from .EmbeddingCache import EmbeddingCache
+from .CachedEmbeddingClient import CachedEmbeddingClient
+import threading
+import httpx
+
 class LLMProviderFactory:
     def __init__(self, config: dict):
         self.config = config
 
+        self.http_client = None
+        self.http_client_lock = threading.Lock()
+
+    def get_http_client(self):
+        # one pooled transport shared by every provider created by this factory
+        with self.http_client_lock:
+            if self.http_client is None:
+                self.http_client = httpx.Client(
+                    timeout=httpx.Timeout(self.config.LLM_READ_TIMEOUT_SECONDS,
+                                          connect=self.config.LLM_CONNECT_TIMEOUT_SECONDS),
+                    limits=httpx.Limits(max_connections=self.config.LLM_HTTP_MAX_CONNECTIONS,
+                                        max_keepalive_connections=self.config.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                                        keepalive_expiry=self.config.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS),
+                )
+
+        return self.http_client
+
+    def close(self):
+        if self.http_client is not None:
+            self.http_client.close()
+            self.http_client = None
+
     def create(self, provider: str):
         if provider == LLMEnums.GEMINI.value:
             return GeminiProvider(
                 api_key = self.config.GEMINI_API_KEY,
                 default_input_max_characters=self.config.INPUT_DEFAULT_MAX_CHARACTERS,
                 default_generation_max_output_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
-                default_generation_temperature=self.config.GENERATION_DEFAULT_TEMPERATURE
+                default_generation_temperature=self.config.GENERATION_DEFAULT_TEMPERATURE,
+                default_generation_max_input_tokens=self.config.GENERATION_MAX_INPUT_TOKENS,
+                chars_per_token=self.config.GENERATION_CHARS_PER_TOKEN,
+                request_timeout=self.config.LLM_READ_TIMEOUT_SECONDS,
+                context_cache_enabled=self.config.GEMINI_CONTEXT_CACHE_ENABLED,
+                context_cache_min_tokens=self.config.GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+                context_cache_ttl_seconds=self.config.GEMINI_CONTEXT_CACHE_TTL_SECONDS,
             )
         
         if provider == LLMEnums.COHERE.value:
@@ -19,7 +52,24 @@ class LLMProviderFactory:
                 api_key = self.config.COHERE_API_KEY,
                 default_input_max_characters=self.config.INPUT_DEFAULT_MAX_CHARACTERS,
                 default_generation_max_output_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
-                default_generation_temperature=self.config.GENERATION_DEFAULT_TEMPERATURE
+                default_generation_temperature=self.config.GENERATION_DEFAULT_TEMPERATURE,
+                default_generation_max_input_tokens=self.config.GENERATION_MAX_INPUT_TOKENS,
+                chars_per_token=self.config.GENERATION_CHARS_PER_TOKEN,
+                http_client=self.get_http_client(),
             )
 
-        return None
\ No newline at end of file
+        return None
+
+    def create_embedding_client(self, provider: str, cache_path: str = None):
+        # cache_path is the resolved cache directory, EMBEDDING_CACHE_PATH as is by default
+        client = self.create(provider=provider)
+
+        if client is None or not self.config.EMBEDDING_CACHE_ENABLED:
+            return client
+
+        cache = EmbeddingCache(
+            db_path=cache_path or self.config.EMBEDDING_CACHE_PATH,
+            max_entries=self.config.EMBEDDING_CACHE_MAX_ENTRIES,
+        )
+
+        return CachedEmbeddingClient(client=client, cache=cache)
@@ -8,20 +8,30 @@ class CoHereProvider(LLMInterface):
     def __init__(self, api_key: str,
                     default_input_max_characters: int=1000,
                     default_generation_max_output_tokens: int=1000,
-                    default_generation_temperature: float=0.1):
+                    default_generation_temperature: float=0.1,
+                    default_generation_max_input_tokens: int=None,
+                    chars_per_token: float=None,
+                    http_client=None):
         
         self.api_key = api_key
     
         self.default_input_max_characters = default_input_max_characters
         self.default_generation_max_output_tokens = default_generation_max_output_tokens
         self.default_generation_temperature = default_generation_temperature
+        self.default_generation_max_input_tokens = default_generation_max_input_tokens or 4000
+        self.chars_per_token = chars_per_token or 3.0
 
         self.generation_model_id = None
 
         self.embedding_model_id = None
         self.embedding_size = None
 
-        self.client = cohere.Client(api_key=self.api_key)
+        self.embedding_max_batch_size = 96
+        self.embedding_max_batch_characters = 200000
+
+        # http_client is a shared pooled httpx.Client holding the timeouts,
+        # requests reuse its keep-alive connections
+        self.client = cohere.Client(api_key=self.api_key, httpx_client=http_client)
 
         self.enums = CoHereEnums
         self.logger = logging.getLogger(__name__)
@@ -37,7 +47,7 @@ class CoHereProvider(LLMInterface):
         return text[:self.default_input_max_characters].strip()
 
     def generate_text(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
-                            temperature: float = None):
+                            temperature: float = None, prefix_size: int = 0):
 
         if not self.client:
             self.logger.error("CoHere client was not set")
@@ -50,10 +60,11 @@ class CoHereProvider(LLMInterface):
         max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
         temperature = temperature if temperature else self.default_generation_temperature
 
+        # cohere has no explicit prompt cache, prefix_size is ignored
         response = self.client.chat(
             model = self.generation_model_id,
             chat_history = chat_history,
-            message = self.process_text(prompt),
+            message = self.process_prompt(prompt),
             temperature = temperature,
             max_tokens = max_output_tokens
         )
@@ -63,8 +74,60 @@ class CoHereProvider(LLMInterface):
             return None
         
         return response.text
+
+    def warm_up(self):
+        # opens a pooled connection before the first user request
+        try:
+            self.client.check_api_key()
+        except Exception as e:
+            self.logger.warning(f"CoHere warm up failed: {str(e)}")
+            return False
+
+        return True
+
+    def generate_text_stream(self, prompt: str, chat_history: list=[], max_output_tokens: int=None,
+                                temperature: float = None, prefix_size: int = 0):
+
+        if not self.client:
+            self.logger.error("CoHere client was not set")
+            return
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model for CoHere was not set")
+            return
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+        temperature = temperature if temperature else self.default_generation_temperature
+
+        stream = self.client.chat_stream(
+            model = self.generation_model_id,
+            chat_history = chat_history,
+            message = self.process_prompt(prompt),
+            temperature = temperature,
+            max_tokens = max_output_tokens
+        )
+
+        for event in stream:
+            if event.event_type == "text-generation" and event.text:
+                yield {"delta": event.text}
+
+            elif event.event_type == "stream-end":
+                meta = event.response.meta if event.response else None
+                if meta and meta.billed_units:
+                    yield {"usage": {
+                        "input_tokens": meta.billed_units.input_tokens,
+                        "output_tokens": meta.billed_units.output_tokens,
+                    }}
     
     def embed_text(self, text: str, document_type: str = None):
+        vectors = self.embed_texts(texts=[text], document_type=document_type)
+
+        if not vectors:
+            return None
+
+        return vectors[0]
+
+    def embed_texts(self, texts: list, document_type: str = None, batch_size: int = None):
         if not self.client:
             self.logger.error("CoHere client was not set")
             return None
@@ -73,25 +136,39 @@ class CoHereProvider(LLMInterface):
             self.logger.error("Embedding model for CoHere was not set")
             return None
         
-        input_type = CoHereEnums.DOCUMENT
-        if document_type == DocumentTypeEnum.QUERY:
-            input_type = CoHereEnums.QUERY
-
-        response = self.client.embed(
-            model = self.embedding_model_id,
-            texts = [self.process_text(text)],
-            input_type = input_type,
-            embedding_types=['float'],
+        input_type = CoHereEnums.DOCUMENT.value
+        if document_type == DocumentTypeEnum.QUERY.value:
+            input_type = CoHereEnums.QUERY.value
+
+        max_batch_size = min(batch_size or self.embedding_max_batch_size,
+                             self.embedding_max_batch_size)
+
+        batches = self.split_into_batches(
+            texts=[ self.process_text(text) for text in texts ],
+            max_batch_size=max_batch_size,
+            max_batch_characters=self.embedding_max_batch_characters,
         )
 
-        if not response or not response.embeddings or not response.embeddings.float:
-            self.logger.error("Error while embedding text with CoHere")
-            return None
-        
-        return response.embeddings.float[0]
+        vectors = []
+        for batch in batches:
+            response = self.client.embed(
+                model = self.embedding_model_id,
+                texts = batch,
+                input_type = input_type,
+                embedding_types=['float'],
+            )
+
+            if not response or not response.embeddings or not response.embeddings.float \
+                    or len(response.embeddings.float) != len(batch):
+                self.logger.error("Error while embedding texts with CoHere")
+                return None
+
+            vectors.extend(response.embeddings.float)
+
+        return vectors
     
     def construct_prompt(self, prompt: str, role: str):
         return {
             "role": role,
-            "text": self.process_text(prompt)
+            "text": self.process_prompt(prompt)
         }
\ No newline at end of file
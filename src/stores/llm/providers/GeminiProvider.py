@@ -1,27 +1,60 @@
 from ..LLMInterface import LLMInterface
 from ..LLMEnums import GeminiEnums, DocumentTypeEnum
 import google.generativeai as genai
+from google.generativeai import caching
+import datetime
+import hashlib
+import threading
 import logging
+import json
+import time
 
 class GeminiProvider(LLMInterface):
     
     def __init__(self, api_key: str, 
             default_input_max_characters: int = 4000,
             default_generation_max_output_tokens: int = 2000,
-            default_generation_temperature: float = 0.7):
+            default_generation_temperature: float = 0.7,
+            default_generation_max_input_tokens: int = None,
+            chars_per_token: float = None,
+            request_timeout: float = None,
+            context_cache_enabled: bool = False,
+            context_cache_min_tokens: int = 4096,
+            context_cache_ttl_seconds: int = 600):
         
         self.api_key = api_key
         self.default_input_max_characters = default_input_max_characters
         self.default_generation_max_output_tokens = default_generation_max_output_tokens
         self.default_generation_temperature = default_generation_temperature
+        # ميزانية رموز مدخلات التوليد، النص العربي يستهلك رموزًا أكثر لكل حرف
+        self.default_generation_max_input_tokens = default_generation_max_input_tokens or 8000
+        self.chars_per_token = chars_per_token or 3.0
+        # مهلة الطلب بالثواني، تطبق على كل استدعاء للواجهة
+        self.request_options = { "timeout": request_timeout } if request_timeout else None
         
         self.generation_model_id = None
         self.embedding_model_id = None
         self.embedding_size = None
+
+        # حدود طلب التضمين الدفعي في Gemini
+        self.embedding_max_batch_size = 100
+        self.embedding_max_batch_characters = 200000
         
-        # تكوين عميل Gemini
+        # تكوين عميل Gemini، قناة الاتصال تنشأ مرة واحدة ويعاد استخدامها
         genai.configure(api_key=self.api_key)
         self.client = genai
+
+        # نماذج التوليد تنشأ مرة واحدة لكل (model_id, config)
+        self.generation_models = {}
+        self.generation_models_lock = threading.Lock()
+
+        # تخزين بادئة المحادثة الثابتة (التعليمات والوثائق) كمحتوى مخزن مؤقتًا في Gemini،
+        # الطلبات اللاحقة بنفس البادئة لا تعيد إرسالها ولا تدفع ثمنها كاملًا
+        self.context_cache_enabled = context_cache_enabled
+        self.context_cache_min_tokens = context_cache_min_tokens
+        self.context_cache_ttl_seconds = context_cache_ttl_seconds
+        self.context_caches = {}
+        self.context_caches_lock = threading.Lock()
         
         self.client.safety_settings = {
             "HARASSMENT": "BLOCK_NONE",
@@ -48,7 +81,7 @@ class GeminiProvider(LLMInterface):
         return text[:self.default_input_max_characters].strip()
     
     def generate_text(self, prompt: str, chat_history: list = [], max_output_tokens: int = None,
-                        temperature: float = None):
+                        temperature: float = None, prefix_size: int = 0):
         """توليد النص باستخدام Gemini"""
 
         if not self.client:
@@ -63,28 +96,10 @@ class GeminiProvider(LLMInterface):
         temperature = temperature or self.default_generation_temperature
 
         try:
-            model = self.client.GenerativeModel(self.generation_model_id)
-
-            generation_config = {
-                "max_output_tokens": max_output_tokens,
-                "temperature": temperature
-            }
-
-            # تجهيز تاريخ المحادثة
-            history = []
-            if chat_history:
-                for msg in chat_history:
-                    role = "user" if msg.get("role") == GeminiEnums.USER.value else "model"
-                    content = msg.get("content") or msg.get("text") or ""
-                    if content.strip():
-                        history.append({"role": role, "parts": [content]})
-
-            # إرسال الطلب
-            if history:
-                chat = model.start_chat(history=history)
-                response = chat.send_message(self.process_text(prompt), generation_config=generation_config)
-            else:
-                response = model.generate_content(self.process_text(prompt), generation_config=generation_config)
+            response = self.send_generation_request(prompt=prompt, chat_history=chat_history,
+                                                    max_output_tokens=max_output_tokens,
+                                                    temperature=temperature,
+                                                    prefix_size=prefix_size)
 
             # التأكد من finish_reason
             candidate = response.candidates[0] if response.candidates else None
@@ -116,9 +131,176 @@ class GeminiProvider(LLMInterface):
             self.logger.error(f"Error in Gemini generate_text: {str(e)}")
             return None
 
-    
+    def convert_chat_history(self, chat_history: list):
+        """تحويل تاريخ المحادثة إلى تنسيق Gemini"""
+        history = []
+        for msg in chat_history or []:
+            role = "user" if msg.get("role") == GeminiEnums.USER.value else "model"
+            content = msg.get("content") or msg.get("text") or ""
+            if content.strip():
+                history.append({"role": role, "parts": [content]})
+
+        return history
+
+    def send_generation_request(self, prompt: str, chat_history: list, max_output_tokens: int,
+                                    temperature: float, stream: bool = False, prefix_size: int = 0):
+        """إرسال طلب التوليد مع تاريخ المحادثة"""
+        chat_history = chat_history or []
+
+        # البادئة الثابتة تقرأ من المحتوى المخزن ويرسل الباقي فقط
+        model = None
+        if prefix_size and self.context_cache_enabled:
+            model = self.get_cached_generation_model(prefix_history=self.convert_chat_history(chat_history[:prefix_size]),
+                                                     max_output_tokens=max_output_tokens,
+                                                     temperature=temperature)
+
+        if model is not None:
+            history = self.convert_chat_history(chat_history[prefix_size:])
+        else:
+            model = self.get_generation_model(model_id=self.generation_model_id,
+                                              max_output_tokens=max_output_tokens,
+                                              temperature=temperature)
+            history = self.convert_chat_history(chat_history)
+
+        # إرسال الطلب
+        if history:
+            chat = model.start_chat(history=history)
+            return chat.send_message(self.process_prompt(prompt), stream=stream,
+                                     request_options=self.request_options)
+
+        return model.generate_content(self.process_prompt(prompt), stream=stream,
+                                      request_options=self.request_options)
+
+    def get_generation_model(self, model_id: str, max_output_tokens: int, temperature: float):
+        """إرجاع نموذج التوليد المخزن أو إنشاؤه عند أول استخدام"""
+        key = (model_id, max_output_tokens, temperature)
+
+        with self.generation_models_lock:
+            model = self.generation_models.get(key)
+            if model is None:
+                model = self.client.GenerativeModel(
+                    model_id,
+                    generation_config={
+                        "max_output_tokens": max_output_tokens,
+                        "temperature": temperature
+                    },
+                )
+                self.generation_models[key] = model
+
+        return model
+
+    def get_cached_generation_model(self, prefix_history: list, max_output_tokens: int, temperature: float):
+        """نموذج توليد مبني على المحتوى المخزن للبادئة، أو None إذا كانت البادئة قصيرة أو فشل التخزين"""
+        prefix_characters = sum( len(part) for msg in prefix_history for part in msg["parts"] )
+        if not prefix_history or prefix_characters / self.chars_per_token < self.context_cache_min_tokens:
+            return None
+
+        # البادئة مطابقة حرفيًا بين الطلبات، لذلك تصلح بصمتها كمفتاح
+        key = hashlib.sha256(
+            json.dumps([ self.generation_model_id, prefix_history ], ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+        now = time.monotonic()
+        with self.context_caches_lock:
+            self.context_caches = {
+                cache_key: entry
+                for cache_key, entry in self.context_caches.items()
+                if entry[1] > now
+            }
+            entry = self.context_caches.get(key)
+
+        if entry is None:
+            try:
+                cached_content = caching.CachedContent.create(
+                    model=self.generation_model_id,
+                    contents=prefix_history,
+                    ttl=datetime.timedelta(seconds=self.context_cache_ttl_seconds),
+                )
+            except Exception as e:
+                self.logger.warning(f"Gemini context cache could not be created: {str(e)}")
+                return None
+
+            # يعتبر منتهيًا قبل موعده بقليل حتى لا يستخدم محتوى حذفه الخادم
+            entry = (cached_content, now + self.context_cache_ttl_seconds * 0.9)
+            with self.context_caches_lock:
+                self.context_caches[key] = entry
+
+        return self.client.GenerativeModel.from_cached_content(
+            cached_content=entry[0],
+            generation_config={
+                "max_output_tokens": max_output_tokens,
+                "temperature": temperature
+            },
+        )
+
+    def warm_up(self):
+        """استدعاء خفيف عند بدء التشغيل لفتح الاتصال وتجهيز النماذج"""
+        try:
+            if self.generation_model_id:
+                model = self.get_generation_model(model_id=self.generation_model_id,
+                                                  max_output_tokens=self.default_generation_max_output_tokens,
+                                                  temperature=self.default_generation_temperature)
+                model.count_tokens("warm up", request_options=self.request_options)
+
+            if self.embedding_model_id:
+                self.client.embed_content(model=self.embedding_model_id, content="warm up",
+                                          task_type=GeminiEnums.QUERY.value,
+                                          request_options=self.request_options)
+        except Exception as e:
+            self.logger.warning(f"Gemini warm up failed: {str(e)}")
+            return False
+
+        return True
+
+    def generate_text_stream(self, prompt: str, chat_history: list = [], max_output_tokens: int = None,
+                                temperature: float = None, prefix_size: int = 0):
+        """توليد النص على دفعات متتالية باستخدام Gemini"""
+
+        if not self.client:
+            self.logger.error("Gemini client was not set")
+            return
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model for Gemini was not set")
+            return
+
+        max_output_tokens = max_output_tokens or self.default_generation_max_output_tokens
+        temperature = temperature or self.default_generation_temperature
+
+        try:
+            response = self.send_generation_request(prompt=prompt, chat_history=chat_history,
+                                                    max_output_tokens=max_output_tokens,
+                                                    temperature=temperature, stream=True,
+                                                    prefix_size=prefix_size)
+
+            for chunk in response:
+                parts = chunk.candidates[0].content.parts if chunk.candidates else []
+                delta = "".join([p.text for p in parts if hasattr(p, "text")])
+                if delta:
+                    yield {"delta": delta}
+
+            # عدد الرموز متاح بعد انتهاء البث
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                yield {"usage": {
+                    "input_tokens": usage.prompt_token_count,
+                    "output_tokens": usage.candidates_token_count,
+                }}
+
+        except Exception as e:
+            self.logger.error(f"Error in Gemini generate_text_stream: {str(e)}")
+
     def embed_text(self, text: str, document_type: str = None):
         """إنشاء تضمين النص باستخدام Gemini"""
+        vectors = self.embed_texts(texts=[text], document_type=document_type)
+
+        if not vectors:
+            return None
+
+        return vectors[0]
+
+    def embed_texts(self, texts: list, document_type: str = None, batch_size: int = None):
+        """إنشاء تضمينات لمجموعة نصوص على دفعات باستخدام Gemini"""
         if not self.client:
             self.logger.error("Gemini client was not set")
             return None
@@ -126,32 +308,42 @@ class GeminiProvider(LLMInterface):
         if not self.embedding_model_id:
             self.logger.error("Embedding model for Gemini was not set")
             return None
-        
-        try:
-            # معالجة النص
-            processed_text = self.process_text(text)
-            
-            # تحديد نوع المهمة للتضمين
-            task_type = GeminiEnums.DOCUMENT.value
-            if document_type == DocumentTypeEnum.QUERY.value:
-                task_type = GeminiEnums.QUERY.value
-            
-            # إنشاء التضمين
-            result = self.client.embed_content(
-                model=self.embedding_model_id,
-                content=processed_text,
-                task_type=task_type
-            )
-            
-            if not result or 'embedding' not in result or not result['embedding']:
-                self.logger.error("Error while embedding text with Gemini")
+
+        # تحديد نوع المهمة للتضمين
+        task_type = GeminiEnums.DOCUMENT.value
+        if document_type == DocumentTypeEnum.QUERY.value:
+            task_type = GeminiEnums.QUERY.value
+
+        max_batch_size = min(batch_size or self.embedding_max_batch_size,
+                             self.embedding_max_batch_size)
+
+        batches = self.split_into_batches(
+            texts=[ self.process_text(text) for text in texts ],
+            max_batch_size=max_batch_size,
+            max_batch_characters=self.embedding_max_batch_characters,
+        )
+
+        vectors = []
+        for batch in batches:
+            try:
+                # إنشاء التضمينات لكل دفعة في طلب واحد
+                result = self.client.embed_content(
+                    model=self.embedding_model_id,
+                    content=batch,
+                    task_type=task_type,
+                    request_options=self.request_options,
+                )
+            except Exception as e:
+                self.logger.error(f"Error in Gemini embed_texts: {str(e)}")
                 return None
-            
-            return result['embedding']
-            
-        except Exception as e:
-            self.logger.error(f"Error in Gemini embed_text: {str(e)}")
-            return None
+
+            if not result or 'embedding' not in result or len(result['embedding']) != len(batch):
+                self.logger.error("Error while embedding texts with Gemini")
+                return None
+
+            vectors.extend(result['embedding'])
+
+        return vectors
     
     def construct_prompt(self, prompt: str, role: str):
         """بناء رسالة بتنسيق Gemini"""
@@ -163,5 +355,5 @@ class GeminiProvider(LLMInterface):
         
         return {
             "role": gemini_role,
-            "content": self.process_text(prompt)
+            "content": self.process_prompt(prompt)
         }
\ No newline at end of file
@@ -35,4 +35,25 @@ footer_prompt = Template("\n".join([
     "$query",
     "",
     "## الإجابة:",
-]))
\ No newline at end of file
+]))
+
+#### Session ####
+
+summary_prompt = Template("\n".join([
+    "## ملخص المحادثة السابقة:",
+    "$summary",
+]))
+
+summarize_prompt = Template("\n".join([
+    "لخّص المحادثة التالية بحيث يحل الملخص محل الرسائل الأصلية.",
+    "احتفظ بكل معلومة أو اسم أو رقم أو قرار قد يعود إليه المستخدم.",
+    "ادمج الملخص مع الملخص السابق إن وجد.",
+    "اكتب فقرات قصيرة بنفس لغة المحادثة.",
+    "## الملخص السابق:",
+    "$summary",
+    "",
+    "## المحادثة:",
+    "$conversation",
+    "",
+    "## الملخص:",
+]))
@@ -33,4 +33,25 @@ footer_prompt = Template("\n".join([
     "$query",
     "",
     "## Answer:",
-]))
\ No newline at end of file
+]))
+
+#### Session ####
+
+summary_prompt = Template("\n".join([
+    "## Summary of the earlier conversation:",
+    "$summary",
+]))
+
+summarize_prompt = Template("\n".join([
+    "Summarize the conversation below so it can replace the original turns.",
+    "Keep every fact, name, number and decision the user may refer back to.",
+    "Merge it with the previous summary when there is one.",
+    "Write a few short paragraphs in the language of the conversation.",
+    "## Previous summary:",
+    "$summary",
+    "",
+    "## Conversation:",
+    "$conversation",
+    "",
+    "## Summary:",
+]))
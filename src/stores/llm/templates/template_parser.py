@@ -1,43 +1,132 @@
+from string import Template
+from types import MappingProxyType
+import importlib
+import threading
+import logging
+import time
 import os
 
 class TemplateParser:
+    # every locale group is imported once into a read-only registry of
+    # (language, group, key) -> Template, the language fallback is resolved
+    # up front so rendering a prompt is a dict lookup and a substitution
 
-    def __init__(self, language: str=None, default_language='ar'):
+    def __init__(self, language: str=None, default_language='ar',
+                    hot_reload: bool = False, reload_interval_seconds: float = 2.0):
         self.current_path = os.path.dirname(os.path.abspath(__file__))
+        self.locales_path = os.path.join(self.current_path, "locales")
         self.default_language = default_language
         self.language = None
 
+        # locale files are checked for changes at most once per interval
+        self.hot_reload = hot_reload
+        self.reload_interval_seconds = reload_interval_seconds
+        self.next_reload_check = time.monotonic() + reload_interval_seconds
+        self.reload_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        self.registry, self.files_mtimes = self.load_registry()
+        self.templates = MappingProxyType({})
+
         self.set_language(language)
 
-    
+    def list_locale_files(self):
+        # (language, group, path) of every group module
+        locale_files = []
+        for language in sorted(os.listdir(self.locales_path)):
+            language_path = os.path.join(self.locales_path, language)
+            if not os.path.isdir(language_path) or language.startswith("__"):
+                continue
+
+            for file_name in sorted(os.listdir(language_path)):
+                if file_name.endswith(".py") and not file_name.startswith("__"):
+                    locale_files.append((language, file_name[:-3], os.path.join(language_path, file_name)))
+
+        return locale_files
+
+    def load_registry(self, reload_modules: bool = False):
+        registry, files_mtimes = {}, {}
+        for language, group, group_path in self.list_locale_files():
+            files_mtimes[group_path] = os.path.getmtime(group_path)
+
+            module = importlib.import_module(f"stores.llm.templates.locales.{language}.{group}")
+            if reload_modules:
+                module = importlib.reload(module)
+
+            for key, value in vars(module).items():
+                if isinstance(value, Template):
+                    registry[(language, group, key)] = value
+
+        return MappingProxyType(registry), files_mtimes
+
+    def resolve_templates(self):
+        # templates of the current language, completed by the default language ones
+        templates = {}
+        for (language, group, key), template in self.registry.items():
+            if language == self.default_language:
+                templates.setdefault((group, key), template)
+            if language == self.language:
+                templates[(group, key)] = template
+
+        return MappingProxyType(templates)
+
     def set_language(self, language: str):
-        if not language:
-            self.language = self.default_language
+        languages = { language for language, _, _ in self.registry }
 
-        language_path = os.path.join(self.current_path, "locales", language)
-        if os.path.exists(language_path):
+        if language and language in languages:
             self.language = language
         else:
             self.language = self.default_language
 
+        self.templates = self.resolve_templates()
+
+    def reload_if_changed(self):
+        with self.reload_lock:
+            self.next_reload_check = time.monotonic() + self.reload_interval_seconds
+
+            files_mtimes = {
+                group_path: os.path.getmtime(group_path)
+                for _, _, group_path in self.list_locale_files()
+            }
+            if files_mtimes == self.files_mtimes:
+                return False
+
+            try:
+                registry, files_mtimes = self.load_registry(reload_modules=True)
+            except Exception as e:
+                # a half edited locale file keeps the previous templates
+                self.logger.error(f"Error while reloading prompt templates: {e}")
+                return False
+
+            self.registry, self.files_mtimes = registry, files_mtimes
+            self.templates = self.resolve_templates()
+
+        self.logger.info("Prompt templates reloaded")
+        return True
+
+    def get_template(self, group: str, key: str):
+        if self.hot_reload and time.monotonic() >= self.next_reload_check:
+            self.reload_if_changed()
+
+        return self.templates.get((group, key))
+
     def get(self, group: str, key: str, vars: dict={}):
         if not group or not key:
             return None
-        
-        group_path = os.path.join(self.current_path, "locales", self.language, f"{group}.py" )
-        targeted_language = self.language
-        if not os.path.exists(group_path):
-            group_path = os.path.join(self.current_path, "locales", self.default_language, f"{group}.py" )
-            targeted_language = self.default_language
-
-        if not os.path.exists(group_path):
+
+        template = self.get_template(group, key)
+        if template is None:
+            return None
+
+        return template.substitute(vars)
+
+    def render_many(self, group: str, key: str, vars_list: list):
+        # one lookup for a whole block of prompts (e.g. the retrieved documents)
+        if not group or not key:
             return None
-        
-        # import group module
-        module = __import__(f"stores.llm.templates.locales.{targeted_language}.{group}", fromlist=[group])
 
-        if not module:
+        template = self.get_template(group, key)
+        if template is None:
             return None
-        
-        key_attribute = getattr(module, key)
-        return key_attribute.substitute(vars)
\ No newline at end of file
+
+        return [ template.substitute(vars) for vars in vars_list ]
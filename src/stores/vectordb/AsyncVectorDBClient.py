@@ -0,0 +1,109 @@
+from .AsyncVectorDBInterface import AsyncVectorDBInterface
+from .VectorDBInterface import VectorDBInterface
+from concurrent.futures import Executor
+from typing import List
+from models.db_schemes import RetrievedDocument
+import asyncio
+import functools
+
+class AsyncVectorDBClient(AsyncVectorDBInterface):
+
+    def __init__(self, client: VectorDBInterface, executor: Executor):
+        # runs the blocking vector db calls on a managed thread pool
+        self.client = client
+        self.executor = executor
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def run_in_executor(self, func, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, **kwargs))
+
+    def connect(self):
+        return self.client.connect()
+
+    def disconnect(self):
+        return self.client.disconnect()
+
+    async def is_collection_existed(self, collection_name: str) -> bool:
+        return await self.run_in_executor(self.client.is_collection_existed,
+                                          collection_name=collection_name)
+
+    async def list_all_collections(self) -> List:
+        return await self.run_in_executor(self.client.list_all_collections)
+
+    async def get_collection_info(self, collection_name: str) -> dict:
+        return await self.run_in_executor(self.client.get_collection_info,
+                                          collection_name=collection_name)
+
+    async def delete_collection(self, collection_name: str):
+        return await self.run_in_executor(self.client.delete_collection,
+                                          collection_name=collection_name)
+
+    async def create_collection(self, collection_name: str, 
+                                embedding_size: int,
+                                do_reset: bool = False,
+                                collection_config: dict = None):
+        return await self.run_in_executor(self.client.create_collection,
+                                          collection_name=collection_name,
+                                          embedding_size=embedding_size,
+                                          do_reset=do_reset,
+                                          collection_config=collection_config)
+
+    async def insert_one(self, collection_name: str, text: str, vector: list,
+                    metadata: dict = None, 
+                    record_id: str = None):
+        return await self.run_in_executor(self.client.insert_one,
+                                          collection_name=collection_name,
+                                          text=text,
+                                          vector=vector,
+                                          metadata=metadata,
+                                          record_id=record_id)
+
+    async def insert_many(self, collection_name: str, texts: list, 
+                    vectors: list, metadata: list = None, 
+                    record_ids: list = None, batch_size: int = 50,
+                    payload_fields: list = None):
+        return await self.run_in_executor(self.client.insert_many,
+                                          collection_name=collection_name,
+                                          texts=texts,
+                                          vectors=vectors,
+                                          metadata=metadata,
+                                          record_ids=record_ids,
+                                          batch_size=batch_size,
+                                          payload_fields=payload_fields)
+
+    async def list_record_ids(self, collection_name: str, batch_size: int = 1000) -> List:
+        return await self.run_in_executor(self.client.list_record_ids,
+                                          collection_name=collection_name,
+                                          batch_size=batch_size)
+
+    async def delete_many(self, collection_name: str, record_ids: list):
+        return await self.run_in_executor(self.client.delete_many,
+                                          collection_name=collection_name,
+                                          record_ids=record_ids)
+
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int,
+                                search_params: dict = None,
+                                filters: dict = None,
+                                with_vectors: bool = False) -> List[RetrievedDocument] :
+        return await self.run_in_executor(self.client.search_by_vector,
+                                          collection_name=collection_name,
+                                          vector=vector,
+                                          limit=limit,
+                                          search_params=search_params,
+                                          filters=filters,
+                                          with_vectors=with_vectors)
+
+    async def search_by_vectors(self, collection_name: str, vectors: list, limit: int,
+                                search_params: dict = None,
+                                filters: dict = None,
+                                with_vectors: bool = False) -> List[List[RetrievedDocument]] :
+        return await self.run_in_executor(self.client.search_by_vectors,
+                                          collection_name=collection_name,
+                                          vectors=vectors,
+                                          limit=limit,
+                                          search_params=search_params,
+                                          filters=filters,
+                                          with_vectors=with_vectors)
@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+from typing import List
+from models.db_schemes import RetrievedDocument
+
+class AsyncVectorDBInterface(ABC):
+
+    @abstractmethod
+    def connect(self):
+        pass
+
+    @abstractmethod
+    def disconnect(self):
+        pass
+
+    @abstractmethod
+    async def is_collection_existed(self, collection_name: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def list_all_collections(self) -> List:
+        pass
+
+    @abstractmethod
+    async def get_collection_info(self, collection_name: str) -> dict:
+        pass
+
+    @abstractmethod
+    async def delete_collection(self, collection_name: str):
+        pass
+
+    @abstractmethod
+    async def create_collection(self, collection_name: str, 
+                                embedding_size: int,
+                                do_reset: bool = False,
+                                collection_config: dict = None):
+        pass
+
+    @abstractmethod
+    async def insert_one(self, collection_name: str, text: str, vector: list,
+                    metadata: dict = None, 
+                    record_id: str = None):
+        pass
+
+    @abstractmethod
+    async def insert_many(self, collection_name: str, texts: list, 
+                    vectors: list, metadata: list = None, 
+                    record_ids: list = None, batch_size: int = 50,
+                    payload_fields: list = None):
+        pass
+
+    @abstractmethod
+    async def list_record_ids(self, collection_name: str, batch_size: int = 1000) -> List:
+        pass
+
+    @abstractmethod
+    async def delete_many(self, collection_name: str, record_ids: list):
+        pass
+
+    @abstractmethod
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int,
+                                search_params: dict = None,
+                                filters: dict = None,
+                                with_vectors: bool = False) -> List[RetrievedDocument] :
+        pass
+
+    @abstractmethod
+    async def search_by_vectors(self, collection_name: str, vectors: list, limit: int,
+                                search_params: dict = None,
+                                filters: dict = None,
+                                with_vectors: bool = False) -> List[List[RetrievedDocument]] :
+        pass
@@ -0,0 +1,41 @@
+from .VectorDBEnums import PayloadFieldEnums
+import numpy as np
+
+class PayloadFilters:
+    # search filters: {"asset_ids": [...], "sources": [...], "page_from": int, "page_to": int}
+    # matched against the payload fields stored with every point (PayloadFieldEnums),
+    # held as column arrays so a filter is a few vectorized comparisons
+
+    @staticmethod
+    def to_columns(rows_fields: list) -> dict:
+        # keyword fields as unicode arrays, missing pages as -1
+        return {
+            PayloadFieldEnums.ASSET_ID.value: np.array([ str(f.get(PayloadFieldEnums.ASSET_ID.value) or "")
+                                                         for f in rows_fields ], dtype=str),
+            PayloadFieldEnums.SOURCE.value: np.array([ str(f.get(PayloadFieldEnums.SOURCE.value) or "")
+                                                       for f in rows_fields ], dtype=str),
+            PayloadFieldEnums.PAGE.value: np.array([ -1 if f.get(PayloadFieldEnums.PAGE.value) is None
+                                                     else f[PayloadFieldEnums.PAGE.value]
+                                                     for f in rows_fields ], dtype=np.int32),
+        }
+
+    @staticmethod
+    def mask(columns: dict, filters: dict) -> np.ndarray:
+        # rows whose payload fields match every given filter
+        asset_ids = columns[PayloadFieldEnums.ASSET_ID.value]
+        mask = np.ones(len(asset_ids), dtype=bool)
+
+        if filters.get("asset_ids"):
+            mask &= np.isin(asset_ids, filters["asset_ids"])
+
+        if filters.get("sources"):
+            mask &= np.isin(columns[PayloadFieldEnums.SOURCE.value], filters["sources"])
+
+        pages = columns[PayloadFieldEnums.PAGE.value]
+        if filters.get("page_from") is not None:
+            mask &= (pages >= 0) & (pages >= filters["page_from"])
+
+        if filters.get("page_to") is not None:
+            mask &= (pages >= 0) & (pages <= filters["page_to"])
+
+        return mask
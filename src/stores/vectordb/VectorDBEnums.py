@@ -2,7 +2,18 @@ from enum import Enum
 
 class VectorDBEnums(Enum):
     QDRANT = "QDRANT"
+    NUMPY = "NUMPY"
+    IVF_PQ = "IVF_PQ"
+
+class QuantizationEnums(Enum):
+    SCALAR = "scalar"
+    BINARY = "binary"
 
 class DistanceMethodEnums(Enum):
     COSINE = "cosine"
-    DOT = "dot"
\ No newline at end of file
+    DOT = "dot"
+class PayloadFieldEnums(Enum):
+    ASSET_ID = "asset_id"
+    SOURCE = "source"
+    PAGE = "page"
+    CHUNK_ORDER = "chunk_order"
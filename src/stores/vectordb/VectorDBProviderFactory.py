@@ -1,4 +1,4 @@
-from .providers import QdrantDBProvider
+from .providers import QdrantDBProvider, NumpyDBProvider, IVFPQDBProvider
 from .VectorDBEnums import VectorDBEnums
 from controllers.BaseController import BaseController
 
@@ -14,6 +14,32 @@ class VectorDBProviderFactory:
             return QdrantDBProvider(
                 db_path=db_path,
                 distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
+                url=self.config.QDRANT_URL,
+                api_key=self.config.QDRANT_API_KEY,
+            )
+
+        if provider == VectorDBEnums.NUMPY.value:
+            db_path = self.base_controller.get_database_path(db_name=self.config.VECTOR_DB_PATH)
+
+            return NumpyDBProvider(
+                db_path=db_path,
+                distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
+                dtype=self.config.NUMPY_VECTOR_DB_DTYPE,
+            )
+
+        if provider == VectorDBEnums.IVF_PQ.value:
+            db_path = self.base_controller.get_database_path(db_name=self.config.VECTOR_DB_PATH)
+
+            return IVFPQDBProvider(
+                db_path=db_path,
+                distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
+                dtype=self.config.NUMPY_VECTOR_DB_DTYPE,
+                nlist=self.config.IVF_PQ_NLIST,
+                m=self.config.IVF_PQ_M,
+                nprobe=self.config.IVF_PQ_NPROBE,
+                rerank_factor=self.config.IVF_PQ_RERANK_FACTOR,
+                min_train_rows=self.config.IVF_PQ_MIN_TRAIN_ROWS,
+                train_sample_size=self.config.IVF_PQ_TRAIN_SAMPLE_SIZE,
             )
         
         return None
\ No newline at end of file
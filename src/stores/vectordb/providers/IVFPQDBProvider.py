@@ -0,0 +1,461 @@
+from .NumpyDBProvider import NumpyDBProvider
+import numpy as np
+import shutil
+import os
+
+def assign_nearest(x: np.ndarray, centroids: np.ndarray, block_size: int = 4096):
+    # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2), computed in blocks
+    half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    assignments = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), block_size):
+        block = np.asarray(x[start:start + block_size], dtype=np.float32)
+        assignments[start:start + block_size] = np.argmax(block @ centroids.T - half_norms, axis=1)
+    return assignments
+
+def train_kmeans(x: np.ndarray, k: int, iterations: int = 10, seed: int = 0,
+                    block_size: int = 4096):
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = assign_nearest(x, centroids)
+        counts = np.bincount(assignments, minlength=k)
+
+        # per cluster sums one block at a time, never copying the whole sample
+        sums = np.zeros_like(centroids)
+        for start in range(0, len(x), block_size):
+            block_assignments = assignments[start:start + block_size]
+            order = np.argsort(block_assignments, kind="stable")
+            clusters, starts = np.unique(block_assignments[order], return_index=True)
+            sums[clusters] += np.add.reduceat(x[start:start + block_size][order], starts, axis=0)
+
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+        # empty clusters restart from random points
+        no_empty = int((~non_empty).sum())
+        if no_empty:
+            centroids[~non_empty] = x[rng.choice(len(x), size=no_empty, replace=False)]
+
+    return centroids
+
+class IVFPQIndex:
+    # coarse k-means quantizer + product quantized residuals.
+    # for inner products the residual lookup table does not depend on the probed
+    # list: q.x ~= q.centroid[list] + sum_j lut[j, code_j]
+    #   ivfpq.npz   centroids (nlist, d) and codebooks (m, 256, d/m)
+    #   codes.bin   uint8 (rows, m) codes, appended as rows are inserted
+    #   lists.bin   int32 coarse list of every row
+
+    def __init__(self, index_path: str, centroids: np.ndarray, codebooks: np.ndarray,
+                    trained_rows: int):
+        self.index_path = index_path
+        self.centroids = centroids
+        self.codebooks = codebooks
+        self.trained_rows = trained_rows
+
+        self.nlist = len(centroids)
+        self.m, self.ksub, self.dsub = codebooks.shape
+
+        self.codes = np.fromfile(self.get_file_path("codes.bin"), dtype=np.uint8).reshape(-1, self.m)
+        self.lists = np.fromfile(self.get_file_path("lists.bin"), dtype=np.int32)[:len(self.codes)]
+        self.codes = self.codes[:len(self.lists)]
+
+        self.list_offsets = None
+        self.list_rows = None
+
+    @classmethod
+    def load(cls, index_path: str):
+        model_path = os.path.join(index_path, "ivfpq.npz")
+        if not os.path.exists(model_path):
+            return None
+
+        model = np.load(model_path)
+        return cls(index_path=index_path, centroids=model["centroids"],
+                   codebooks=model["codebooks"], trained_rows=int(model["trained_rows"]))
+
+    @classmethod
+    def train(cls, index_path: str, samples: np.ndarray, nlist: int, m: int,
+                trained_rows: int = None, iterations: int = 10):
+        if len(samples) < 256:
+            raise ValueError("At least 256 training vectors are needed")
+
+        centroids = train_kmeans(samples, k=nlist, iterations=iterations)
+        residuals = samples - centroids[assign_nearest(samples, centroids)]
+
+        dsub = samples.shape[1] // m
+        codebooks = np.stack([
+            train_kmeans(np.ascontiguousarray(residuals[:, j * dsub:(j + 1) * dsub]),
+                         k=256, iterations=iterations)
+            for j in range(m)
+        ])
+
+        return cls.create(index_path=index_path, centroids=centroids, codebooks=codebooks,
+                          trained_rows=trained_rows or len(samples))
+
+    @classmethod
+    def create(cls, index_path: str, centroids: np.ndarray, codebooks: np.ndarray,
+                trained_rows: int):
+        # the model is written first, codes are appended by encode()
+        for file_name in ("codes.bin", "lists.bin"):
+            open(os.path.join(index_path, file_name), "wb").close()
+
+        np.savez(os.path.join(index_path, "ivfpq.npz"), centroids=centroids,
+                 codebooks=codebooks, trained_rows=trained_rows)
+
+        return cls(index_path=index_path, centroids=centroids, codebooks=codebooks,
+                   trained_rows=trained_rows)
+
+    @classmethod
+    def delete(cls, index_path: str):
+        for file_name in ("ivfpq.npz", "codes.bin", "lists.bin"):
+            file_path = os.path.join(index_path, file_name)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def move(self, index_path: str):
+        # the model is moved last, an interrupted move leaves no index to load
+        IVFPQIndex.delete(index_path)
+        for file_name in ("codes.bin", "lists.bin", "ivfpq.npz"):
+            os.replace(self.get_file_path(file_name), os.path.join(index_path, file_name))
+
+        self.index_path = index_path
+
+    def get_file_path(self, file_name: str):
+        return os.path.join(self.index_path, file_name)
+
+    @property
+    def no_encoded_rows(self):
+        return len(self.lists)
+
+    def encode(self, vectors: np.ndarray, block_size: int = 16384):
+        # appends the codes of the next rows, vectors are the rows not encoded yet
+        for start in range(0, len(vectors), block_size):
+            block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+
+            lists = assign_nearest(block, self.centroids)
+            residuals = block - self.centroids[lists]
+
+            codes = np.empty((len(block), self.m), dtype=np.uint8)
+            for j in range(self.m):
+                codes[:, j] = assign_nearest(residuals[:, j * self.dsub:(j + 1) * self.dsub],
+                                             self.codebooks[j])
+
+            self.append(codes=codes, lists=lists)
+
+    def append(self, codes: np.ndarray, lists: np.ndarray):
+        with open(self.get_file_path("codes.bin"), "ab") as f:
+            f.write(codes.tobytes())
+        with open(self.get_file_path("lists.bin"), "ab") as f:
+            f.write(lists.tobytes())
+
+        self.codes = np.concatenate([ self.codes, codes ])
+        self.lists = np.concatenate([ self.lists, lists ])
+
+        # inverted lists are rebuilt on the next search
+        self.list_offsets = None
+
+    def build_inverted_lists(self):
+        self.list_rows = np.argsort(self.lists, kind="stable").astype(np.int64)
+        self.list_offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        self.list_offsets[1:] = np.cumsum(np.bincount(self.lists, minlength=self.nlist))
+
+    def search(self, query: np.ndarray, excluded: np.ndarray, limit: int, nprobe: int):
+        # returns candidate rows ordered by approximate inner product
+        if self.list_offsets is None:
+            self.build_inverted_lists()
+
+        coarse_scores = self.centroids @ query
+        nprobe = min(nprobe, self.nlist)
+        probe_lists = np.argpartition(-coarse_scores, nprobe - 1)[:nprobe]
+
+        rows = np.concatenate([
+            self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]]
+            for l in probe_lists
+        ])
+        rows = rows[~excluded[rows]]
+        if len(rows) == 0:
+            return rows
+
+        lut = np.einsum("jkd,jd->jk", self.codebooks,
+                        query.reshape(self.m, self.dsub))
+        scores = coarse_scores[self.lists[rows]] + lut[np.arange(self.m), self.codes[rows]].sum(axis=1)
+
+        limit = min(limit, len(rows))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        return rows[top[np.argsort(-scores[top])]]
+
+    def get_info(self):
+        return {
+            "nlist": self.nlist,
+            "m": self.m,
+            "trained_rows": self.trained_rows,
+            "encoded_rows": self.no_encoded_rows,
+            "code_bytes_per_vector": self.m + 4,
+        }
+
+class IVFPQDBProvider(NumpyDBProvider):
+    # approximate search over the numpy provider storage: only the PQ codes are
+    # held in memory, the float vectors stay on disk and are read for re-ranking.
+    # collections below min_train_rows are searched exactly.
+    # training runs outside the provider lock on a snapshot of the rows, searches
+    # keep using the previous index (or exact search) until the new one is swapped in
+
+    def __init__(self, db_path: str, distance_method: str, dtype: str = "float32",
+                    nlist: int = None, m: int = 96, nprobe: int = 16,
+                    rerank_factor: int = 10, min_train_rows: int = 10000,
+                    train_sample_size: int = 50000, retrain_growth: float = 4.0):
+        super().__init__(db_path=db_path, distance_method=distance_method, dtype=dtype)
+
+        self.nlist = nlist
+        self.m = m
+        self.nprobe = nprobe
+        self.rerank_factor = rerank_factor
+        self.min_train_rows = min_train_rows
+        self.train_sample_size = train_sample_size
+        self.retrain_growth = retrain_growth
+
+        self.indexes = {}
+        self.training_collections = set()
+
+    def get_subquantizers_count(self, embedding_size: int):
+        # the largest divisor of the embedding size not above m
+        return max( m for m in range(1, min(self.m, embedding_size) + 1) if embedding_size % m == 0 )
+
+    def get_lists_count(self, no_rows: int):
+        if self.nlist:
+            return self.nlist
+        return int(min(max(np.sqrt(no_rows), 16), 4096))
+
+    def open_collection(self, collection_name: str):
+        collection = super().open_collection(collection_name)
+        self.indexes[collection_name] = IVFPQIndex.load(collection.collection_path)
+        return collection
+
+    def delete_collection(self, collection_name: str):
+        with self.lock:
+            self.indexes.pop(collection_name, None)
+            return super().delete_collection(collection_name=collection_name)
+
+    def create_collection(self, collection_name: str,
+                                embedding_size: int,
+                                do_reset: bool = False,
+                                collection_config: dict = None):
+        with self.lock:
+            is_created = super().create_collection(collection_name=collection_name,
+                                                   embedding_size=embedding_size,
+                                                   do_reset=do_reset,
+                                                   collection_config=collection_config)
+            if is_created:
+                self.indexes[collection_name] = None
+            return is_created
+
+    def get_training_path(self, collection_name: str):
+        # next to the collection, compaction replaces the collection directory
+        return f"{self.get_collection_path(collection_name)}.ivfpq"
+
+    def train_index(self, collection_name: str):
+        # trains on a sample of the vectors already pushed, then encodes every row
+        # step1: snapshot the rows under the lock, rows are append-only so the
+        # mapped vectors of the snapshot stay valid while training
+        with self.lock:
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                return None
+
+            if collection_name in self.training_collections:
+                return self.indexes.get(collection_name)
+
+            live_rows = np.sort(np.fromiter(collection.id_to_row.values(), dtype=np.int64))
+            no_live_rows = len(live_rows)
+            if no_live_rows < max(self.min_train_rows, 256):
+                return None
+
+            vectors = collection.vectors
+            self.training_collections.add(collection_name)
+
+        training_path = self.get_training_path(collection_name)
+
+        try:
+            # step2: train and encode the snapshot without blocking searches and inserts
+            rng = np.random.default_rng(0)
+            if len(live_rows) > self.train_sample_size:
+                live_rows = np.sort(rng.choice(live_rows, size=self.train_sample_size, replace=False))
+
+            samples = np.asarray(vectors[live_rows], dtype=np.float32)
+
+            shutil.rmtree(training_path, ignore_errors=True)
+            os.makedirs(training_path)
+
+            index = IVFPQIndex.train(index_path=training_path, samples=samples,
+                                     nlist=self.get_lists_count(no_live_rows),
+                                     m=self.get_subquantizers_count(collection.embedding_size),
+                                     trained_rows=no_live_rows)
+            index.encode(vectors)
+
+            # step3: swap the index in, unless the collection was compacted, reset or deleted meanwhile
+            with self.lock:
+                if self.collections.get(collection_name) is not collection:
+                    return None
+
+                index.move(collection.collection_path)
+
+                # rows inserted while training
+                if index.no_encoded_rows < collection.no_rows:
+                    index.encode(collection.vectors[index.no_encoded_rows:])
+
+                self.indexes[collection_name] = index
+                return index
+        finally:
+            shutil.rmtree(training_path, ignore_errors=True)
+            with self.lock:
+                self.training_collections.discard(collection_name)
+
+    def update_index(self, collection_name: str):
+        # encodes the new rows with the current index, returns True when the
+        # collection should be (re)trained
+        collection = self.collections[collection_name]
+        index = self.indexes.get(collection_name)
+
+        if index is None:
+            return len(collection.id_to_row) >= max(self.min_train_rows, 256)
+
+        if index.no_encoded_rows < collection.no_rows:
+            index.encode(collection.vectors[index.no_encoded_rows:])
+
+        return len(collection.id_to_row) >= self.retrain_growth * index.trained_rows
+
+    def insert_many(self, collection_name: str, texts: list,
+                        vectors: list, metadata: list = None,
+                        record_ids: list = None, batch_size: int = 50,
+                        payload_fields: list = None):
+        with self.lock:
+            is_inserted = super().insert_many(collection_name=collection_name, texts=texts,
+                                              vectors=vectors, metadata=metadata,
+                                              record_ids=record_ids, batch_size=batch_size,
+                                              payload_fields=payload_fields)
+
+            do_train = is_inserted and self.update_index(collection_name=collection_name)
+
+        if do_train:
+            _ = self.train_index(collection_name=collection_name)
+
+        return is_inserted
+
+    def compact_if_needed(self, collection_name: str):
+        # compaction keeps the live rows in order, so their codes are kept as they are
+        index = self.indexes.get(collection_name)
+        collection = self.collections[collection_name]
+        live_rows = np.sort(np.fromiter(collection.id_to_row.values(), dtype=np.int64))
+
+        if not super().compact_if_needed(collection_name=collection_name):
+            return False
+
+        if index is not None:
+            collection = self.collections[collection_name]
+            compacted_index = IVFPQIndex.create(index_path=collection.collection_path,
+                                                centroids=index.centroids,
+                                                codebooks=index.codebooks,
+                                                trained_rows=index.trained_rows)
+
+            encoded_rows = live_rows[live_rows < index.no_encoded_rows]
+            compacted_index.append(codes=index.codes[encoded_rows], lists=index.lists[encoded_rows])
+            if compacted_index.no_encoded_rows < collection.no_rows:
+                compacted_index.encode(collection.vectors[compacted_index.no_encoded_rows:])
+
+            self.indexes[collection_name] = compacted_index
+
+        return True
+
+    def can_use_index(self, collection_name: str, search_params: dict, filters: dict = None):
+        collection = self.collections[collection_name]
+        index = self.indexes.get(collection_name)
+
+        if index is None or index.no_encoded_rows < collection.no_rows or search_params.get("exact"):
+            return False
+
+        # a selective filter leaves few rows, scoring them exactly is cheaper
+        if filters and len(collection.filter_rows(filters=filters)) <= self.min_train_rows:
+            return False
+
+        return True
+
+    def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 5,
+                            search_params: dict = None, filters: dict = None,
+                            with_vectors: bool = False):
+        # exact batches are one matrix product, approximate ones probe per query
+        search_params = search_params or {}
+
+        with self.lock:
+            if self.get_collection(collection_name) is None:
+                return [ None for _ in vectors ]
+
+            if not self.can_use_index(collection_name=collection_name, search_params=search_params,
+                                      filters=filters):
+                return super().search_by_vectors(collection_name=collection_name, vectors=vectors,
+                                                 limit=limit, search_params=search_params,
+                                                 filters=filters, with_vectors=with_vectors)
+
+            return [
+                self.search_by_vector(collection_name=collection_name, vector=vector,
+                                      limit=limit, search_params=search_params, filters=filters,
+                                      with_vectors=with_vectors)
+                for vector in vectors
+            ]
+
+    def search_by_vector(self, collection_name: str, vector: list, limit: int = 5,
+                            search_params: dict = None, filters: dict = None,
+                            with_vectors: bool = False):
+        # search_params: "exact" bypasses the index, "nprobe" overrides the default
+        search_params = search_params or {}
+
+        with self.lock:
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                return None
+
+            index = self.indexes.get(collection_name)
+            if not self.can_use_index(collection_name=collection_name, search_params=search_params,
+                                      filters=filters):
+                return super().search_by_vector(collection_name=collection_name,
+                                                vector=vector, limit=limit, filters=filters,
+                                                with_vectors=with_vectors)
+
+            excluded = collection.deleted
+            if filters:
+                excluded = np.ones(collection.no_rows, dtype=bool)
+                excluded[collection.filter_rows(filters=filters)] = False
+
+            query = collection.prepare_vectors([vector])[0]
+
+            # step1: approximate candidates from the probed lists
+            candidate_rows = index.search(query=query, excluded=excluded,
+                                          limit=limit * self.rerank_factor,
+                                          nprobe=search_params.get("nprobe") or self.nprobe)
+            if len(candidate_rows) == 0:
+                return None
+
+            # step2: exact re-ranking from the float vectors on disk
+            candidate_rows = np.sort(candidate_rows)
+            scores = np.asarray(collection.vectors[candidate_rows], dtype=np.float32) @ query
+
+            top = np.argsort(-scores)[:limit]
+            top_rows = candidate_rows[top]
+            records = collection.read_records(top_rows)
+
+            return [
+                self.to_retrieved_document(collection=collection, record=record,
+                                           score=float(scores[i]), with_vectors=with_vectors)
+                for i, record in zip(top, records)
+            ]
+
+    def get_collection_info(self, collection_name: str) -> dict:
+        with self.lock:
+            collection_info = super().get_collection_info(collection_name=collection_name)
+            if collection_info is None:
+                return None
+
+            index = self.indexes.get(collection_name)
+            collection_info["ivfpq_index"] = index.get_info() if index is not None else None
+            return collection_info
@@ -0,0 +1,548 @@
+from ..VectorDBInterface import VectorDBInterface
+from ..VectorDBEnums import DistanceMethodEnums, PayloadFieldEnums
+from ..PayloadFilters import PayloadFilters
+from models.db_schemes import RetrievedDocument
+from typing import List
+import numpy as np
+import threading
+import fcntl
+import logging
+import shutil
+import json
+import os
+
+class NumpyCollection:
+    # one collection on disk:
+    #   meta.json     embedding size, dtype and distance
+    #   vectors.bin   append-only (rows, embedding_size) matrix, memory mapped
+    #   records.jsonl append-only {"id", "text", "metadata", "fields"} line per row
+    #   offsets.bin   uint64 byte offset of each row in records.jsonl
+    #   fields.jsonl  payload fields of each row, loaded as columns on the first filter
+    #   ids.jsonl     id of each row, read once when the collection is opened
+    #   deleted.bin   uint8 tombstone per row, replaced or deleted rows are 1
+    # rows are counted from ids.jsonl, which is written last on every append
+
+    def __init__(self, collection_path: str):
+        self.collection_path = collection_path
+
+        with open(self.get_file_path("meta.json"), "r") as f:
+            self.meta = json.load(f)
+
+        self.embedding_size = self.meta["embedding_size"]
+        self.dtype = np.dtype(self.meta["dtype"])
+        self.distance = self.meta["distance"]
+
+        # a torn last line is a row whose append did not finish
+        with open(self.get_file_path("ids.jsonl"), "rb") as f:
+            ids_lines = f.readlines()
+
+        if ids_lines and not ids_lines[-1].endswith(b"\n"):
+            ids_lines.pop()
+
+        self.ids = [ json.loads(line) for line in ids_lines ]
+        self.no_rows = len(self.ids)
+
+        # collections created before payload fields existed have no fields file
+        if not os.path.exists(self.get_file_path("fields.jsonl")):
+            open(self.get_file_path("fields.jsonl"), "wb").close()
+
+        with open(self.get_file_path("fields.jsonl"), "rb") as f:
+            fields_lines = f.readlines()[:self.no_rows]
+
+        self.no_fields_rows = len(fields_lines)
+
+        # drop whatever an unfinished append left past the last row in every file
+        offsets = np.fromfile(self.get_file_path("offsets.bin"), dtype=np.uint64)[:self.no_rows]
+        records_size = 0
+        if self.no_rows:
+            with open(self.get_file_path("records.jsonl"), "rb") as f:
+                f.seek(int(offsets[-1]))
+                records_size = int(offsets[-1]) + len(f.readline())
+
+        self.truncate_file("ids.jsonl", sum( len(line) for line in ids_lines ))
+        self.truncate_file("fields.jsonl", sum( len(line) for line in fields_lines ))
+        self.truncate_file("records.jsonl", records_size)
+        self.truncate_file("vectors.bin", self.no_rows * self.embedding_size * self.dtype.itemsize)
+        self.truncate_file("offsets.bin", self.no_rows * offsets.itemsize)
+        self.truncate_file("deleted.bin", self.no_rows)
+
+        self.deleted = np.fromfile(self.get_file_path("deleted.bin"), dtype=np.uint8).astype(bool)
+
+        # the last row written for an id is its live row
+        self.id_to_row = {
+            record_id: row
+            for row, record_id in enumerate(self.ids)
+            if not self.deleted[row]
+        }
+
+        # rows replaced by an append that did not get to tombstone them
+        self.tombstone_rows([
+            row
+            for row, record_id in enumerate(self.ids)
+            if not self.deleted[row] and self.id_to_row[record_id] != row
+        ])
+
+        self.columns = None
+        self.vectors = None
+        self.offsets = None
+        self.remap()
+
+    @classmethod
+    def create(cls, collection_path: str, embedding_size: int, dtype: str, distance: str):
+        os.makedirs(collection_path, exist_ok=True)
+
+        with open(os.path.join(collection_path, "meta.json"), "w") as f:
+            json.dump({ "embedding_size": embedding_size, "dtype": dtype, "distance": distance }, f)
+
+        for file_name in ("vectors.bin", "records.jsonl", "offsets.bin", "fields.jsonl",
+                          "ids.jsonl", "deleted.bin"):
+            open(os.path.join(collection_path, file_name), "wb").close()
+
+        return cls(collection_path=collection_path)
+
+    def get_file_path(self, file_name: str):
+        return os.path.join(self.collection_path, file_name)
+
+    def truncate_file(self, file_name: str, size: int):
+        file_path = self.get_file_path(file_name)
+        if os.path.getsize(file_path) > size:
+            os.truncate(file_path, size)
+
+    def remap(self):
+        # np.memmap can not map an empty file
+        if self.no_rows == 0:
+            self.vectors = np.empty((0, self.embedding_size), dtype=self.dtype)
+            self.offsets = np.empty(0, dtype=np.uint64)
+            return
+
+        self.vectors = np.memmap(self.get_file_path("vectors.bin"), dtype=self.dtype, mode="r",
+                                 shape=(self.no_rows, self.embedding_size))
+        self.offsets = np.memmap(self.get_file_path("offsets.bin"), dtype=np.uint64, mode="r",
+                                 shape=(self.no_rows,))
+
+    def prepare_vectors(self, vectors: list):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.embedding_size)
+
+        if self.distance == DistanceMethodEnums.COSINE.value:
+            # cosine similarity becomes a plain dot product on unit vectors
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+
+        return vectors
+
+    def get_columns(self):
+        if self.columns is None:
+            with open(self.get_file_path("fields.jsonl"), "r") as f:
+                rows_fields = [ json.loads(line) for line in f ][:self.no_rows]
+
+            rows_fields += [{}] * (self.no_rows - len(rows_fields))
+            self.columns = PayloadFilters.to_columns(rows_fields)
+
+        return self.columns
+
+    def append(self, record_ids: list, texts: list, vectors: list, metadata: list,
+                payload_fields: list = None):
+        vectors = self.prepare_vectors(vectors).astype(self.dtype)
+        payload_fields = payload_fields or [{}] * len(record_ids)
+
+        records_path = self.get_file_path("records.jsonl")
+        offset = os.path.getsize(records_path)
+        offsets = np.empty(len(record_ids), dtype=np.uint64)
+
+        with open(records_path, "ab") as f:
+            for i, (record_id, text, meta, fields) in enumerate(zip(record_ids, texts, metadata, payload_fields)):
+                line = json.dumps({ "id": record_id, "text": text, "metadata": meta, "fields": fields },
+                                  ensure_ascii=False).encode("utf-8") + b"\n"
+                offsets[i] = offset
+                offset += len(line)
+                f.write(line)
+
+        # rows of older collections without fields are padded before appending
+        with open(self.get_file_path("fields.jsonl"), "a") as f:
+            f.writelines( "{}\n" for _ in range(max(0, self.no_rows - self.no_fields_rows)) )
+            f.writelines( json.dumps(fields, ensure_ascii=False) + "\n" for fields in payload_fields )
+
+        self.no_fields_rows = max(self.no_rows, self.no_fields_rows) + len(payload_fields)
+
+        with open(self.get_file_path("vectors.bin"), "ab") as f:
+            f.write(vectors.tobytes())
+
+        with open(self.get_file_path("offsets.bin"), "ab") as f:
+            f.write(offsets.tobytes())
+
+        with open(self.get_file_path("deleted.bin"), "ab") as f:
+            f.write(bytes(len(record_ids)))
+
+        # ids.jsonl commits the new rows, replaced rows are tombstoned only after it.
+        # a crash in between leaves both rows, the reopen keeps the last one
+        with open(self.get_file_path("ids.jsonl"), "a") as f:
+            f.writelines( json.dumps(record_id) + "\n" for record_id in record_ids )
+
+        first_row = self.no_rows
+        self.ids.extend(record_ids)
+        self.no_rows += len(record_ids)
+        self.deleted = np.concatenate([ self.deleted, np.zeros(len(record_ids), dtype=bool) ])
+
+        replaced_rows = [ self.id_to_row[record_id] for record_id in record_ids if record_id in self.id_to_row ]
+        for i, record_id in enumerate(record_ids):
+            if record_id in self.id_to_row and self.id_to_row[record_id] >= first_row:
+                # an id repeated in the batch, the last row wins
+                replaced_rows.append(self.id_to_row[record_id])
+            self.id_to_row[record_id] = first_row + i
+
+        self.tombstone_rows(replaced_rows)
+
+        if self.columns is not None:
+            new_columns = PayloadFilters.to_columns(payload_fields)
+            self.columns = {
+                name: np.concatenate([ column, new_columns[name] ])
+                for name, column in self.columns.items()
+            }
+
+        self.remap()
+
+    def tombstone(self, record_ids: list):
+        rows = [
+            self.id_to_row.pop(record_id)
+            for record_id in record_ids
+            if record_id in self.id_to_row
+        ]
+
+        return self.tombstone_rows(rows)
+
+    def tombstone_rows(self, rows: list):
+        if not rows:
+            return 0
+
+        self.deleted[rows] = True
+
+        with open(self.get_file_path("deleted.bin"), "r+b") as f:
+            for row in rows:
+                f.seek(row)
+                f.write(b"\x01")
+
+        return len(rows)
+
+    def read_records(self, rows: list):
+        records = []
+        with open(self.get_file_path("records.jsonl"), "rb") as f:
+            for row in rows:
+                f.seek(int(self.offsets[row]))
+                records.append(json.loads(f.readline()))
+        return records
+
+    def score(self, vectors: list, rows: np.ndarray = None, block_size: int = 16384):
+        # (queries, rows) scores, one BLAS product over the mapped matrix.
+        # when rows are given only those rows are read and scored
+        queries = self.prepare_vectors(vectors)
+
+        if rows is not None:
+            return queries @ np.asarray(self.vectors[rows], dtype=np.float32).T
+
+        if self.dtype == np.float32:
+            scores = queries @ self.vectors.T
+        else:
+            # half precision has no BLAS path, upcast one block at a time
+            scores = np.empty((len(queries), self.no_rows), dtype=np.float32)
+            for start in range(0, self.no_rows, block_size):
+                block = self.vectors[start:start + block_size].astype(np.float32)
+                scores[:, start:start + block_size] = queries @ block.T
+
+        scores[:, self.deleted] = -np.inf
+        return scores
+
+    def filter_rows(self, filters: dict):
+        # live rows matching the payload filters
+        mask = PayloadFilters.mask(self.get_columns(), filters)
+        return np.flatnonzero(mask & ~self.deleted)
+
+    def search(self, vectors: list, limit: int, filters: dict = None):
+        # returns one [(record, score)] list per query vector
+        rows = None
+        no_candidates = len(self.id_to_row)
+        if filters:
+            rows = self.filter_rows(filters=filters)
+            no_candidates = len(rows)
+
+        if no_candidates == 0:
+            return [ [] for _ in vectors ]
+
+        scores = self.score(vectors=vectors, rows=rows)
+
+        limit = min(limit, no_candidates)
+        top_rows = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        top_scores = np.take_along_axis(scores, top_rows, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top_rows = np.take_along_axis(top_rows, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        if rows is not None:
+            top_rows = rows[top_rows]
+
+        return [
+            [
+                (record, float(score))
+                for score, record in zip(query_scores, self.read_records(query_rows))
+            ]
+            for query_rows, query_scores in zip(top_rows, top_scores)
+        ]
+
+    def get_info(self):
+        return {
+            "points_count": len(self.id_to_row),
+            "rows_count": self.no_rows,
+            "deleted_rows_count": self.no_rows - len(self.id_to_row),
+            "embedding_size": self.embedding_size,
+            "dtype": self.dtype.name,
+            "distance": self.distance,
+            "disk_size_bytes": sum(
+                os.path.getsize(self.get_file_path(file_name))
+                for file_name in os.listdir(self.collection_path)
+            ),
+        }
+
+class NumpyDBProvider(VectorDBInterface):
+
+    def __init__(self, db_path: str, distance_method: str, dtype: str = "float32",
+                    compact_ratio: float = 0.3):
+
+        self.db_path = db_path
+        self.distance_method = distance_method or DistanceMethodEnums.COSINE.value
+        self.dtype = dtype
+        self.compact_ratio = compact_ratio
+
+        self.collections = None
+        self.lock = threading.RLock()
+        self.lock_file = None
+
+        self.logger = logging.getLogger(__name__)
+
+    def connect(self):
+        # collections are opened lazily on first use and cached, so the db can only
+        # be opened by one process at a time (a single uvicorn worker)
+        os.makedirs(self.db_path, exist_ok=True)
+        lock_file = open(os.path.join(self.db_path, ".lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(
+                f"The vector db at {self.db_path} is opened by another process, "
+                "the NUMPY and IVF_PQ backends only support a single process"
+            )
+
+        self.lock_file = lock_file
+        self.collections = {}
+
+    def disconnect(self):
+        with self.lock:
+            self.collections = None
+            if self.lock_file is not None:
+                self.lock_file.close()
+                self.lock_file = None
+
+    def get_collection_path(self, collection_name: str):
+        return os.path.join(self.db_path, collection_name)
+
+    def open_collection(self, collection_name: str):
+        return NumpyCollection(collection_path=self.get_collection_path(collection_name))
+
+    def get_collection(self, collection_name: str):
+        with self.lock:
+            collection = self.collections.get(collection_name)
+            if collection is None and self.is_collection_existed(collection_name):
+                collection = self.open_collection(collection_name)
+                self.collections[collection_name] = collection
+            return collection
+
+    def is_collection_existed(self, collection_name: str) -> bool:
+        return os.path.exists(os.path.join(self.get_collection_path(collection_name), "meta.json"))
+
+    def list_all_collections(self) -> List:
+        return [
+            collection_name
+            for collection_name in sorted(os.listdir(self.db_path))
+            if self.is_collection_existed(collection_name)
+        ]
+
+    def get_collection_info(self, collection_name: str) -> dict:
+        with self.lock:
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                return None
+
+            return {
+                "collection_name": collection_name,
+                **collection.get_info(),
+            }
+
+    def delete_collection(self, collection_name: str):
+        with self.lock:
+            if not self.is_collection_existed(collection_name):
+                return None
+
+            self.collections.pop(collection_name, None)
+            shutil.rmtree(self.get_collection_path(collection_name))
+            return True
+
+    def create_collection(self, collection_name: str,
+                                embedding_size: int,
+                                do_reset: bool = False,
+                                collection_config: dict = None):
+        with self.lock:
+            if do_reset:
+                _ = self.delete_collection(collection_name=collection_name)
+
+            if not self.is_collection_existed(collection_name):
+                self.collections[collection_name] = NumpyCollection.create(
+                    collection_path=self.get_collection_path(collection_name),
+                    embedding_size=embedding_size,
+                    dtype=self.dtype,
+                    distance=self.distance_method,
+                )
+
+                return True
+
+            return False
+
+    def insert_one(self, collection_name: str, text: str, vector: list,
+                        metadata: dict = None,
+                        record_id: str = None):
+
+        return self.insert_many(
+            collection_name=collection_name,
+            texts=[text],
+            vectors=[vector],
+            metadata=[metadata],
+            record_ids=[record_id] if record_id is not None else None,
+        )
+
+    def insert_many(self, collection_name: str, texts: list,
+                        vectors: list, metadata: list = None,
+                        record_ids: list = None, batch_size: int = 50,
+                        payload_fields: list = None):
+
+        if metadata is None:
+            metadata = [None] * len(texts)
+
+        with self.lock:
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                self.logger.error(f"Can not insert new records to non-existed collection: {collection_name}")
+                return False
+
+            if record_ids is None:
+                record_ids = list(range(collection.no_rows, collection.no_rows + len(texts)))
+
+            try:
+                collection.append(record_ids=record_ids, texts=texts,
+                                  vectors=vectors, metadata=metadata,
+                                  payload_fields=payload_fields)
+            except Exception as e:
+                self.logger.error(f"Error while inserting batch: {e}")
+                return False
+
+            self.compact_if_needed(collection_name=collection_name)
+
+        return True
+
+    def list_record_ids(self, collection_name: str, batch_size: int = 1000) -> List:
+        with self.lock:
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                return []
+
+            return list(collection.id_to_row.keys())
+
+    def delete_many(self, collection_name: str, record_ids: list):
+        with self.lock:
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                return False
+
+            try:
+                _ = collection.tombstone(record_ids)
+            except Exception as e:
+                self.logger.error(f"Error while deleting records: {e}")
+                return False
+
+            self.compact_if_needed(collection_name=collection_name)
+
+        return True
+
+    def compact_if_needed(self, collection_name: str):
+        # rewrite the collection without tombstoned rows once they are a large share
+        collection = self.collections[collection_name]
+        no_deleted_rows = collection.no_rows - len(collection.id_to_row)
+
+        if no_deleted_rows == 0 or no_deleted_rows < self.compact_ratio * collection.no_rows:
+            return False
+
+        collection_path = self.get_collection_path(collection_name)
+        tmp_path = f"{collection_path}.compact"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+        compacted = NumpyCollection.create(collection_path=tmp_path,
+                                           embedding_size=collection.embedding_size,
+                                           dtype=collection.dtype.name,
+                                           distance=collection.distance)
+
+        live_rows = sorted(collection.id_to_row.values())
+        for start in range(0, len(live_rows), 10000):
+            rows = live_rows[start:start + 10000]
+            records = collection.read_records(rows)
+            compacted.append(
+                record_ids=[ record["id"] for record in records ],
+                texts=[ record["text"] for record in records ],
+                # stored vectors are already normalized, normalizing again is a no-op
+                vectors=np.asarray(collection.vectors[rows], dtype=np.float32),
+                metadata=[ record["metadata"] for record in records ],
+                payload_fields=[ record.get("fields") or {} for record in records ],
+            )
+
+        shutil.rmtree(collection_path)
+        os.replace(tmp_path, collection_path)
+        self.collections[collection_name] = self.open_collection(collection_name)
+
+        return True
+
+    def to_retrieved_document(self, collection: NumpyCollection, record: dict, score: float,
+                                with_vectors: bool = False):
+        fields = record.get("fields") or {}
+        return RetrievedDocument(**{
+            "id": str(record["id"]),
+            "score": score,
+            "text": record["text"],
+            "asset_id": fields.get(PayloadFieldEnums.ASSET_ID.value),
+            "chunk_order": fields.get(PayloadFieldEnums.CHUNK_ORDER.value),
+            "vector": collection.vectors[collection.id_to_row[record["id"]]].tolist() if with_vectors else None,
+        })
+
+    def search_by_vector(self, collection_name: str, vector: list, limit: int = 5,
+                            search_params: dict = None, filters: dict = None,
+                            with_vectors: bool = False):
+        # brute force search is always exact, search_params are accepted and ignored
+        return self.search_by_vectors(collection_name=collection_name, vectors=[vector],
+                                      limit=limit, search_params=search_params,
+                                      filters=filters, with_vectors=with_vectors)[0]
+
+    def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 5,
+                            search_params: dict = None, filters: dict = None,
+                            with_vectors: bool = False):
+        # the collection is read under the same lock as the search, a compaction
+        # swaps the collection files and its offsets
+        with self.lock:
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                return [ None for _ in vectors ]
+
+            batch_results = collection.search(vectors=vectors, limit=limit, filters=filters)
+
+            return [
+                [
+                    self.to_retrieved_document(collection=collection, record=record, score=score,
+                                               with_vectors=with_vectors)
+                    for record, score in results
+                ] or None
+                for results in batch_results
+            ]
@@ -1,16 +1,18 @@
 from qdrant_client import models, QdrantClient
 from ..VectorDBInterface import VectorDBInterface
-from ..VectorDBEnums import DistanceMethodEnums
+from ..VectorDBEnums import DistanceMethodEnums, QuantizationEnums, PayloadFieldEnums
 import logging
 from typing import List
 from models.db_schemes import RetrievedDocument
 
 class QdrantDBProvider(VectorDBInterface):
 
-    def __init__(self, db_path: str, distance_method: str):
+    def __init__(self, db_path: str, distance_method: str, url: str = None, api_key: str = None):
 
         self.client = None
         self.db_path = db_path
+        self.url = url
+        self.api_key = api_key
         self.distance_method = None
 
         if distance_method == DistanceMethodEnums.COSINE.value:
@@ -21,6 +23,13 @@ class QdrantDBProvider(VectorDBInterface):
         self.logger = logging.getLogger(__name__)
 
     def connect(self):
+        if self.url:
+            self.client = QdrantClient(url=self.url, api_key=self.api_key)
+            return
+
+        # local mode keeps plain vectors in memory and scores them exactly
+        self.logger.warning("Qdrant local mode ignores the quantization, HNSW, on disk and search "
+                            "params settings, set QDRANT_URL to use a qdrant server")
         self.client = QdrantClient(path=self.db_path)
 
     def disconnect(self):
@@ -39,9 +48,97 @@ class QdrantDBProvider(VectorDBInterface):
         if self.is_collection_existed(collection_name):
             return self.client.delete_collection(collection_name=collection_name)
         
+    def get_quantization_config(self, collection_config: dict):
+        quantization = collection_config.get("quantization")
+        always_ram = collection_config.get("quantization_always_ram", True)
+
+        if quantization == QuantizationEnums.SCALAR.value:
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=always_ram,
+                )
+            )
+
+        if quantization == QuantizationEnums.BINARY.value:
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=always_ram)
+            )
+
+        return None
+
+    def get_search_filter(self, filters: dict):
+        # the filter is applied inside the HNSW search using the payload indexes
+        if not filters:
+            return None
+
+        conditions = []
+        if filters.get("asset_ids"):
+            conditions.append(models.FieldCondition(
+                key=PayloadFieldEnums.ASSET_ID.value,
+                match=models.MatchAny(any=filters["asset_ids"]),
+            ))
+
+        if filters.get("sources"):
+            conditions.append(models.FieldCondition(
+                key=PayloadFieldEnums.SOURCE.value,
+                match=models.MatchAny(any=filters["sources"]),
+            ))
+
+        if filters.get("page_from") is not None or filters.get("page_to") is not None:
+            conditions.append(models.FieldCondition(
+                key=PayloadFieldEnums.PAGE.value,
+                range=models.Range(gte=filters.get("page_from"), lte=filters.get("page_to")),
+            ))
+
+        if not conditions:
+            return None
+
+        return models.Filter(must=conditions)
+
+    def create_payload_indexes(self, collection_name: str):
+        payload_indexes = {
+            PayloadFieldEnums.ASSET_ID.value: models.PayloadSchemaType.KEYWORD,
+            PayloadFieldEnums.SOURCE.value: models.PayloadSchemaType.KEYWORD,
+            PayloadFieldEnums.PAGE.value: models.PayloadSchemaType.INTEGER,
+            PayloadFieldEnums.CHUNK_ORDER.value: models.PayloadSchemaType.INTEGER,
+        }
+
+        for field_name, field_schema in payload_indexes.items():
+            _ = self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+
+    def get_search_params(self, search_params: dict):
+        # search_params: hnsw_ef, exact, quantization_rescore, quantization_oversampling
+        if not search_params:
+            return None
+
+        quantization_params = None
+        if search_params.get("quantization_rescore") is not None \
+                or search_params.get("quantization_oversampling") is not None:
+            quantization_params = models.QuantizationSearchParams(
+                rescore=search_params.get("quantization_rescore"),
+                oversampling=search_params.get("quantization_oversampling"),
+            )
+
+        return models.SearchParams(
+            hnsw_ef=search_params.get("hnsw_ef"),
+            exact=search_params.get("exact") or False,
+            quantization=quantization_params,
+        )
+        
     def create_collection(self, collection_name: str, 
                                 embedding_size: int,
-                                do_reset: bool = False):
+                                do_reset: bool = False,
+                                collection_config: dict = None):
+        # collection_config: quantization, quantization_always_ram, on_disk,
+        # payload_on_disk, hnsw_m, hnsw_ef_construct
+        collection_config = collection_config or {}
+
         if do_reset:
             _ = self.delete_collection(collection_name=collection_name)
         
@@ -50,10 +147,19 @@ class QdrantDBProvider(VectorDBInterface):
                 collection_name=collection_name,
                 vectors_config=models.VectorParams(
                     size=embedding_size,
-                    distance=self.distance_method
-                )
+                    distance=self.distance_method,
+                    on_disk=collection_config.get("on_disk"),
+                ),
+                hnsw_config=models.HnswConfigDiff(
+                    m=collection_config.get("hnsw_m"),
+                    ef_construct=collection_config.get("hnsw_ef_construct"),
+                ),
+                quantization_config=self.get_quantization_config(collection_config),
+                on_disk_payload=collection_config.get("payload_on_disk"),
             )
 
+            self.create_payload_indexes(collection_name=collection_name)
+
             return True
         
         return False
@@ -87,11 +193,15 @@ class QdrantDBProvider(VectorDBInterface):
     
     def insert_many(self, collection_name: str, texts: list, 
                         vectors: list, metadata: list = None, 
-                        record_ids: list = None, batch_size: int = 50):
+                        record_ids: list = None, batch_size: int = 50,
+                        payload_fields: list = None):
         
         if metadata is None:
             metadata = [None] * len(texts)
 
+        if payload_fields is None:
+            payload_fields = [{}] * len(texts)
+
         if record_ids is None:
             record_ids = list(range(0, len(texts)))
 
@@ -102,13 +212,15 @@ class QdrantDBProvider(VectorDBInterface):
             batch_vectors = vectors[i:batch_end]
             batch_metadata = metadata[i:batch_end]
             batch_record_ids = record_ids[i:batch_end]
+            batch_payload_fields = payload_fields[i:batch_end]
 
             batch_records = [
                 models.Record(
                     id=batch_record_ids[x],
                     vector=batch_vectors[x],
                     payload={
-                        "text": batch_texts[x], "metadata": batch_metadata[x]
+                        "text": batch_texts[x], "metadata": batch_metadata[x],
+                        **batch_payload_fields[x]
                     }
                 )
 
@@ -126,12 +238,53 @@ class QdrantDBProvider(VectorDBInterface):
 
         return True
         
-    def search_by_vector(self, collection_name: str, vector: list, limit: int = 5):
+    def list_record_ids(self, collection_name: str, batch_size: int = 1000) -> List:
+        if not self.is_collection_existed(collection_name):
+            return []
+
+        record_ids = []
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            record_ids.extend( record.id for record in records )
+
+            if offset is None:
+                break
+
+        return record_ids
+
+    def delete_many(self, collection_name: str, record_ids: list):
+        if not self.is_collection_existed(collection_name):
+            return False
+
+        try:
+            _ = self.client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=record_ids),
+            )
+        except Exception as e:
+            self.logger.error(f"Error while deleting records: {e}")
+            return False
+
+        return True
+        
+    def search_by_vector(self, collection_name: str, vector: list, limit: int = 5,
+                            search_params: dict = None, filters: dict = None,
+                            with_vectors: bool = False):
 
         results = self.client.search(
             collection_name=collection_name,
             query_vector=vector,
-            limit=limit
+            query_filter=self.get_search_filter(filters),
+            limit=limit,
+            search_params=self.get_search_params(search_params),
+            with_vectors=with_vectors,
         )
 
         if not results or len(results) == 0:
@@ -139,8 +292,47 @@ class QdrantDBProvider(VectorDBInterface):
         
         return [
             RetrievedDocument(**{
+                "id": str(result.id),
                 "score": result.score,
                 "text": result.payload["text"],
+                "asset_id": result.payload.get(PayloadFieldEnums.ASSET_ID.value),
+                "chunk_order": result.payload.get(PayloadFieldEnums.CHUNK_ORDER.value),
+                "vector": result.vector if with_vectors else None,
             })
             for result in results
+        ]
+
+    def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 5,
+                            search_params: dict = None, filters: dict = None,
+                            with_vectors: bool = False):
+        # all queries in one request, results come back in the queries order
+        search_filter = self.get_search_filter(filters)
+        batch_results = self.client.search_batch(
+            collection_name=collection_name,
+            requests=[
+                models.SearchRequest(
+                    vector=vector,
+                    filter=search_filter,
+                    limit=limit,
+                    with_payload=True,
+                    with_vector=with_vectors,
+                    params=self.get_search_params(search_params),
+                )
+                for vector in vectors
+            ]
+        )
+
+        return [
+            [
+                RetrievedDocument(**{
+                    "id": str(result.id),
+                    "score": result.score,
+                    "text": result.payload["text"],
+                    "asset_id": result.payload.get(PayloadFieldEnums.ASSET_ID.value),
+                    "chunk_order": result.payload.get(PayloadFieldEnums.CHUNK_ORDER.value),
+                    "vector": result.vector if with_vectors else None,
+                })
+                for result in results
+            ] or None
+            for results in batch_results
         ]
\ No newline at end of file